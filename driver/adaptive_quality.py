@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Adaptive Stream Quality
+Controller that trades JPEG quality, output scale and frame skip for
+throughput: it watches delivered frames per second and end-to-end latency
+and steps along a quality ladder to hold a frame-rate and latency budget
+"""
+
+import time
+import threading
+import collections
+import cv2
+import numpy as np
+from typing import List, NamedTuple, Optional
+
+from driver.jpeg_frame import is_jpeg_buffer
+from driver.metrics import METRICS
+
+class StreamSettings(NamedTuple):
+    """One rung of the quality ladder"""
+    quality: int  # JPEG quality
+    scale: float  # Output size relative to the camera frame
+    skip: int  # Frames dropped between delivered frames (push streams only)
+
+def build_ladder(max_quality: int = 85, min_quality: int = 40, quality_step: int = 15,
+                 scales=(1.0, 0.75, 0.5), max_skip: int = 2) -> List[StreamSettings]:
+    """
+    Quality ladder from best to cheapest
+
+    Quality is lowered first (cheapest to undo), then resolution, and frame
+    skip is the last resort.
+    """
+    qualities = list(range(max_quality, min_quality, -quality_step)) + [min_quality]
+    ladder = [StreamSettings(quality, scales[0], 0) for quality in qualities]
+    ladder += [StreamSettings(min_quality, scale, 0) for scale in scales[1:]]
+    ladder += [StreamSettings(min_quality, scales[-1], skip) for skip in range(1, max_skip + 1)]
+    return ladder
+
+class AdaptiveQuality:
+    """Holds a target frame rate and latency by moving along a quality ladder"""
+
+    def __init__(self, target_fps: float = 15.0, max_latency: float = 0.15, ladder: List[StreamSettings] = None,
+                 window: float = 2.0, interval: float = 1.0, tolerance: float = 0.1, upgrade_after: int = 3,
+                 prefix: str = 'stream'):
+        """
+        Initialize controller
+
+        Args:
+            target_fps: Delivered frames per second to hold (at most the camera rate)
+            max_latency: Allowed 90th percentile latency in seconds
+            ladder: Settings from best to cheapest (default: build_ladder())
+            window: Seconds of deliveries used for each decision
+            interval: Minimum seconds between decisions
+            tolerance: Fraction the frame rate may fall short before degrading
+            upgrade_after: Consecutive healthy decisions needed to step back up
+            prefix: Metric name prefix
+        """
+        self.target_fps = target_fps
+        self.max_latency = max_latency
+        self.ladder = ladder or build_ladder()
+        self.window = window
+        self.interval = interval
+        self.tolerance = tolerance
+        self.upgrade_after = upgrade_after
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._deliveries = collections.deque()  # (delivered_at, latency)
+        self._skipped = 0
+        self.reset()
+
+    def reset(self):
+        """Return to the best settings and forget measurements."""
+        with self._lock:
+            self.level = 0
+            self.fps = 0.0
+            self.latency = 0.0
+            self.downgrades = 0
+            self.upgrades = 0
+            self._healthy = 0
+            self._deliveries.clear()
+            self._last_decision = time.monotonic()
+        self._publish()
+
+    @property
+    def settings(self) -> StreamSettings:
+        return self.ladder[self.level]
+
+    def should_skip(self) -> bool:
+        """For push streams: True for frames the current skip setting drops."""
+        skip = self.settings.skip
+        if not skip:
+            return False
+        self._skipped = (self._skipped + 1) % (skip + 1)
+        return self._skipped != 1
+
+    def encode(self, frame: np.ndarray) -> Optional[bytes]:
+        """
+        Encode a frame (BGR pixels or a passthrough JPEG) at the current settings
+
+        Device JPEGs are forwarded untouched at the top rung; otherwise they
+        are decoded at reduced size where the scale allows it.
+        """
+        quality, scale, _ = self.settings
+        if is_jpeg_buffer(frame):
+            if self.level == 0:
+                return frame.tobytes()
+            flags = cv2.IMREAD_REDUCED_COLOR_2 if scale <= 0.5 else cv2.IMREAD_COLOR
+            decoded = cv2.imdecode(frame.reshape(-1), flags)
+            if decoded is None:
+                return None
+            if flags == cv2.IMREAD_REDUCED_COLOR_2:
+                scale *= 2
+            frame = decoded
+
+        if scale < 1.0:
+            size = (max(1, int(frame.shape[1] * scale)), max(1, int(frame.shape[0] * scale)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+        start = time.perf_counter_ns()
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            return None
+        METRICS.observe('jpeg_encode', start)
+        return buffer.tobytes()
+
+    def record(self, latency: float, now: float = None) -> bool:
+        """
+        Record one delivered frame and its end-to-end latency in seconds
+
+        A gap longer than the window counts as the consumer pausing, not as
+        a slow pipeline. Returns True if the settings changed.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self._deliveries and now - self._deliveries[-1][0] > self.window:
+                self._deliveries.clear()
+                self._last_decision = now
+            self._deliveries.append((now, latency))
+            while now - self._deliveries[0][0] > self.window:
+                self._deliveries.popleft()
+            if now - self._last_decision < self.interval or len(self._deliveries) < 2:
+                return False
+            self._last_decision = now
+            changed = self._decide(now)
+        self._publish()
+        return changed
+
+    def _decide(self, now: float) -> bool:
+        latencies = sorted(latency for _, latency in self._deliveries)
+        self.fps = (len(latencies) - 1) / max(now - self._deliveries[0][0], 1e-6)
+        self.latency = latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))]
+
+        # Skipped frames are a deliberate reduction, so judge the rate the pipeline attempted
+        attempted = self.fps * (self.settings.skip + 1)
+        overloaded = attempted < self.target_fps * (1.0 - self.tolerance) or self.latency > self.max_latency
+        if overloaded:
+            self._healthy = 0
+            if self.level < len(self.ladder) - 1:
+                self.level += 1
+                self.downgrades += 1
+                METRICS.inc(f'{self.prefix}_quality_downgrades')
+                self._restart()  # Judge the new settings on their own frames
+                return True
+            return False
+
+        # Step up only with clear headroom, after several healthy decisions
+        if self.latency < self.max_latency * 0.5:
+            self._healthy += 1
+        else:
+            self._healthy = 0
+        if self._healthy >= self.upgrade_after and self.level > 0:
+            self.level -= 1
+            self.upgrades += 1
+            self._healthy = 0
+            METRICS.inc(f'{self.prefix}_quality_upgrades')
+            self._restart()
+            return True
+        return False
+
+    def _restart(self):
+        # Keep the newest delivery so the next rate measurement starts from it
+        newest = self._deliveries[-1]
+        self._deliveries.clear()
+        self._deliveries.append(newest)
+
+    def _publish(self):
+        quality, scale, skip = self.settings
+        METRICS.set(f'{self.prefix}_quality_level', self.level)
+        METRICS.set(f'{self.prefix}_jpeg_quality', quality)
+        METRICS.set(f'{self.prefix}_scale', scale)
+        METRICS.set(f'{self.prefix}_frame_skip', skip)
+        METRICS.set(f'{self.prefix}_delivered_fps', round(self.fps, 2))
+        METRICS.set(f'{self.prefix}_latency_p90_seconds', round(self.latency, 4))
+
+    def get_status(self) -> dict:
+        """Current settings and measurements."""
+        quality, scale, skip = self.settings
+        return {
+            'level': self.level,
+            'quality': quality,
+            'scale': scale,
+            'skip': skip,
+            'fps': round(self.fps, 2),
+            'latency_ms': round(self.latency * 1000, 1),
+            'target_fps': self.target_fps,
+            'max_latency_ms': round(self.max_latency * 1000, 1),
+            'downgrades': self.downgrades,
+            'upgrades': self.upgrades,
+        }
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Async Microscope Driver
+asyncio facade over MicroscopeDriver: blocking OpenCV/libusb calls run on
+a dedicated executor so they never stall the event loop
+"""
+
+import asyncio
+import functools
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, AsyncIterator
+
+from driver.microscope_driver import MicroscopeDriver
+
+FRAME_POLICIES = ('drop', 'block')
+
+class AsyncSetting:
+    """Awaitable device setting: `await driver.led_brightness.set(128)`"""
+
+    def __init__(self, owner: 'AsyncMicroscopeDriver', setter: str, initial=None):
+        self._owner = owner
+        self._setter = setter
+        self.value = initial
+
+    async def set(self, *value) -> bool:
+        """Apply the setting on the device executor; caches it on success."""
+        ok = await self._owner.run(getattr(self._owner.driver, self._setter), *value)
+        if ok:
+            self.value = value[0] if len(value) == 1 else value
+        return ok
+
+    def get(self):
+        """Return the last successfully applied value."""
+        return self.value
+
+class AsyncMicroscopeDriver:
+    """asyncio wrapper for MicroscopeDriver"""
+
+    def __init__(self, driver: MicroscopeDriver = None, frame_workers: int = 4, **driver_kwargs):
+        """
+        Initialize async driver
+
+        Args:
+            driver: Existing driver to wrap (a new MicroscopeDriver is created if None)
+            frame_workers: Threads available for waiting on grabbed frames
+            driver_kwargs: Arguments for the new MicroscopeDriver
+        """
+        self.driver = driver or MicroscopeDriver(**driver_kwargs)
+        # One thread owns the device so calls stay serialized, as in sync code
+        self._device_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="microscope-device")
+        # Waiting for grabbed frames is thread-safe and must not block device calls
+        self._frame_executor = ThreadPoolExecutor(max_workers=frame_workers, thread_name_prefix="microscope-frames")
+
+        self.led_brightness = AsyncSetting(self, 'set_led_brightness')
+        self.frame_size = AsyncSetting(self, 'set_frame_size', self.driver.current_resolution)
+
+        self.frames_delivered = 0
+        self.frames_dropped = 0
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking driver call on the device executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._device_executor, functools.partial(func, *args, **kwargs))
+
+    @property
+    def is_connected(self) -> bool:
+        return self.driver.is_connected
+
+    async def connect(self) -> bool:
+        """Attempt to connect to the microscope."""
+        return await self.run(self.driver.connect)
+
+    async def disconnect(self):
+        """Disconnect from the microscope."""
+        await self.run(self.driver.disconnect)
+
+    async def get_device_info(self) -> dict:
+        """Return device information."""
+        return await self.run(self.driver.get_device_info)
+
+    async def send_control_command(self, request: int, value: int = 0, index: int = 0, data: bytes = None) -> bool:
+        """Send control command."""
+        return await self.run(self.driver.send_control_command, request, value, index, data)
+
+    async def set_led_brightness(self, brightness: int) -> bool:
+        """Set LED brightness (0-255)."""
+        return await self.led_brightness.set(brightness)
+
+    async def capture_frame(self) -> Optional[np.ndarray]:
+        """Capture a frame."""
+        if self.driver.grabber:
+            # Threaded mode can still wait for the first frame, so keep it off the loop,
+            # but on the frame executor rather than queued behind device calls
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._frame_executor, self.driver.capture_frame)
+        return await self.run(self.driver.capture_frame)
+
+    async def frames(self, fps: float = None, policy: str = 'drop', maxsize: int = 1) -> AsyncIterator[np.ndarray]:
+        """
+        Iterate over live frames
+
+        Args:
+            fps: Maximum delivery rate (None for as fast as the camera allows)
+            policy: 'drop' replaces queued frames a slow consumer has not taken yet;
+                    'block' pauses capture until the consumer catches up
+            maxsize: Number of frames buffered between capture and consumer
+        """
+        if policy not in FRAME_POLICIES:
+            raise ValueError(f"policy must be one of {FRAME_POLICIES}")
+
+        queue = asyncio.Queue(maxsize)
+        producer = asyncio.ensure_future(self._produce(queue, fps, policy))
+        try:
+            while True:
+                frame = await queue.get()
+                if frame is None:
+                    break
+                self.frames_delivered += 1
+                yield frame
+        finally:
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+
+    async def _produce(self, queue: asyncio.Queue, fps: Optional[float], policy: str):
+        """Capture frames into queue until the driver disconnects."""
+        loop = asyncio.get_running_loop()
+        interval = 1.0 / fps if fps else 0.0
+        next_time = loop.time()
+        seq = 0
+
+        while self.driver.is_connected:
+            if interval:
+                delay = next_time - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_time = max(next_time + interval, loop.time())
+
+            if self.driver.grabber:
+                grabbed = await loop.run_in_executor(self._frame_executor, self.driver.wait_for_next, seq, 0.5)
+                if grabbed is None:
+                    continue
+                seq, frame = grabbed.seq, grabbed.frame
+            else:
+                frame = await self.run(self.driver.capture_frame)
+                if frame is None:
+                    await asyncio.sleep(0.1)
+                    continue
+
+            if policy == 'block':
+                await queue.put(frame)
+            else:
+                self._put_latest(queue, frame)
+
+        # Signal the end of the stream
+        if policy == 'block':
+            await queue.put(None)
+        else:
+            self._put_latest(queue, None)
+
+    def _put_latest(self, queue: asyncio.Queue, frame):
+        if queue.full():
+            queue.get_nowait()
+            self.frames_dropped += 1
+        queue.put_nowait(frame)
+
+    async def close(self):
+        """Disconnect if needed and stop the executors."""
+        if self.driver.is_connected:
+            await self.disconnect()
+        self._device_executor.shutdown(wait=True)
+        self._frame_executor.shutdown(wait=False)
+
+    async def __aenter__(self) -> 'AsyncMicroscopeDriver':
+        if not await self.connect():
+            raise ConnectionError("Failed to connect to microscope")
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+"""
+Capture Backends
+Sources of USB devices and video captures for MicroscopeDriver: real
+hardware (libusb + V4L2), a synthetic sensor, and replay of recorded video
+or image directories, plus a fake USB device for control transfers
+"""
+
+import os
+import time
+import array
+import collections
+import cv2
+import numpy as np
+import usb.core
+import usb.util
+from typing import List, Optional, Tuple
+
+from driver.discovery import DISCOVERY, DeviceDiscovery
+
+MJPG_FOURCC = cv2.VideoWriter_fourcc(*'MJPG')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+DEFAULT_VIDEO_INDEX = 4  # Used when sysfs cannot tell which node belongs to the device
+
+# Standard GET_DESCRIPTOR request and string descriptor type
+_GET_DESCRIPTOR = 0x06
+_DESC_TYPE_STRING = 0x03
+_LANGID_EN_US = 0x0409
+
+class _FakeContext:
+    """Stands in for the pyusb backend context so usb.util.dispose_resources works"""
+
+    def dispose(self, device):
+        device.disposed = True
+
+class FakeUSBDevice:
+    """
+    USB device answering control transfers in memory
+
+    Implements enough of usb.core.Device for the driver and pyusb's
+    string descriptor helpers: vendor OUT requests store their payload per
+    request code, vendor IN requests read it back.
+    """
+
+    def __init__(self, vendor_id: int = 0x05e3, product_id: int = 0xf12a, manufacturer: str = "Epiphany",
+                 product: str = "Fake Microscope", bus: int = 0, address: int = 0, log_size: int = 256):
+        self.idVendor = vendor_id
+        self.idProduct = product_id
+        self.bus = bus
+        self.address = address
+        self.bDeviceClass = 0
+        self.iManufacturer = 1
+        self.iProduct = 2
+        self.langids = (_LANGID_EN_US,)
+        self.strings = {1: manufacturer, 2: product}
+        self.registers = {}  # Vendor request code -> last payload written
+        self.transfers = collections.deque(maxlen=log_size)  # (bmRequestType, bRequest, wValue, wIndex)
+        self.disposed = False
+        self._ctx = _FakeContext()
+
+    def ctrl_transfer(self, bmRequestType: int, bRequest: int, wValue: int = 0, wIndex: int = 0,
+                      data_or_wLength=None, timeout: int = None):
+        """Handle a control transfer like usb.core.Device.ctrl_transfer."""
+        self.transfers.append((bmRequestType, bRequest, wValue, wIndex))
+        self.disposed = False
+        device_to_host = bool(bmRequestType & 0x80)
+
+        if device_to_host and bRequest == _GET_DESCRIPTOR and (wValue >> 8) == _DESC_TYPE_STRING:
+            index = wValue & 0xFF
+            if index == 0:
+                payload = b''.join(langid.to_bytes(2, 'little') for langid in self.langids)
+            elif index in self.strings:
+                payload = self.strings[index].encode('utf-16-le')
+            else:
+                raise usb.core.USBError("Invalid string descriptor index")
+            descriptor = bytes([len(payload) + 2, _DESC_TYPE_STRING]) + payload
+            return array.array('B', descriptor[:data_or_wLength])
+
+        if device_to_host:
+            length = data_or_wLength or 0
+            stored = self.registers.get(bRequest, b'')
+            return array.array('B', stored[:length].ljust(length, b'\x00'))
+
+        data = bytes(data_or_wLength or b'')
+        self.registers[bRequest] = data
+        return len(data)
+
+class _EmulatedCapture:
+    """Shared pacing, properties and MJPEG emulation of the simulated captures"""
+
+    def __init__(self, width: int, height: int, fps: float, realtime: bool):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.realtime = realtime
+        self.brightness = 0.5
+        self.fourcc = 0
+        self.convert_rgb = True
+        self.jpeg_quality = 80
+        self.frame_index = 0
+        self._opened = True
+        self._next_frame_time = time.monotonic()
+
+    def isOpened(self) -> bool:
+        return self._opened
+
+    def release(self):
+        self._opened = False
+
+    def _pace(self):
+        """Sleep until the next frame is due at the simulated rate."""
+        if self.realtime and self.fps > 0:
+            now = time.monotonic()
+            if self._next_frame_time > now:
+                time.sleep(self._next_frame_time - now)
+            self._next_frame_time = max(self._next_frame_time, now) + 1.0 / self.fps
+
+    def _deliver(self, image: np.ndarray) -> Tuple[bool, np.ndarray]:
+        """Return pixels, or raw JPEG bytes when an MJPEG camera is emulated."""
+        self.frame_index += 1
+        if self.fourcc == MJPG_FOURCC and not self.convert_rgb:
+            _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            return True, buffer.reshape(1, -1)
+        return True, image
+
+    def _resize(self, width: int, height: int) -> bool:
+        """Change the output size; sources with a fixed size return False."""
+        return False
+
+    def set(self, prop: int, value: float) -> bool:
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self._resize(int(value), self.height)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self._resize(self.width, int(value))
+        if prop == cv2.CAP_PROP_FPS:
+            self.fps = float(value)
+        elif prop == cv2.CAP_PROP_BRIGHTNESS:
+            self.brightness = float(value)
+        elif prop == cv2.CAP_PROP_FOURCC:
+            self.fourcc = int(value)
+        elif prop == cv2.CAP_PROP_CONVERT_RGB:
+            self.convert_rgb = bool(value)
+        elif prop != cv2.CAP_PROP_BUFFERSIZE:
+            return False
+        return True
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(self.width)
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(self.height)
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps)
+        if prop == cv2.CAP_PROP_BRIGHTNESS:
+            return float(self.brightness)
+        if prop == cv2.CAP_PROP_FOURCC:
+            return float(self.fourcc)
+        if prop == cv2.CAP_PROP_CONVERT_RGB:
+            return float(self.convert_rgb)
+        return 0.0
+
+class SyntheticCapture(_EmulatedCapture):
+    """Stand-in for cv2.VideoCapture that generates a drifting test pattern"""
+
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 30.0, realtime: bool = True,
+                 noise: int = 16):
+        """
+        Initialize synthetic capture
+
+        Args:
+            width: Frame width in pixels
+            height: Frame height in pixels
+            fps: Simulated sensor frame rate
+            realtime: Pace read() calls to the simulated frame rate
+            noise: Amplitude of uniform sensor noise (0 for none)
+        """
+        super().__init__(width, height, fps, realtime)
+        self.noise = noise
+        self._build_pattern()
+
+    def _build_pattern(self):
+        """Precompute the static test pattern for the current size."""
+        ys, xs = np.mgrid[0:self.height, 0:self.width]
+        cx, cy = self.width / 2.0, self.height / 2.0
+        radius = np.sqrt((xs - cx) ** 2 + (ys - cy) ** 2)
+
+        # Cell-like rings on a vignetted background
+        rings = (np.sin(radius / 6.0) * 0.5 + 0.5) * 120
+        vignette = np.clip(1.0 - radius / max(cx, cy), 0.0, 1.0) * 100
+        base = (rings + vignette).astype(np.uint8)
+
+        self._pattern = cv2.merge([base, (base * 0.8).astype(np.uint8), (base * 0.6).astype(np.uint8)])
+        self._noise = np.empty((self.height, self.width, 3), dtype=np.uint8)
+
+    def _resize(self, width: int, height: int) -> bool:
+        self.width, self.height = width, height
+        self._build_pattern()
+        return True
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Return the next synthetic frame."""
+        if not self._opened:
+            return False, None
+        self._pace()
+
+        shape = (self.height, self.width, 3)
+        if image is None or image.shape != shape or image.dtype != np.uint8:
+            image = np.empty(shape, dtype=np.uint8)
+
+        # Drift the pattern slowly so consecutive frames differ
+        shift = self.frame_index % self.width
+        np.copyto(image[:, :self.width - shift], self._pattern[:, shift:])
+        np.copyto(image[:, self.width - shift:], self._pattern[:, :shift])
+
+        if self.noise:
+            cv2.randu(self._noise, 0, self.noise)
+            cv2.add(image, self._noise, dst=image)
+        cv2.convertScaleAbs(image, dst=image, alpha=self.brightness * 2.0)
+        return self._deliver(image)
+
+class ReplayCapture(_EmulatedCapture):
+    """Stand-in for cv2.VideoCapture that replays a video file or image directory"""
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = True, fps: float = None,
+                 preload: bool = False):
+        """
+        Initialize replay capture
+
+        Args:
+            path: Video file, or directory of images replayed in name order
+            realtime: Pace read() to fps; otherwise replay as fast as possible
+            loop: Start over at the end instead of reporting a read failure
+            fps: Replay rate (default: the video's rate, or 30 for images)
+            preload: Decode everything up front so replay speed excludes decoding
+        """
+        self.path = path
+        self.loop = loop
+        self._video = None
+        self._files: List[str] = []
+        self._frames: List[np.ndarray] = []
+        self._position = 0
+
+        if os.path.isdir(path):
+            self._files = sorted(os.path.join(path, name) for name in os.listdir(path)
+                                 if name.lower().endswith(IMAGE_EXTENSIONS))
+            first = cv2.imread(self._files[0]) if self._files else None
+            source_fps = 30.0
+        else:
+            self._video = cv2.VideoCapture(path)
+            _, first = self._video.read() if self._video.isOpened() else (False, None)
+            source_fps = self._video.get(cv2.CAP_PROP_FPS) or 30.0
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+        height, width = first.shape[:2] if first is not None else (0, 0)
+        super().__init__(width, height, fps or source_fps, realtime)
+        self._opened = first is not None
+        if preload and self._opened:
+            self._frames = list(self._iter_source())
+            self._opened = bool(self._frames)
+
+    def _iter_source(self):
+        if self._video is not None:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            while True:
+                ok, frame = self._video.read()
+                if not ok:
+                    return
+                yield frame
+        else:
+            for path in self._files:
+                frame = cv2.imread(path)
+                if frame is not None:
+                    yield frame
+
+    @property
+    def frame_count(self) -> int:
+        if self._frames:
+            return len(self._frames)
+        if self._video is not None:
+            return int(self._video.get(cv2.CAP_PROP_FRAME_COUNT))
+        return len(self._files)
+
+    def _next_source_frame(self) -> Optional[np.ndarray]:
+        if self._frames:
+            if self._position >= len(self._frames):
+                if not self.loop:
+                    return None
+                self._position = 0
+            frame = self._frames[self._position]
+            self._position += 1
+            return frame
+
+        if self._video is not None:
+            ok, frame = self._video.read()
+            if not ok and self.loop:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, frame = self._video.read()
+            return frame if ok else None
+
+        if self._position >= len(self._files):
+            if not self.loop:
+                return None
+            self._position = 0
+        frame = cv2.imread(self._files[self._position])
+        self._position += 1
+        return frame
+
+    def read(self, image: Optional[np.ndarray] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """Return the next recorded frame."""
+        if not self._opened:
+            return False, None
+        self._pace()
+
+        frame = self._next_source_frame()
+        if frame is None:
+            return False, None
+        if frame.ndim == 2:
+            frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+        if image is not None and image.shape == frame.shape and image.dtype == frame.dtype:
+            np.copyto(image, frame)
+            frame = image
+        elif self._frames:
+            # Preloaded frames are shared between loops; never hand them out
+            frame = frame.copy()
+        return self._deliver(frame)
+
+    def set(self, prop: int, value: float) -> bool:
+        # Replay rate is fixed when the capture is opened
+        if prop == cv2.CAP_PROP_FPS:
+            return False
+        return super().set(prop, value)
+
+    def release(self):
+        super().release()
+        if self._video is not None:
+            self._video.release()
+
+def _string_descriptors(device) -> Optional[Tuple[str, str]]:
+    """Manufacturer and product, requested from the device itself."""
+    try:
+        return usb.util.get_string(device, device.iManufacturer), usb.util.get_string(device, device.iProduct)
+    except Exception:
+        return None
+
+class UsbBackend:
+    """Real hardware: pyusb device lookup and V4L2 capture through OpenCV"""
+
+    def __init__(self, discovery: DeviceDiscovery = DISCOVERY):
+        self.discovery = discovery
+
+    def find_device(self, vendor_id: int, product_id: int, **match):
+        # sysfs answers "not plugged in" without a libusb enumeration
+        if self.discovery.available and not self.discovery.find(vendor_id, product_id, match.get('bus'),
+                                                                match.get('address')):
+            return None
+        return usb.core.find(idVendor=vendor_id, idProduct=product_id, **match)
+
+    def find_video_index(self, device) -> int:
+        index = self.discovery.find_video_index(device.idVendor, device.idProduct, device.bus, device.address)
+        return DEFAULT_VIDEO_INDEX if index is None else index
+
+    def device_strings(self, device) -> Optional[Tuple[str, str]]:
+        # sysfs holds the strings the kernel read at enumeration; no control transfer needed
+        for camera in self.discovery.find(device.idVendor, device.idProduct, device.bus, device.address):
+            if camera.manufacturer or camera.product:
+                return camera.manufacturer, camera.product
+        return _string_descriptors(device)
+
+    def open_capture(self, index: int):
+        return cv2.VideoCapture(index)
+
+class SimulatedBackend:
+    """Synthetic sensor behind a fake USB device"""
+
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 30.0, realtime: bool = True,
+                 noise: int = 16, device: FakeUSBDevice = None):
+        self.mode = (width, height, fps)  # Adopted by the driver as its requested mode
+        self.realtime = realtime
+        self.noise = noise
+        self.device = device or FakeUSBDevice()
+
+    def find_device(self, vendor_id: int, product_id: int, **match):
+        return self.device
+
+    def find_video_index(self, device) -> int:
+        return 0
+
+    def device_strings(self, device) -> Optional[Tuple[str, str]]:
+        return _string_descriptors(device)
+
+    def open_capture(self, index: int):
+        width, height, fps = self.mode
+        return SyntheticCapture(width, height, fps, self.realtime, self.noise)
+
+class ReplayBackend:
+    """Recorded video or image directory behind a fake USB device"""
+
+    def __init__(self, path: str, realtime: bool = True, loop: bool = True, fps: float = None,
+                 preload: bool = False, device: FakeUSBDevice = None):
+        self.path = path
+        self.realtime = realtime
+        self.loop = loop
+        self.fps = fps
+        self.preload = preload
+        self.mode = None  # Replayed frames keep their recorded size
+        self.device = device or FakeUSBDevice(product=f"Replay: {os.path.basename(os.path.normpath(path))}")
+
+    def find_device(self, vendor_id: int, product_id: int, **match):
+        return self.device
+
+    def find_video_index(self, device) -> int:
+        return 0
+
+    def device_strings(self, device) -> Optional[Tuple[str, str]]:
+        return _string_descriptors(device)
+
+    def open_capture(self, index: int):
+        return ReplayCapture(self.path, self.realtime, self.loop, self.fps, self.preload)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Burst Capture
+Grabs N consecutive frames at full sensor rate into preallocated shared
+memory, then encodes and saves them in parallel on a process pool
+"""
+
+import os
+import time
+import multiprocessing
+import cv2
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, Future, as_completed
+from multiprocessing import shared_memory
+from typing import Iterator, List, Optional, Tuple
+
+from driver.shared_frames import attach_shared_memory
+
+BURST_FORMATS = ('jpg', 'png', 'tiff', 'webp')
+
+def _imwrite_params(format: str, quality: int, png_compression: int) -> list:
+    if format == 'jpg':
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if format == 'webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, quality]
+    if format == 'png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, png_compression]
+    return []
+
+def _save_frame(shm_name: str, shape: tuple, index: int, path: str, params: list) -> str:
+    """Worker: encode one frame straight out of the shared burst buffer."""
+    shm = attach_shared_memory(shm_name)
+    try:
+        frames = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        ok = cv2.imwrite(path, frames[index], params)
+        del frames
+    finally:
+        shm.close()
+    if not ok:
+        raise IOError(f"Cannot write {path}")
+    return path
+
+def make_executor(workers: int = None) -> ProcessPoolExecutor:
+    """Create an encode pool that can be reused across bursts."""
+    return ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                               mp_context=multiprocessing.get_context('spawn'))
+
+class BurstJob:
+    """Frames of one burst being encoded in the background"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, frames: np.ndarray, timestamps: np.ndarray,
+                 futures: List[Future], executor: ProcessPoolExecutor, owns_executor: bool, grab_time: float):
+        self.frames = frames  # (n, height, width, 3) view of the burst buffer
+        self.timestamps = timestamps
+        self.futures = futures
+        self.grab_time = grab_time
+        self._shm = shm
+        self._executor = executor
+        self._owns_executor = owns_executor
+        self._closed = False
+
+    @property
+    def count(self) -> int:
+        return len(self.futures)
+
+    @property
+    def capture_fps(self) -> float:
+        """Rate at which the burst was grabbed from the sensor."""
+        span = float(self.timestamps[-1] - self.timestamps[0]) if self.count > 1 else 0.0
+        return (self.count - 1) / span if span > 0 else 0.0
+
+    def progress(self) -> Iterator[Tuple[int, int, str]]:
+        """Yield (completed, total, path) as each frame is written."""
+        for completed, future in enumerate(as_completed(self.futures), 1):
+            yield completed, self.count, future.result()
+
+    def wait(self) -> List[str]:
+        """Wait for all frames to be written and return their paths in capture order."""
+        try:
+            return [future.result() for future in self.futures]
+        finally:
+            self.close()
+
+    def close(self):
+        """Release the burst buffer (waits for outstanding writes)."""
+        if self._closed:
+            return
+        self._closed = True
+        for future in self.futures:
+            future.exception()
+
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+        self.frames = None
+        self._shm.close()
+        self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def grab_burst(driver, n: int) -> Optional[Tuple[shared_memory.SharedMemory, np.ndarray, np.ndarray]]:
+    """
+    Grab n consecutive frames into a preallocated shared buffer
+
+    Returns (shared block, frames view, timestamps), or None on failure.
+    """
+    if not driver.is_connected:
+        print("Microscope not connected.")
+        return None
+
+    seq = 0
+    if driver.grabber:
+        # Start from a grabbed frame so every timestamp is a grab timestamp
+        grabbed = driver.get_latest_frame() or driver.wait_for_next(0)
+        if grabbed is None:
+            print("Frame capture failed")
+            return None
+        first, first_timestamp, seq = grabbed.frame, grabbed.timestamp, grabbed.seq
+    else:
+        first = driver.capture_frame()
+        if first is None:
+            return None
+        first_timestamp = time.monotonic()
+
+    shape = (n,) + first.shape
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+    frames = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    timestamps = np.empty(n, dtype=np.float64)
+    frames[0] = first
+    timestamps[0] = first_timestamp
+
+    for i in range(1, n):
+        if driver.grabber:
+            # Every consecutive grabbed frame, copied out before the ring wraps
+            grabbed = driver.wait_for_next(seq, copy=False)
+            if grabbed is None:
+                break
+            seq = grabbed.seq
+            frames[i] = grabbed.frame
+            timestamps[i] = grabbed.timestamp
+            continue
+
+        if driver.passthrough:
+            frame = driver.capture_frame()
+            ret = frame is not None
+        else:
+            # Read straight into the burst buffer
+            ret, frame = driver.cap.read(frames[i])
+        if not ret or frame is None:
+            break
+        if frame is not frames[i]:
+            frames[i] = frame
+        timestamps[i] = time.monotonic()
+    else:
+        return shm, frames, timestamps
+
+    print("Burst capture failed")
+    del frames
+    shm.close()
+    shm.unlink()
+    return None
+
+def burst(driver, n: int, output_dir: str = '.', format: str = 'jpg', quality: int = 95,
+          png_compression: int = 1, workers: int = None, executor: ProcessPoolExecutor = None,
+          prefix: str = 'burst') -> Optional[BurstJob]:
+    """
+    Capture a burst and encode it in parallel
+
+    Args:
+        driver: Connected MicroscopeDriver
+        n: Number of frames
+        output_dir: Directory for the image files
+        format: 'jpg', 'png', 'tiff' or 'webp'
+        quality: JPEG/WebP quality (0-100)
+        png_compression: PNG compression level (0-9)
+        workers: Encode processes (defaults to the CPU count)
+        executor: Existing pool from make_executor() to reuse
+        prefix: File name prefix
+
+    Returns a BurstJob whose futures resolve to the written paths.
+    """
+    if format not in BURST_FORMATS:
+        raise ValueError(f"format must be one of {BURST_FORMATS}")
+    if n < 1:
+        raise ValueError("n must be at least 1")
+
+    start = time.monotonic()
+    grabbed = grab_burst(driver, n)
+    if grabbed is None:
+        return None
+    shm, frames, timestamps = grabbed
+    grab_time = time.monotonic() - start
+
+    os.makedirs(output_dir, exist_ok=True)
+    owns_executor = executor is None
+    if owns_executor:
+        executor = make_executor(workers)
+
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    params = _imwrite_params(format, quality, png_compression)
+    futures = [
+        executor.submit(_save_frame, shm.name, frames.shape, i,
+                        os.path.join(output_dir, f"{prefix}_{stamp}_{i:04d}.{format}"), params)
+        for i in range(n)
+    ]
+    return BurstJob(shm, frames, timestamps, futures, executor, owns_executor, grab_time)
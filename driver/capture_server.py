@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Microscope Capture Server
+Long-lived capture process that keeps the device open and serves frames
+over a length-prefixed binary protocol (stdin/stdout or Unix socket)
+
+Protocol (all integers big-endian):
+    Request:  opcode (u8), argument (u8), reserved (u16), payload length (u32), payload
+    Response: opcode (u8), status (u8), width (u16), height (u16), channels (u16),
+              timestamp in ms (u64), payload length (u32), payload
+
+    FRAME   - live JPEG frame, argument = JPEG quality (0 = server default, or
+              the adaptive controller's quality and scale with --adaptive)
+    CAPTURE - high-quality JPEG frame, argument = JPEG quality (0 = server default)
+              (in passthrough mode both forward the camera's own JPEG and
+              ignore the quality argument)
+    RAW     - raw BGR pixels, no encoding
+    STATUS  - JSON status document
+    FRAME_IF_CHANGED - like FRAME, but answers STATUS_UNCHANGED with an empty
+              payload while the scene matches the last frame sent on this
+              connection
+    QUIT    - stop serving this connection
+
+    On error the status byte is STATUS_ERROR and the payload is a UTF-8 message.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import struct
+import argparse
+import threading
+import subprocess
+import socketserver
+import cv2
+import numpy as np
+from typing import Optional, NamedTuple, BinaryIO
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.microscope_driver import MicroscopeDriver
+from driver.metrics import METRICS, start_metrics_server
+from driver.adaptive_quality import AdaptiveQuality, build_ladder
+from driver.jpeg_frame import is_jpeg_buffer, jpeg_dimensions
+from driver.change_detect import ChangeDetector
+
+OP_FRAME = 0x01
+OP_CAPTURE = 0x02
+OP_RAW = 0x03
+OP_STATUS = 0x04
+OP_FRAME_IF_CHANGED = 0x05
+OP_QUIT = 0xFF
+
+STATUS_OK = 0x00
+STATUS_ERROR = 0x01
+STATUS_UNCHANGED = 0x02
+
+REQUEST_HEADER = struct.Struct('!BBHI')
+RESPONSE_HEADER = struct.Struct('!BBHHHQI')
+
+DEFAULT_LIVE_QUALITY = 80
+DEFAULT_CAPTURE_QUALITY = 95
+
+class Response(NamedTuple):
+    """Decoded server response"""
+    opcode: int
+    status: int
+    width: int
+    height: int
+    channels: int
+    timestamp: int
+    payload: bytes
+
+def read_exact(stream: BinaryIO, size: int) -> Optional[bytes]:
+    """Read exactly size bytes, or return None on a clean EOF."""
+    if size == 0:
+        return b''
+
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise ConnectionError("Connection closed mid-message")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+def write_message(stream: BinaryIO, header: bytes, payload) -> None:
+    """Write a header and payload, then flush."""
+    stream.write(header)
+    if len(payload):
+        stream.write(payload)
+    stream.flush()
+
+def claim_stdio():
+    """
+    Take over stdin/stdout for the binary protocol
+
+    Anything printed afterwards (by Python code or native libraries) is
+    redirected to stderr so it cannot corrupt the protocol stream.
+    """
+    sys.stdout.flush()
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    return sys.stdin.buffer, protocol_out
+
+class CaptureServer:
+    """Serves frames from a single MicroscopeDriver to one or more clients"""
+
+    def __init__(self, driver: MicroscopeDriver, live_quality: int = DEFAULT_LIVE_QUALITY,
+                 capture_quality: int = DEFAULT_CAPTURE_QUALITY, adaptive: AdaptiveQuality = None,
+                 change_threshold: float = 6.0):
+        """
+        Initialize capture server
+
+        Args:
+            driver: Connected microscope driver
+            live_quality: Default JPEG quality for FRAME requests
+            capture_quality: Default JPEG quality for CAPTURE requests
+            adaptive: Controller choosing quality and scale for default FRAME
+                      requests from measured client throughput and latency;
+                      CAPTURE requests always use full quality
+            change_threshold: Signature difference (gray levels) that FRAME_IF_CHANGED
+                              treats as a changed scene
+        """
+        self.driver = driver
+        self.live_quality = live_quality
+        self.capture_quality = capture_quality
+        self.adaptive = adaptive
+        self.change_threshold = change_threshold
+        self.lock = threading.Lock()  # Guards the device and the counters below
+        self.start_time = time.monotonic()
+        self.frames_served = 0
+        self.errors = 0
+
+    def handle_request(self, opcode: int, argument: int, detector: ChangeDetector = None):
+        """
+        Process one request and return (header, payload)
+
+        detector holds the per-connection reference for FRAME_IF_CHANGED.
+        """
+        with METRICS.time('server_request'):
+            return self._dispatch(opcode, argument, detector)
+
+    def _dispatch(self, opcode: int, argument: int, detector: Optional[ChangeDetector]):
+        try:
+            if opcode == OP_FRAME_IF_CHANGED:
+                return self._live_frame(opcode, argument, detector)
+            if opcode == OP_FRAME and not argument and self.adaptive:
+                return self._live_frame(opcode, argument)
+            if opcode in (OP_FRAME, OP_CAPTURE):
+                default = self.live_quality if opcode == OP_FRAME else self.capture_quality
+                return self._encode_frame(opcode, argument or default)
+            if opcode == OP_RAW:
+                return self._raw_frame()
+            if opcode == OP_STATUS:
+                payload = json.dumps(self.get_status()).encode('utf-8')
+                return self._header(opcode, STATUS_OK, 0, 0, 0, len(payload)), payload
+            return self._error(opcode, f"Unknown opcode: 0x{opcode:02x}")
+        except Exception as e:
+            return self._error(opcode, str(e))
+
+    def get_status(self) -> dict:
+        """Return server and device status."""
+        width, height = self.driver.get_frame_size()
+        return {
+            'connected': self.driver.is_connected,
+            'device': self.driver.get_device_info(),
+            'width': width,
+            'height': height,
+            'frames_served': self.frames_served,
+            'errors': self.errors,
+            'uptime': round(time.monotonic() - self.start_time, 3),
+            'adaptive': self.adaptive.get_status() if self.adaptive else None,
+            'metrics': METRICS.snapshot()
+        }
+
+    def _grab(self):
+        """Capture a frame under the device lock."""
+        with self.lock:
+            frame = self.driver.capture_frame()
+        timestamp = int(time.time() * 1000)
+        return frame, timestamp
+
+    def _encode_frame(self, opcode: int, quality: int):
+        # In passthrough mode the device JPEG is forwarded without re-encoding
+        with self.lock:
+            jpeg = self.driver.capture_jpeg(int(quality))
+        timestamp = int(time.time() * 1000)
+        if jpeg is None:
+            return self._error(opcode, "Cannot capture frame")
+
+        with self.lock:
+            self.frames_served += 1
+        width, height = jpeg.size or (0, 0)
+        header = self._header(opcode, STATUS_OK, width, height, 3, len(jpeg.data), timestamp)
+        return header, jpeg.data
+
+    def _live_frame(self, opcode: int, quality: int, detector: ChangeDetector = None):
+        """Grab a buffer, skip it if unchanged, then encode it (adaptively for quality 0)."""
+        with self.lock:
+            if self.driver.grabber:
+                # Work straight from the ring; the slot stays valid for several frame periods
+                grabbed = self.driver.get_latest_frame(copy=False, decode=False) or \
+                    self.driver.wait_for_next(0, copy=False, decode=False)
+                frame = grabbed.frame if grabbed else None
+            else:
+                frame, _ = self.driver.capture_buffer()
+        timestamp = int(time.time() * 1000)
+        if frame is None:
+            return self._error(opcode, "Cannot capture frame")
+
+        if detector is not None and not detector.check(frame):
+            return self._header(opcode, STATUS_UNCHANGED, 0, 0, 0, 0, timestamp), b''
+
+        if not quality and self.adaptive:
+            data = self.adaptive.encode(frame)
+        elif is_jpeg_buffer(frame):
+            data = frame.tobytes()
+        else:
+            start = time.perf_counter_ns()
+            ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality or self.live_quality])
+            data = buffer.tobytes() if ok else None
+            METRICS.observe('jpeg_encode', start)
+        if data is None:
+            return self._error(opcode, "JPEG encoding failed")
+
+        with self.lock:
+            self.frames_served += 1
+        width, height = jpeg_dimensions(data) or (0, 0)
+        return self._header(opcode, STATUS_OK, width, height, 3, len(data), timestamp), data
+
+    def _raw_frame(self):
+        frame, timestamp = self._grab()
+        if frame is None:
+            return self._error(OP_RAW, "Cannot capture frame")
+
+        frame = np.ascontiguousarray(frame)
+        with self.lock:
+            self.frames_served += 1
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        header = self._header(OP_RAW, STATUS_OK, width, height, channels, frame.nbytes, timestamp)
+        return header, frame.data.cast('B')
+
+    def _error(self, opcode: int, message: str):
+        with self.lock:
+            self.errors += 1
+        payload = message.encode('utf-8')
+        return self._header(opcode, STATUS_ERROR, 0, 0, 0, len(payload)), payload
+
+    @staticmethod
+    def _header(opcode, status, width, height, channels, length, timestamp=0) -> bytes:
+        return RESPONSE_HEADER.pack(opcode, status, width, height, channels, timestamp, length)
+
+    def serve_stream(self, rfile: BinaryIO, wfile: BinaryIO):
+        """Serve requests from a byte stream pair until EOF or QUIT."""
+        detector = ChangeDetector(self.change_threshold)
+        while True:
+            header = read_exact(rfile, REQUEST_HEADER.size)
+            if header is None:
+                return
+
+            opcode, argument, _, length = REQUEST_HEADER.unpack(header)
+            # Requests currently carry no payload; skip it for forward compatibility
+            if length and read_exact(rfile, length) is None:
+                return
+
+            if opcode == OP_QUIT:
+                write_message(wfile, self._header(OP_QUIT, STATUS_OK, 0, 0, 0, 0), b'')
+                return
+
+            started = time.monotonic()
+            response_header, payload = self.handle_request(opcode, argument, detector)
+            write_message(wfile, response_header, payload)
+            if opcode in (OP_FRAME, OP_FRAME_IF_CHANGED) and not argument and self.adaptive:
+                # The client is waiting for this frame: service time is its lag
+                self.adaptive.record(time.monotonic() - started)
+
+    def serve_unix(self, path: str):
+        """Serve multiple clients on a Unix domain socket."""
+        if os.path.exists(path):
+            os.unlink(path)
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    server.serve_stream(self.rfile, self.wfile)
+                except (ConnectionError, BrokenPipeError):
+                    pass
+
+        with socketserver.ThreadingUnixStreamServer(path, Handler) as unix_server:
+            unix_server.daemon_threads = True
+            print(f"Capture server listening on {path}", file=sys.stderr)
+            try:
+                unix_server.serve_forever()
+            finally:
+                os.unlink(path)
+
+class CaptureClient:
+    """Client for CaptureServer"""
+
+    def __init__(self, rfile: BinaryIO, wfile: BinaryIO, process: subprocess.Popen = None, sock: socket.socket = None):
+        self.rfile = rfile
+        self.wfile = wfile
+        self.process = process
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    @classmethod
+    def spawn(cls, fake: bool = False, python: str = None, extra_args: list = None) -> 'CaptureClient':
+        """Start a capture server subprocess and talk to it over stdin/stdout."""
+        args = [python or sys.executable, os.path.abspath(__file__), '--stdio']
+        if fake:
+            args.append('--fake')
+        if extra_args:
+            args.extend(extra_args)
+
+        process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        return cls(process.stdout, process.stdin, process=process)
+
+    @classmethod
+    def connect_unix(cls, path: str) -> 'CaptureClient':
+        """Connect to a capture server listening on a Unix socket."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(path)
+        return cls(sock.makefile('rb'), sock.makefile('wb'), sock=sock)
+
+    def request(self, opcode: int, argument: int = 0) -> Response:
+        """Send a request and wait for its response."""
+        with self.lock:
+            write_message(self.wfile, REQUEST_HEADER.pack(opcode, argument, 0, 0), b'')
+            header = read_exact(self.rfile, RESPONSE_HEADER.size)
+            if header is None:
+                raise ConnectionError("Capture server closed the connection")
+
+            fields = RESPONSE_HEADER.unpack(header)
+            payload = read_exact(self.rfile, fields[-1]) or b''
+            return Response(*fields[:-1], payload)
+
+    def _checked(self, opcode: int, argument: int = 0) -> Optional[Response]:
+        return self._checked_response(self.request(opcode, argument))
+
+    @staticmethod
+    def _checked_response(response: Response) -> Optional[Response]:
+        if response.status != STATUS_OK:
+            print(f"Capture server error: {response.payload.decode('utf-8', 'replace')}")
+            return None
+        return response
+
+    def get_frame(self, quality: int = 0) -> Optional[Response]:
+        """Fetch a live JPEG frame."""
+        return self._checked(OP_FRAME, quality)
+
+    def get_frame_if_changed(self, quality: int = 0) -> Optional[Response]:
+        """Fetch a live JPEG frame; status is STATUS_UNCHANGED (no payload) for a still scene."""
+        response = self.request(OP_FRAME_IF_CHANGED, quality)
+        if response.status == STATUS_UNCHANGED:
+            return response
+        return self._checked_response(response)
+
+    def capture(self, quality: int = 0) -> Optional[Response]:
+        """Fetch a high-quality JPEG frame."""
+        return self._checked(OP_CAPTURE, quality)
+
+    def get_raw_frame(self) -> Optional[np.ndarray]:
+        """Fetch an unencoded BGR frame."""
+        response = self._checked(OP_RAW)
+        if response is None:
+            return None
+
+        shape = (response.height, response.width, response.channels)
+        return np.frombuffer(response.payload, dtype=np.uint8).reshape(shape)
+
+    def get_status(self) -> Optional[dict]:
+        """Fetch server status."""
+        response = self._checked(OP_STATUS)
+        if response is None:
+            return None
+        return json.loads(response.payload.decode('utf-8'))
+
+    def close(self):
+        """Close the connection and stop a spawned server."""
+        try:
+            self.request(OP_QUIT)
+        except (ConnectionError, BrokenPipeError, OSError, ValueError):
+            pass
+
+        for stream in (self.wfile, self.rfile):
+            try:
+                stream.close()
+            except OSError:
+                pass
+
+        if self.sock:
+            self.sock.close()
+        if self.process:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def main():
+    """Main function - run capture server"""
+    parser = argparse.ArgumentParser(description="Microscope capture server")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--stdio', action='store_true', help="Serve one client over stdin/stdout")
+    mode.add_argument('--socket', metavar='PATH', help="Serve clients on a Unix domain socket")
+    parser.add_argument('--fake', action='store_true', help="Use a synthetic camera instead of the device")
+    parser.add_argument('--device', type=int, help="Video device index")
+    parser.add_argument('--threaded', action='store_true', help="Grab frames on a background thread")
+    parser.add_argument('--passthrough', action='store_true', help="Forward the camera's MJPEG frames without re-encoding")
+    parser.add_argument('--quality', type=int, default=DEFAULT_LIVE_QUALITY, help="Live JPEG quality")
+    parser.add_argument('--capture-quality', type=int, default=DEFAULT_CAPTURE_QUALITY, help="Capture JPEG quality")
+    parser.add_argument('--adaptive', action='store_true', help="Adapt live quality and scale to client throughput")
+    parser.add_argument('--target-fps', type=float, default=15.0, help="Live frame rate the adaptive controller holds")
+    parser.add_argument('--max-latency', type=float, default=0.15, help="Live frame latency budget in seconds")
+    parser.add_argument('--change-threshold', type=float, default=6.0,
+                        help="Gray-level change FRAME_IF_CHANGED treats as a new scene")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus metrics on this local port")
+    args = parser.parse_args()
+
+    # Driver output must never reach the stdio protocol stream
+    if args.stdio:
+        rfile, wfile = claim_stdio()
+
+    if args.fake:
+        from driver.fake_camera import FakeMicroscopeDriver
+        driver = FakeMicroscopeDriver(threaded=args.threaded, passthrough=args.passthrough)
+    else:
+        driver = MicroscopeDriver(threaded=args.threaded, passthrough=args.passthrough)
+        if args.device is not None:
+            driver.video_device_index = args.device
+
+    if not driver.connect():
+        print("Failed to connect to microscope.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.metrics_port is not None:
+        start_metrics_server(args.metrics_port)
+
+    adaptive = None
+    if args.adaptive:
+        # Clients poll for frames, so only quality and scale apply; frame skip is theirs
+        adaptive = AdaptiveQuality(min(args.target_fps, driver.frame_rate), args.max_latency,
+                                   build_ladder(max_quality=args.quality, max_skip=0))
+    server = CaptureServer(driver, args.quality, args.capture_quality, adaptive, args.change_threshold)
+    try:
+        if args.stdio:
+            server.serve_stream(rfile, wfile)
+        else:
+            server.serve_unix(args.socket)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        driver.disconnect()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Change Detection
+Cheap test for whether a frame differs from the last one sent: frames are
+reduced to a small block-averaged grayscale signature and compared with a
+noise threshold, so a still slide stops costing conversion, encoding and
+transport
+"""
+
+import time
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+from driver.jpeg_frame import is_jpeg_buffer
+from driver.metrics import METRICS
+
+SIGNATURE_SIZE = (32, 24)
+
+class ChangeDetector:
+    """Compares frame signatures against the last frame reported as changed"""
+
+    def __init__(self, threshold: float = 6.0, min_area: float = 0.002, size: Tuple[int, int] = SIGNATURE_SIZE,
+                 refresh: float = None):
+        """
+        Initialize change detector
+
+        Args:
+            threshold: Gray-level difference of a signature cell that counts as change
+                       (block averaging has already removed most sensor noise)
+            min_area: Fraction of signature cells that must change
+            size: Signature (width, height)
+            refresh: Report a frame as changed at least this often in seconds
+                     (None never forces one)
+        """
+        self.threshold = threshold
+        self.min_area = min_area
+        self.size = size
+        self.refresh = refresh
+        self.reset()
+
+    def reset(self):
+        """Forget the reference so the next frame counts as changed."""
+        self._reference = None
+        self._reference_time = 0.0
+        self.score = 0.0  # Fraction of cells over the threshold in the last check
+        self.frames_changed = 0
+        self.frames_unchanged = 0
+
+    def signature(self, frame: np.ndarray) -> Optional[np.ndarray]:
+        """Small blurred grayscale thumbnail of a BGR/grayscale frame or JPEG buffer."""
+        if frame is None:
+            return None
+        if is_jpeg_buffer(frame):
+            # The decoder's 1/8 scale path skips most of the IDCT work
+            gray = cv2.imdecode(frame.reshape(-1), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+            if gray is None:
+                return None
+        elif frame.ndim == 3:
+            # Subsample before color conversion; the area resize averages anyway
+            step = max(1, min(frame.shape[1] // (self.size[0] * 4), frame.shape[0] // (self.size[1] * 4)))
+            gray = cv2.cvtColor(np.ascontiguousarray(frame[::step, ::step]), cv2.COLOR_BGR2GRAY)
+        else:
+            gray = frame
+        small = cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def check(self, frame: np.ndarray, now: float = None) -> bool:
+        """
+        Return True if the frame should be sent
+
+        A frame that is reported as changed becomes the new reference, so
+        slow drift accumulates until it crosses the threshold.
+        """
+        current = self.signature(frame)
+        if current is None:
+            return True
+
+        now = time.monotonic() if now is None else now
+        changed = self._reference is None or self._reference.shape != current.shape
+        if not changed:
+            diff = cv2.absdiff(current, self._reference)
+            self.score = np.count_nonzero(diff > self.threshold) / diff.size
+            changed = self.score >= self.min_area
+        if not changed and self.refresh is not None and now - self._reference_time >= self.refresh:
+            changed = True
+
+        if changed:
+            self._reference = current
+            self._reference_time = now
+            self.frames_changed += 1
+        else:
+            self.frames_unchanged += 1
+            METRICS.inc('frames_unchanged')
+        return changed
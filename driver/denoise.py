@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Temporal Denoiser
+Running mean / exponential moving average of consecutive frames in a
+preallocated float32 accumulator, restarted automatically when the scene moves
+"""
+
+import cv2
+import numpy as np
+from typing import Optional
+
+DENOISE_MODES = ('mean', 'ema')
+
+class TemporalDenoiser:
+    """In-place temporal averaging of a frame stream"""
+
+    def __init__(self, mode: str = 'ema', alpha: float = 0.2, max_frames: int = None,
+                 motion_threshold: float = 20.0, motion_scale: int = 16):
+        """
+        Initialize denoiser
+
+        Args:
+            mode: 'mean' (equal weights over all frames so far, becoming an
+                  exponential moving average with weight 1/max_frames once
+                  max_frames is reached) or 'ema' (exponential moving average
+                  with weight alpha)
+            alpha: Weight of the newest frame in 'ema' mode
+            max_frames: Frame count after which 'mean' mode stops growing its
+                        window and decays like an EMA (None for unbounded);
+                        no frames are kept, so this is not a sliding window
+            motion_threshold: Largest block-mean difference (0-255) between the
+                              new frame and the current average before the
+                              average is restarted (None disables motion reset)
+            motion_scale: Block size of the motion comparison; blocks average
+                          away sensor noise so only real changes trigger a reset
+        """
+        if mode not in DENOISE_MODES:
+            raise ValueError(f"mode must be one of {DENOISE_MODES}")
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+
+        self.mode = mode
+        self.alpha = alpha
+        self.max_frames = max_frames
+        self.motion_threshold = motion_threshold
+        self.motion_scale = motion_scale
+
+        self.count = 0  # Frames in the current average
+        self.resets = 0  # Restarts caused by motion
+        self._shape = None
+
+    def _allocate(self, frame: np.ndarray):
+        """Buffers for one frame shape, reused for every following frame."""
+        self._shape = frame.shape
+        self._acc = np.zeros(frame.shape, dtype=np.float32)
+        self._out = np.zeros(frame.shape, dtype=np.uint8)
+        small = (max(1, frame.shape[1] // self.motion_scale), max(1, frame.shape[0] // self.motion_scale))
+        self._small_size = small
+        self._small_frame = np.zeros((small[1], small[0]) + frame.shape[2:], dtype=np.uint8)
+        self._small_out = np.zeros_like(self._small_frame)
+        self._small_diff = np.zeros_like(self._small_frame)
+
+    def reset(self):
+        """Drop the current average; the next frame starts a new one."""
+        self.count = 0
+
+    def _moved(self, frame: np.ndarray) -> bool:
+        cv2.resize(frame, self._small_size, dst=self._small_frame, interpolation=cv2.INTER_AREA)
+        cv2.resize(self._out, self._small_size, dst=self._small_out, interpolation=cv2.INTER_AREA)
+        cv2.absdiff(self._small_frame, self._small_out, dst=self._small_diff)
+        _, max_diff, _, _ = cv2.minMaxLoc(self._small_diff.reshape(self._small_diff.shape[0], -1))
+        return max_diff > self.motion_threshold
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Add a frame and return the denoised result
+
+        The returned array is an internal buffer overwritten by the next
+        call; copy it if it must be kept.
+        """
+        if frame.shape != self._shape:
+            self._allocate(frame)
+            self.count = 0
+
+        if self.count and self.motion_threshold is not None and self._moved(frame):
+            self.count = 0
+            self.resets += 1
+
+        if self.count == 0:
+            np.copyto(self._acc, frame)
+            self.count = 1
+        else:
+            self.count += 1
+            # Running mean is an EMA with weight 1/n; EMA mode warms up the same way
+            if self.mode == 'mean':
+                weight = 1.0 / (min(self.count, self.max_frames) if self.max_frames else self.count)
+            else:
+                weight = max(self.alpha, 1.0 / self.count)
+            cv2.accumulateWeighted(frame, self._acc, weight)
+
+        cv2.convertScaleAbs(self._acc, dst=self._out)
+        return self._out
+
+    @property
+    def result(self) -> Optional[np.ndarray]:
+        """Latest denoised frame (internal buffer), or None before the first update."""
+        return self._out if self.count else None
+
+def capture_averaged(driver, n: int = 8, motion_threshold: float = None) -> Optional[np.ndarray]:
+    """
+    Capture n consecutive frames and return their mean
+
+    In threaded mode every grabbed frame is used; otherwise frames are read
+    synchronously. Motion reset is off by default so all n frames count.
+    """
+    if not driver.is_connected:
+        print("Microscope not connected.")
+        return None
+
+    denoiser = TemporalDenoiser('mean', motion_threshold=motion_threshold)
+    seq = driver.grabber.latest_seq if driver.grabber else 0
+    for _ in range(n):
+        if driver.grabber:
+            grabbed = driver.wait_for_next(seq, copy=False)
+            if grabbed is None:
+                break
+            seq, frame = grabbed.seq, grabbed.frame
+        else:
+            frame = driver.capture_frame()
+            if frame is None:
+                break
+        denoiser.update(frame)
+
+    if denoiser.count == 0:
+        print("Frame capture failed")
+        return None
+    return denoiser.result.copy()
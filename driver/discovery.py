@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Device Discovery
+Finds USB devices and their /dev/videoN nodes by reading sysfs directly:
+one pass over /sys/bus/usb/devices and /sys/class/video4linux, no device
+is opened and no string descriptor is requested from the hardware
+"""
+
+import os
+import sys
+import argparse
+import threading
+from typing import List, Optional, NamedTuple, Tuple
+
+SYSFS_ROOT = '/sys'
+USB_DEVICES = os.path.join('bus', 'usb', 'devices')
+VIDEO_CLASS = os.path.join('class', 'video4linux')
+
+class UsbCamera(NamedTuple):
+    """A USB device as described by sysfs"""
+    device_id: str  # sysfs name: bus-port path, e.g. "1-4.2"
+    bus: int
+    address: int
+    port_numbers: Tuple[int, ...]
+    vendor_id: int
+    product_id: int
+    manufacturer: str
+    product: str
+    serial: str
+    video_index: Optional[int]  # Capture node (/dev/videoN), None if not a video device
+    video_nodes: Tuple[int, ...]  # Every video4linux node of the device
+
+def _read(path: str, default: str = '') -> str:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return default
+
+def _listing(path: str) -> Tuple[Tuple[str, int], ...]:
+    """Names and inode numbers of a directory; changes on any (re-)enumeration."""
+    try:
+        with os.scandir(path) as entries:
+            return tuple(sorted((entry.name, entry.inode()) for entry in entries))
+    except OSError:
+        return ()
+
+class DeviceDiscovery:
+    """Cached sysfs scan, refreshed only when the device directories change"""
+
+    def __init__(self, root: str = SYSFS_ROOT):
+        """
+        Initialize discovery
+
+        Args:
+            root: sysfs mount point (a fake tree in tests)
+        """
+        self.root = root
+        self._lock = threading.Lock()
+        self._key = None
+        self._devices: List[UsbCamera] = []
+
+    @property
+    def available(self) -> bool:
+        """Whether this system exposes USB devices in sysfs."""
+        return os.path.isdir(os.path.join(self.root, USB_DEVICES))
+
+    def scan(self, refresh: bool = False) -> List[UsbCamera]:
+        """
+        Every USB device with its video nodes
+
+        The result is cached and reused while the entries of both sysfs
+        directories are unchanged; plugging, unplugging or re-enumerating a
+        device replaces its entries and triggers a fresh scan.
+        """
+        usb_dir = os.path.join(self.root, USB_DEVICES)
+        video_dir = os.path.join(self.root, VIDEO_CLASS)
+        key = (_listing(usb_dir), _listing(video_dir))
+        with self._lock:
+            if refresh or key != self._key:
+                self._devices = self._scan(usb_dir, video_dir, key)
+                self._key = key
+            return list(self._devices)
+
+    @staticmethod
+    def _video_nodes(video_dir: str, names) -> dict:
+        """Map USB device names to their video node numbers (capture node first)."""
+        nodes = {}
+        for name in names:
+            if not name.startswith('video') or not name[5:].isdigit():
+                continue
+            node = os.path.join(video_dir, name)
+            # The device link points at the USB interface, e.g. .../1-4/1-4:1.0
+            interface = os.path.basename(os.path.realpath(os.path.join(node, 'device')))
+            owner = interface.split(':')[0]
+            # UVC exposes a capture node (index 0) and a metadata node
+            index = _read(os.path.join(node, 'index'), '0')
+            rank = int(index) if index.isdigit() else 0
+            nodes.setdefault(owner, []).append((rank, int(name[5:])))
+        return {owner: tuple(number for _, number in sorted(found)) for owner, found in nodes.items()}
+
+    @classmethod
+    def _scan(cls, usb_dir: str, video_dir: str, key) -> List[UsbCamera]:
+        usb_names, video_names = ([name for name, _ in listing] for listing in key)
+        video_nodes = cls._video_nodes(video_dir, video_names)
+
+        devices = []
+        for name in usb_names:
+            if ':' in name:
+                continue  # Interface, not a device
+            path = os.path.join(usb_dir, name)
+            vendor = _read(os.path.join(path, 'idVendor'))
+            product_id = _read(os.path.join(path, 'idProduct'))
+            if not vendor or not product_id:
+                continue
+
+            ports = ()
+            if '-' in name:
+                ports = tuple(int(p) for p in name.split('-', 1)[1].split('.') if p.isdigit())
+            nodes = video_nodes.get(name, ())
+            devices.append(UsbCamera(
+                device_id=name,
+                bus=int(_read(os.path.join(path, 'busnum'), '0')),
+                address=int(_read(os.path.join(path, 'devnum'), '0')),
+                port_numbers=ports,
+                vendor_id=int(vendor, 16),
+                product_id=int(product_id, 16),
+                manufacturer=_read(os.path.join(path, 'manufacturer')),
+                product=_read(os.path.join(path, 'product')),
+                serial=_read(os.path.join(path, 'serial')),
+                video_index=nodes[0] if nodes else None,
+                video_nodes=nodes
+            ))
+        return devices
+
+    def find(self, vendor_id: int = None, product_id: int = None, bus: int = None,
+             address: int = None) -> List[UsbCamera]:
+        """Devices matching every given field."""
+        return [device for device in self.scan()
+                if (vendor_id is None or device.vendor_id == vendor_id)
+                and (product_id is None or device.product_id == product_id)
+                and (bus is None or device.bus == bus)
+                and (address is None or device.address == address)]
+
+    def find_video_index(self, vendor_id: int = None, product_id: int = None, bus: int = None,
+                         address: int = None) -> Optional[int]:
+        """Capture node of the first matching video device."""
+        for device in self.find(vendor_id, product_id, bus, address):
+            if device.video_index is not None:
+                return device.video_index
+        return None
+
+    def is_present(self, vendor_id: int, product_id: int) -> bool:
+        """Whether a device with this VID:PID is plugged in."""
+        return bool(self.find(vendor_id, product_id))
+
+# Shared cache for the driver, backends and manager
+DISCOVERY = DeviceDiscovery()
+
+def main():
+    """Main function - list USB devices or check for one"""
+    parser = argparse.ArgumentParser(description="List USB devices and their video nodes from sysfs")
+    parser.add_argument('--check', metavar='VID:PID', help="Print CONNECTED or DISCONNECTED for one device")
+    parser.add_argument('--video', action='store_true', help="Only list devices with video nodes")
+    parser.add_argument('--root', default=SYSFS_ROOT, help="sysfs mount point")
+    args = parser.parse_args()
+
+    discovery = DeviceDiscovery(args.root)
+    if not discovery.available:
+        print(f"No USB devices in {args.root} (sysfs not available)")
+        sys.exit(1)
+
+    if args.check:
+        vendor, product = (int(part, 16) for part in args.check.split(':'))
+        print(f"CONNECTED:{vendor:04x}:{product:04x}" if discovery.is_present(vendor, product) else "DISCONNECTED")
+        return
+
+    for device in discovery.scan():
+        if args.video and device.video_index is None:
+            continue
+        nodes = ', '.join(f"/dev/video{n}" for n in device.video_nodes) or '-'
+        print(f"{device.device_id:<10} {device.vendor_id:04x}:{device.product_id:04x}  "
+              f"bus {device.bus:03d} addr {device.address:03d}  {nodes:<24} "
+              f"{device.manufacturer} {device.product}".rstrip())
+
+if __name__ == "__main__":
+    main()
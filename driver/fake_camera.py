@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""
+Fake Microscope Camera
+Driver preconfigured with the simulated backend, used to run the driver
+stack without hardware
+"""
+
+from driver.microscope_driver import MicroscopeDriver
+from driver.backends import SimulatedBackend, SyntheticCapture
+
+# Older name of the synthetic capture
+FakeCapture = SyntheticCapture
+
+class FakeMicroscopeDriver(MicroscopeDriver):
+    """Microscope driver backed by a synthetic sensor and a fake USB device"""
+
+    def __init__(self, width: int = 640, height: int = 480, fps: float = 30.0, realtime: bool = True,
+                 noise: int = 16, **kwargs):
+        kwargs.setdefault('backend', SimulatedBackend(width, height, fps, realtime, noise))
+        super().__init__(**kwargs)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Focus Meter
+Live focus score (variance of Laplacian or Tenengrad) on a downsampled
+region of interest, with peak-hold for manual focusing
+"""
+
+import time
+import threading
+import cv2
+import numpy as np
+from typing import NamedTuple, Tuple
+
+from driver.jpeg_frame import is_jpeg_buffer
+
+FOCUS_METHODS = ('laplacian', 'tenengrad')
+
+class FocusReading(NamedTuple):
+    """Focus score of one frame"""
+    seq: int  # Frame sequence number (0 if unknown)
+    timestamp: float  # Capture time of the frame
+    score: float
+    peak: float  # Highest score since the peak was reset / released
+
+    @property
+    def relative(self) -> float:
+        """Score as a fraction of the held peak (1.0 = at best focus seen)."""
+        return self.score / self.peak if self.peak > 0 else 0.0
+
+def focus_score(frame: np.ndarray, method: str = 'laplacian', roi: Tuple[float, float, float, float] = None,
+                max_width: int = 160) -> float:
+    """
+    Focus score of a frame region
+
+    Args:
+        frame: BGR or grayscale frame
+        method: 'laplacian' (variance of Laplacian) or 'tenengrad' (mean squared Sobel gradient)
+        roi: (x, y, width, height) as fractions of the frame (default: central half)
+        max_width: Region is downsampled to at most this width before scoring
+    """
+    height, width = frame.shape[:2]
+    x, y, w, h = roi or (0.25, 0.25, 0.5, 0.5)
+    x0, y0 = int(x * width), int(y * height)
+    region = frame[y0:y0 + max(1, int(h * height)), x0:x0 + max(1, int(w * width))]
+
+    if region.shape[1] > max_width:
+        scale = max_width / region.shape[1]
+        region = cv2.resize(region, (max_width, max(1, int(region.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+    if region.ndim == 3:
+        region = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+
+    if method == 'laplacian':
+        _, std = cv2.meanStdDev(cv2.Laplacian(region, cv2.CV_32F))
+        return float(std[0, 0] ** 2)
+    if method == 'tenengrad':
+        gx = cv2.Sobel(region, cv2.CV_32F, 1, 0)
+        gy = cv2.Sobel(region, cv2.CV_32F, 0, 1)
+        return float(cv2.mean(gx * gx + gy * gy)[0])
+    raise ValueError(f"method must be one of {FOCUS_METHODS}")
+
+class FocusMeter:
+    """Focus score with peak-hold, usable inline or as a background service"""
+
+    def __init__(self, method: str = 'laplacian', roi: Tuple[float, float, float, float] = None,
+                 max_width: int = 160, hold: float = None):
+        """
+        Initialize focus meter
+
+        Args:
+            method: 'laplacian' or 'tenengrad'
+            roi: (x, y, width, height) fractions of the frame to score
+            max_width: Downsampled region width
+            hold: Seconds the peak is held before it is released to the
+                  current score (None holds until reset_peak())
+        """
+        if method not in FOCUS_METHODS:
+            raise ValueError(f"method must be one of {FOCUS_METHODS}")
+
+        self.method = method
+        self.roi = roi
+        self.max_width = max_width
+        self.hold = hold
+
+        self.peak = 0.0
+        self._peak_time = 0.0
+        self.latest = None  # Most recent FocusReading
+        self.on_reading = None  # Optional callable(FocusReading) for the service thread
+
+        self._thread = None
+        self._running = False
+
+    def reset_peak(self):
+        """Forget the held peak."""
+        self.peak = 0.0
+
+    def update(self, frame: np.ndarray, seq: int = 0, timestamp: float = None) -> FocusReading:
+        """Score a frame and update the peak-hold."""
+        now = time.monotonic()
+        score = focus_score(frame, self.method, self.roi, self.max_width)
+        if score >= self.peak or (self.hold is not None and now - self._peak_time > self.hold):
+            self.peak = score
+            self._peak_time = now
+
+        reading = FocusReading(seq, now if timestamp is None else timestamp, score, self.peak)
+        self.latest = reading
+        return reading
+
+    def status(self, frame: np.ndarray = None, bar_width: int = 20) -> str:
+        """
+        One-line readout with a bar relative to the peak
+
+        With a frame the frame is scored first, so this can be passed
+        directly as the status callback of terminal_preview.run_live.
+        """
+        reading = self.update(frame) if frame is not None else self.latest
+        if reading is None:
+            return "focus --"
+        filled = int(round(min(reading.relative, 1.0) * bar_width))
+        return f"focus {reading.score:8.1f}  peak {reading.peak:8.1f}  [{'#' * filled}{'-' * (bar_width - filled)}]"
+
+    def start(self, driver) -> bool:
+        """
+        Score every grabbed frame of a threaded driver on a background thread
+
+        The meter reads from the grabber ring without copying and skips
+        frames when it falls behind, so it never slows acquisition.
+        """
+        if self._running:
+            return True
+        if not driver.grabber:
+            print("Focus meter service requires threaded acquisition.")
+            return False
+
+        self._running = True
+        self._thread = threading.Thread(target=self._service_loop, args=(driver,), name="FocusMeter", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        """Stop the background service."""
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def _service_loop(self, driver):
+        seq = 0
+        while self._running and driver.grabber:
+            grabbed = driver.grabber.wait_for_next(seq, timeout=0.5, copy=False)
+            if grabbed is None:
+                continue
+            seq = grabbed.seq
+            if is_jpeg_buffer(grabbed.frame):
+                # Passthrough JPEG buffer: decode before scoring
+                frame = cv2.imdecode(grabbed.frame.reshape(-1), cv2.IMREAD_REDUCED_COLOR_2)
+                if frame is None:
+                    continue
+            else:
+                frame = grabbed.frame
+            reading = self.update(frame, seq, grabbed.timestamp)
+            if self.on_reading:
+                self.on_reading(reading)
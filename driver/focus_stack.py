@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Focus Stacking
+Merges frames taken at different focus positions into one extended depth
+of field image: translation alignment by phase correlation, per-pixel
+Laplacian energy sharpness, and Laplacian pyramid fusion over image strips
+processed in parallel
+"""
+
+import os
+import sys
+import glob
+import argparse
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+class StackResult(NamedTuple):
+    """Fused image and per-pixel source frame"""
+    image: np.ndarray
+    depth: np.ndarray  # Index of the sharpest frame at each pixel (uint8/uint16)
+    shifts: List[Tuple[float, float]]  # (dx, dy) applied to each frame
+
+def sharpness_map(gray: np.ndarray, window: int = 5) -> np.ndarray:
+    """Local Laplacian energy of a grayscale frame (float32)."""
+    lap = cv2.Laplacian(gray, cv2.CV_32F, ksize=3)
+    cv2.multiply(lap, lap, dst=lap)
+    return cv2.boxFilter(lap, -1, (window, window), dst=lap)
+
+def _estimate_shift(reference: np.ndarray, gray: np.ndarray, window: np.ndarray, scale: float) -> Tuple[float, float]:
+    (dx, dy), _ = cv2.phaseCorrelate(reference, gray, window)
+    return dx / scale, dy / scale
+
+def align_frames(frames: Sequence[np.ndarray], reference: int = None, scale: float = 0.5,
+                 executor: ThreadPoolExecutor = None) -> Tuple[List[np.ndarray], List[Tuple[float, float]]]:
+    """
+    Translate frames onto a reference frame
+
+    Shifts are estimated by phase correlation on downscaled grayscale copies.
+
+    Returns (aligned frames, (dx, dy) shift of each frame).
+    """
+    if reference is None:
+        reference = len(frames) // 2
+
+    def prepare(frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if scale != 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return np.float32(gray)
+
+    map_ = executor.map if executor else map
+    grays = list(map_(prepare, frames))
+    window = cv2.createHanningWindow(grays[0].shape[::-1], cv2.CV_32F)
+    shifts = list(map_(lambda gray: _estimate_shift(grays[reference], gray, window, scale), grays))
+
+    def warp(args):
+        frame, (dx, dy) = args
+        if abs(dx) < 0.5 and abs(dy) < 0.5:
+            return frame
+        matrix = np.float32([[1, 0, -dx], [0, 1, -dy]])
+        return cv2.warpAffine(frame, matrix, (frame.shape[1], frame.shape[0]), borderMode=cv2.BORDER_REFLECT)
+
+    return list(map_(warp, zip(frames, shifts))), shifts
+
+def _laplacian_pyramid(image: np.ndarray, levels: int) -> List[np.ndarray]:
+    pyramid = []
+    current = image
+    for _ in range(levels):
+        down = cv2.pyrDown(current)
+        up = cv2.pyrUp(down, dstsize=(current.shape[1], current.shape[0]))
+        pyramid.append(cv2.subtract(current, up))
+        current = down
+    pyramid.append(current)
+    return pyramid
+
+def _collapse(pyramid: List[np.ndarray]) -> np.ndarray:
+    image = pyramid[-1]
+    for level in reversed(pyramid[:-1]):
+        image = cv2.pyrUp(image, dstsize=(level.shape[1], level.shape[0]))
+        cv2.add(image, level, dst=image)
+    return image
+
+def _fuse_strip(frames: Sequence[np.ndarray], grays: Sequence[np.ndarray], top: int, bottom: int,
+                margin: int, levels: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Fuse rows [top, bottom) using a margin of context on each side."""
+    height = frames[0].shape[0]
+    lo = max(0, top - margin)
+    hi = min(height, bottom + margin)
+
+    # Sharpest frame per pixel, tracked in place
+    best = sharpness_map(grays[0][lo:hi])
+    depth = np.zeros(best.shape, dtype=np.uint16)
+    for i in range(1, len(frames)):
+        score = sharpness_map(grays[i][lo:hi])
+        mask = score > best
+        np.copyto(best, score, where=mask)
+        depth[mask] = i
+
+    # Blend each frame's Laplacian pyramid with the Gaussian pyramid of its selection mask
+    fused = None
+    for i in np.unique(depth):
+        weight = np.float32(depth == i)
+        weights = [weight]
+        for _ in range(levels):
+            weights.append(cv2.pyrDown(weights[-1]))
+        pyramid = _laplacian_pyramid(np.float32(frames[i][lo:hi]), levels)
+        if fused is None:
+            fused = [np.zeros_like(level) for level in pyramid]
+        for acc, level, w in zip(fused, pyramid, weights):
+            acc += level * w[..., None]
+
+    image = np.clip(_collapse(fused), 0, 255).astype(np.uint8)
+    return image[top - lo:bottom - lo], depth[top - lo:bottom - lo]
+
+def focus_stack(frames: Sequence[np.ndarray], align: bool = True, levels: int = 4, strips: int = None,
+                workers: int = None) -> Optional[StackResult]:
+    """
+    Fuse a focus series into an extended depth of field image
+
+    Args:
+        frames: BGR frames of one scene at different focus positions
+        align: Correct small translations between frames first
+        levels: Laplacian pyramid levels
+        strips: Horizontal strips fused independently (default: one per worker)
+        workers: Threads used (OpenCV releases the GIL; defaults to the CPU count)
+
+    Returns a StackResult, or None if frames is empty.
+    """
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return None
+
+    workers = workers or os.cpu_count() or 1
+    strips = strips or workers
+    height = frames[0].shape[0]
+    # Context needed so pyramid filtering at the strip edges matches a full-frame blend
+    margin = 2 ** (levels + 1)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        shifts = [(0.0, 0.0)] * len(frames)
+        if align and len(frames) > 1:
+            frames, shifts = align_frames(frames, executor=executor)
+        grays = list(executor.map(lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), frames))
+
+        bounds = np.linspace(0, height, strips + 1).astype(int)
+        parts = list(executor.map(lambda b: _fuse_strip(frames, grays, b[0], b[1], margin, levels),
+                                  zip(bounds[:-1], bounds[1:])))
+
+    image = np.vstack([part[0] for part in parts])
+    depth = np.vstack([part[1] for part in parts])
+    if len(frames) <= 256:
+        depth = depth.astype(np.uint8)
+    return StackResult(image, depth, shifts)
+
+def capture_stack(driver, count: int, prompt: bool = False) -> List[np.ndarray]:
+    """
+    Capture a focus series with capture_frame
+
+    Args:
+        driver: Connected MicroscopeDriver
+        count: Number of frames
+        prompt: Wait for Enter before each frame (manual focus between shots)
+    """
+    frames = []
+    for i in range(count):
+        if prompt:
+            print(f"Set focus for frame {i + 1}/{count} and press Enter: ", end="")
+            input()
+        frame = driver.capture_frame()
+        if frame is not None:
+            frames.append(frame)
+    return frames
+
+def main():
+    """Stack images from files or from the microscope."""
+    parser = argparse.ArgumentParser(description="Microscope focus stacking")
+    parser.add_argument('output', help="Fused image path")
+    parser.add_argument('inputs', nargs='*', help="Input images (glob patterns allowed)")
+    parser.add_argument('--capture', type=int, help="Capture this many frames, refocusing between them")
+    parser.add_argument('--fake', action='store_true', help="Use the synthetic camera with --capture")
+    parser.add_argument('--levels', type=int, default=4, help="Pyramid levels")
+    parser.add_argument('--no-align', action='store_true', help="Skip alignment")
+    parser.add_argument('--depth', help="Also save the depth map to this path")
+    args = parser.parse_args()
+
+    if args.capture:
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        if args.fake:
+            from driver.fake_camera import FakeMicroscopeDriver
+            driver = FakeMicroscopeDriver()
+        else:
+            from driver.microscope_driver import MicroscopeDriver
+            driver = MicroscopeDriver()
+        if not driver.connect():
+            print("Microscope connection failed")
+            return
+        try:
+            frames = capture_stack(driver, args.capture, prompt=not args.fake)
+        finally:
+            driver.disconnect()
+    else:
+        paths = sorted(path for pattern in args.inputs for path in glob.glob(pattern))
+        frames = [cv2.imread(path) for path in paths]
+
+    result = focus_stack(frames, align=not args.no_align, levels=args.levels)
+    if result is None:
+        print("No frames to stack")
+        return
+
+    cv2.imwrite(args.output, result.image)
+    print(f"Stacked {len(frames)} frames: {args.output}")
+    if args.depth:
+        depth = cv2.normalize(result.depth, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+        cv2.imwrite(args.depth, depth)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,538 @@
+#!/usr/bin/env python3
+"""
+Raw Frame Archive
+Lossless session storage fast enough for full-rate capture: frames are
+copied uncompressed into fixed-stride slots of one preallocated,
+memory-mapped data file, and a compact memory-mapped index records the
+sequence number, timestamp and device settings of each frame. Readers get
+constant-time random access as zero-copy NumPy views; PNG/TIFF/video files
+are produced afterwards by streaming export.
+
+Layout of an archive directory:
+    header.json  frame geometry, dtype, slot stride, device information
+    frames.raw   slot i holds frame i at offset i * stride
+    index.bin    one INDEX_DTYPE record per slot
+
+A record only counts once its commit mark is written, after the pixels and
+the other index fields, so a crash mid-append leaves at most one partial
+record that readers ignore and the next writer overwrites.
+"""
+
+import os
+import sys
+import csv
+import json
+import mmap
+import time
+import argparse
+import collections
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, NamedTuple, Optional, Tuple
+
+# Import driver modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.metrics import METRICS
+
+ARCHIVE_VERSION = 1
+HEADER_FILE = 'header.json'
+DATA_FILE = 'frames.raw'
+INDEX_FILE = 'index.bin'
+COMMIT_MARK = 0x314D5246  # b'FRM1' little-endian
+INDEX_DTYPE = np.dtype([
+    ('seq', '<u8'),
+    ('timestamp', '<f8'),  # time.monotonic() of the grab
+    ('brightness', '<f4'),
+    ('exposure', '<f4'),
+    ('gain', '<f4'),
+    ('committed', '<u4'),
+])
+EXPORT_FORMATS = ('png', 'tiff', 'video')
+
+class FrameRecord(NamedTuple):
+    """Index entry of one archived frame"""
+    index: int
+    seq: int
+    timestamp: float
+    brightness: float
+    exposure: float
+    gain: float
+
+class ArchiveReport(NamedTuple):
+    """Summary returned when an archiving session stops"""
+    path: str
+    frames_written: int
+    frames_missed: int  # Sequence gaps: frames grabbed but not archived
+    duration: float  # Seconds between first and last archived frame
+    average_fps: float
+
+def _preallocate(path: str, size: int):
+    """Grow a file to size bytes, reserving the blocks where supported."""
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+        except (AttributeError, OSError):
+            if os.fstat(f.fileno()).st_size < size:
+                f.truncate(size)
+
+def _committed_count(index: Optional[np.ndarray]) -> int:
+    """Number of leading committed records."""
+    if index is None or len(index) == 0:
+        return 0
+    marks = index['committed'] == COMMIT_MARK
+    return len(marks) if marks.all() else int(np.argmin(marks))
+
+def _read_header(path: str) -> dict:
+    with open(os.path.join(path, HEADER_FILE)) as f:
+        header = json.load(f)
+    if header.get('version') != ARCHIVE_VERSION:
+        raise ValueError(f"Unsupported archive version: {header.get('version')}")
+    return header
+
+class ArchiveWriter:
+    """Appends frames to an archive directory"""
+
+    def __init__(self, path: str, capacity: int = 1024, sync_every: int = 0, metadata: dict = None):
+        """
+        Initialize writer
+
+        Files are created on the first append, sized from that frame. An
+        existing archive is reopened and appended to after its last
+        committed frame.
+
+        Args:
+            path: Archive directory
+            capacity: Slots preallocated at a time; the files grow by this much when full
+            sync_every: Flush to disk every N frames (0 leaves it to the OS and close())
+            metadata: Extra JSON-serialisable information stored in the header
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.path = path
+        self.capacity_step = capacity
+        self.sync_every = sync_every
+        self.metadata = metadata or {}
+        self.shape = None
+        self.dtype = None
+        self.frame_bytes = 0
+        self.stride = 0
+        self.capacity = 0
+        self.count = 0
+        self.frames_written = 0
+        self.recovered = False  # A partial record from an interrupted append was discarded
+        self._data = None
+        self._index = None
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, HEADER_FILE)):
+            self._open_existing()
+
+    def _set_layout(self, shape: tuple, dtype: np.dtype, stride: int):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.stride = stride
+
+    def _open_existing(self):
+        header = _read_header(self.path)
+        self._set_layout(header['shape'], header['dtype'], header['stride'])
+        self._map(os.path.getsize(os.path.join(self.path, INDEX_FILE)) // INDEX_DTYPE.itemsize)
+        self.count = _committed_count(self._index)
+        if self.count < self.capacity and self._index[self.count]['committed'] == 0 and \
+                self._index[self.count]['timestamp'] != 0:
+            self.recovered = True
+        if self.count < self.capacity:
+            self._index[self.count:] = np.zeros(1, dtype=INDEX_DTYPE)
+
+    def _create(self, frame: np.ndarray):
+        # Page-aligned slots: every frame starts on its own page
+        frame_bytes = frame.nbytes
+        stride = -(-frame_bytes // mmap.PAGESIZE) * mmap.PAGESIZE
+        self._set_layout(frame.shape, frame.dtype, stride)
+        header = {
+            'version': ARCHIVE_VERSION,
+            'shape': list(self.shape),
+            'dtype': self.dtype.str,
+            'stride': self.stride,
+            'created': time.time(),
+            'monotonic': time.monotonic(),  # Reference for converting frame timestamps to wall time
+            'metadata': self.metadata,
+        }
+        # Written atomically so a reader never sees a partial header
+        tmp_path = os.path.join(self.path, HEADER_FILE + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(header, f, indent=2, default=str)
+        os.replace(tmp_path, os.path.join(self.path, HEADER_FILE))
+        self._map(self.capacity_step)
+
+    def _map(self, capacity: int):
+        """Preallocate both files for capacity slots and map them."""
+        self._unmap()
+        data_path = os.path.join(self.path, DATA_FILE)
+        index_path = os.path.join(self.path, INDEX_FILE)
+        _preallocate(data_path, capacity * self.stride)
+        _preallocate(index_path, capacity * INDEX_DTYPE.itemsize)
+        self.capacity = capacity
+        if capacity:
+            self._data = np.memmap(data_path, np.uint8, 'r+', shape=(capacity, self.stride))
+            self._index = np.memmap(index_path, INDEX_DTYPE, 'r+', shape=(capacity,))
+
+    def _unmap(self):
+        if self._data is not None:
+            self._data.flush()
+            self._index.flush()
+        self._data = None
+        self._index = None
+
+    def append(self, frame: np.ndarray, timestamp: float = None, seq: int = None,
+               settings: dict = None) -> int:
+        """
+        Copy one frame into the next slot
+
+        Args:
+            frame: Frame with the archive's shape and dtype
+            timestamp: Grab time (default: now, time.monotonic())
+            seq: Grab sequence number (default: archive position)
+            settings: Device settings dict with brightness/exposure/gain (default: NaN)
+
+        Returns the frame's archive index, or -1 if it was rejected.
+        """
+        if self.shape is None:
+            self._create(frame)
+        elif frame.shape != self.shape or frame.dtype != self.dtype:
+            print(f"Frame {frame.shape} {frame.dtype} does not match archive {self.shape} {self.dtype}")
+            return -1
+        if self.count == self.capacity:
+            self._map(self.capacity + self.capacity_step)
+
+        start = time.perf_counter_ns()
+        i = self.count
+        np.copyto(self._data[i, :self.frame_bytes].view(self.dtype).reshape(self.shape), frame)
+        settings = settings or {}
+        self._index[i] = (
+            i if seq is None else seq,
+            time.monotonic() if timestamp is None else timestamp,
+            settings.get('brightness', np.nan),
+            settings.get('exposure', np.nan),
+            settings.get('gain', np.nan),
+            0,
+        )
+        # The commit mark goes last: until it is set readers ignore the slot
+        self._index['committed'][i] = COMMIT_MARK
+        self.count += 1
+        self.frames_written += 1
+        if self.sync_every and self.count % self.sync_every == 0:
+            self.flush()
+        METRICS.observe('archive_write', start)
+        METRICS.inc('archive_frames_written')
+        return i
+
+    def flush(self):
+        """Write mapped pages to disk, pixels before index."""
+        if self._data is not None:
+            self._data.flush()
+            self._index.flush()
+
+    def close(self, trim: bool = True):
+        """
+        Flush and unmap the files
+
+        With trim the unused preallocated slots are released; otherwise
+        they stay reserved for the next writer.
+        """
+        if self.shape is None:
+            return
+        self._unmap()
+        if trim:
+            os.truncate(os.path.join(self.path, DATA_FILE), self.count * self.stride)
+            os.truncate(os.path.join(self.path, INDEX_FILE), self.count * INDEX_DTYPE.itemsize)
+            self.capacity = self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class FrameArchive:
+    """Read-only random access to an archive, also while it is being written"""
+
+    def __init__(self, path: str):
+        header = _read_header(path)
+        self.path = path
+        self.header = header
+        self.shape = tuple(header['shape'])
+        self.dtype = np.dtype(header['dtype'])
+        self.stride = header['stride']
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.metadata = header.get('metadata', {})
+        self.capacity = 0
+        self.count = 0
+        self._data = None
+        self._index = None
+        self.refresh()
+
+    def refresh(self) -> int:
+        """Pick up frames appended since opening; returns the frame count."""
+        capacity = min(os.path.getsize(os.path.join(self.path, INDEX_FILE)) // INDEX_DTYPE.itemsize,
+                       os.path.getsize(os.path.join(self.path, DATA_FILE)) // self.stride)
+        if capacity != self.capacity:
+            self._data = self._index = None
+            self.capacity = capacity
+            if capacity:
+                self._data = np.memmap(os.path.join(self.path, DATA_FILE), np.uint8, 'r',
+                                       shape=(capacity, self.stride))
+                self._index = np.memmap(os.path.join(self.path, INDEX_FILE), INDEX_DTYPE, 'r',
+                                        shape=(capacity,))
+        self.count = _committed_count(self._index)
+        return self.count
+
+    def close(self):
+        self._data = self._index = None
+        self.capacity = self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _check(self, i: int) -> int:
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(f"frame {i} out of range ({self.count} frames)")
+        return i
+
+    def __getitem__(self, i: int) -> np.ndarray:
+        """Frame i as a read-only view of the mapped file (no copy)."""
+        i = self._check(i)
+        return np.asarray(self._data[i, :self.frame_bytes]).view(self.dtype).reshape(self.shape)
+
+    def __iter__(self) -> Iterator[np.ndarray]:
+        for i in range(self.count):
+            yield self[i]
+
+    def record(self, i: int) -> FrameRecord:
+        """Index entry of frame i."""
+        i = self._check(i)
+        entry = self._index[i]
+        return FrameRecord(i, int(entry['seq']), float(entry['timestamp']), float(entry['brightness']),
+                           float(entry['exposure']), float(entry['gain']))
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return np.asarray(self._index['timestamp'][:self.count]) if self.count else np.empty(0)
+
+    @property
+    def seqs(self) -> np.ndarray:
+        return np.asarray(self._index['seq'][:self.count]) if self.count else np.empty(0, np.uint64)
+
+    def wall_time(self, timestamp: float) -> float:
+        """Convert a frame timestamp to time.time() seconds."""
+        return self.header['created'] + timestamp - self.header['monotonic']
+
+    def find(self, timestamp: float) -> int:
+        """Index of the frame grabbed closest to timestamp (-1 if empty)."""
+        if not self.count:
+            return -1
+        timestamps = self.timestamps
+        i = int(np.searchsorted(timestamps, timestamp))
+        if i == self.count or (i > 0 and timestamp - timestamps[i - 1] <= timestamps[i] - timestamp):
+            i -= 1
+        return i
+
+    def frames(self, start: int = 0, stop: int = None, step: int = 1) -> Iterator[Tuple[FrameRecord, np.ndarray]]:
+        """Yield (record, view) pairs for a range of frames."""
+        for i in range(*slice(start, stop, step).indices(self.count)):
+            yield self.record(i), self[i]
+
+    def get_status(self) -> dict:
+        timestamps = self.timestamps
+        duration = float(timestamps[-1] - timestamps[0]) if self.count > 1 else 0.0
+        seqs = self.seqs.astype(np.int64)
+        return {
+            'frames': self.count,
+            'shape': self.shape,
+            'dtype': self.dtype.name,
+            'duration': duration,
+            'average_fps': (self.count - 1) / duration if duration > 0 else 0.0,
+            'frames_missed': int(np.sum(np.maximum(np.diff(seqs) - 1, 0))) if self.count > 1 else 0,
+            'bytes': self.count * self.stride,
+        }
+
+def export(archive: FrameArchive, output: str, format: str = 'png', start: int = 0, stop: int = None,
+           step: int = 1, fps: float = None, fourcc: str = 'MJPG', workers: int = None) -> int:
+    """
+    Stream archived frames out to image files or a video
+
+    Frames are read one at a time from the mapped file, so memory stays
+    flat whatever the archive size. Image formats write numbered files plus
+    an index.csv of the frame records into the output directory, encoding on
+    a few threads; 'video' writes one file with cv2.VideoWriter.
+
+    Returns the number of frames exported.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {EXPORT_FORMATS}")
+    if format == 'video':
+        return _export_video(archive, output, start, stop, step, fps, fourcc)
+
+    os.makedirs(output, exist_ok=True)
+    extension = 'tif' if format == 'tiff' else 'png'
+    workers = workers or min(4, os.cpu_count() or 1)
+    exported = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor, \
+            open(os.path.join(output, 'index.csv'), 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['file'] + list(FrameRecord._fields))
+        pending = collections.deque()
+        for record, frame in archive.frames(start, stop, step):
+            name = f"frame_{record.index:06d}.{extension}"
+            # cv2 releases the GIL while encoding; frames are views, nothing is copied
+            pending.append((name, executor.submit(cv2.imwrite, os.path.join(output, name), frame)))
+            writer.writerow([name] + list(record))
+            while len(pending) > 2 * workers:
+                exported += _finish(*pending.popleft())
+        while pending:
+            exported += _finish(*pending.popleft())
+    return exported
+
+def _finish(name: str, future) -> int:
+    if future.result():
+        return 1
+    print(f"Failed to write {name}")
+    return 0
+
+def _export_video(archive: FrameArchive, output: str, start: int, stop: int, step: int,
+                  fps: float, fourcc: str) -> int:
+    if archive.dtype != np.uint8 or len(archive.shape) not in (2, 3):
+        print("Video export requires 8-bit frames")
+        return 0
+    if fps is None:
+        status = archive.get_status()
+        fps = status['average_fps'] / step if status['average_fps'] else 30.0
+    height, width = archive.shape[:2]
+    is_color = len(archive.shape) == 3
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*fourcc), fps, (width, height), is_color)
+    if not writer.isOpened():
+        print(f"Cannot open video writer for {output}")
+        return 0
+    exported = 0
+    try:
+        for _, frame in archive.frames(start, stop, step):
+            writer.write(frame)
+            exported += 1
+    finally:
+        writer.release()
+    return exported
+
+def archive(driver, path: str, duration: float = None, count: int = None, settings_interval: float = 1.0,
+            **writer_kwargs) -> Optional[ArchiveReport]:
+    """
+    Archive live frames from a connected driver
+
+    In threaded mode every grabbed frame is copied once, from the ring slot
+    straight into the mapped file; sequence gaps show frames the archive
+    could not keep up with. Device settings are sampled every
+    settings_interval seconds rather than per frame.
+    """
+    if not driver.is_connected:
+        print("Microscope not connected.")
+        return None
+
+    metadata = writer_kwargs.pop('metadata', None) or {'device': driver.get_device_info()}
+    deadline = time.monotonic() + duration if duration is not None else None
+    seq = 0
+    missed = 0
+    settings, settings_time = {}, float('-inf')
+    first = last = None
+    with ArchiveWriter(path, metadata=metadata, **writer_kwargs) as writer:
+        try:
+            while (count is None or writer.frames_written < count) and \
+                    (deadline is None or time.monotonic() < deadline):
+                if driver.grabber:
+                    grabbed = driver.wait_for_next(seq, timeout=0.5, copy=False)
+                    if grabbed is None:
+                        continue
+                    if seq:
+                        missed += grabbed.seq - seq - 1
+                    seq, frame, timestamp = grabbed.seq, grabbed.frame, grabbed.timestamp
+                else:
+                    frame = driver.capture_frame()
+                    if frame is None:
+                        continue
+                    seq, timestamp = seq + 1, time.monotonic()
+                if timestamp - settings_time >= settings_interval:
+                    settings, settings_time = driver.get_capture_settings(), timestamp
+                if writer.append(frame, timestamp, seq, settings) < 0:
+                    break
+                first = timestamp if first is None else first
+                last = timestamp
+        except KeyboardInterrupt:
+            pass
+        written = writer.frames_written
+
+    elapsed = last - first if written > 1 else 0.0
+    return ArchiveReport(path, written, missed, elapsed, (written - 1) / elapsed if elapsed > 0 else 0.0)
+
+def main():
+    """Archive a session, or inspect and export one."""
+    parser = argparse.ArgumentParser(description="Raw microscope frame archive")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = commands.add_parser('record', help="Archive live frames")
+    record_parser.add_argument('path', help="Archive directory")
+    record_parser.add_argument('--duration', type=float, default=10.0, help="Seconds to record")
+    record_parser.add_argument('--fake', action='store_true', help="Use a synthetic camera instead of the device")
+    record_parser.add_argument('--device', type=int, help="Video device index")
+    record_parser.add_argument('--capacity', type=int, default=1024, help="Slots preallocated at a time")
+    record_parser.add_argument('--sync-every', type=int, default=0, help="Flush to disk every N frames")
+
+    info_parser = commands.add_parser('info', help="Show archive summary")
+    info_parser.add_argument('path', help="Archive directory")
+
+    export_parser = commands.add_parser('export', help="Export frames to images or video")
+    export_parser.add_argument('path', help="Archive directory")
+    export_parser.add_argument('output', help="Output directory (images) or file (video)")
+    export_parser.add_argument('--format', choices=EXPORT_FORMATS, default='png', help="Output format")
+    export_parser.add_argument('--start', type=int, default=0, help="First frame")
+    export_parser.add_argument('--stop', type=int, help="Stop before this frame")
+    export_parser.add_argument('--step', type=int, default=1, help="Export every Nth frame")
+    export_parser.add_argument('--fps', type=float, help="Video frame rate (default: recorded rate)")
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        if args.fake:
+            from driver.fake_camera import FakeMicroscopeDriver
+            driver = FakeMicroscopeDriver(threaded=True)
+        else:
+            from driver.microscope_driver import MicroscopeDriver
+            driver = MicroscopeDriver(threaded=True, video_device_index=args.device)
+        if not driver.connect():
+            print("Microscope connection failed")
+            return
+        try:
+            print(f"Archiving for {args.duration:.0f} s")
+            report = archive(driver, args.path, duration=args.duration, capacity=args.capacity,
+                             sync_every=args.sync_every)
+        finally:
+            driver.disconnect()
+        if report:
+            print(f"Archived {report.frames_written} frames ({report.average_fps:.1f} fps), "
+                  f"missed {report.frames_missed}: {report.path}")
+        return
+
+    with FrameArchive(args.path) as frames:
+        if args.command == 'info':
+            for key, value in frames.get_status().items():
+                print(f"{key}: {value}")
+        else:
+            exported = export(frames, args.output, args.format, args.start, args.stop, args.step, args.fps)
+            print(f"Exported {exported} frames: {args.output}")
+
+if __name__ == "__main__":
+    main()
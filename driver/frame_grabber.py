@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Background Frame Grabber
+Dedicated acquisition thread that keeps the newest frames in a small
+preallocated ring so readers never block on the sensor
+"""
+
+import time
+import threading
+import numpy as np
+from typing import Optional, NamedTuple
+
+from driver.metrics import METRICS
+
+class GrabbedFrame(NamedTuple):
+    """Frame published by the grabber"""
+    seq: int
+    timestamp: float
+    frame: np.ndarray
+
+class FrameGrabber:
+    """Continuously reads a VideoCapture into a ring of frame slots"""
+
+    def __init__(self, cap, ring_size: int = 4, frame_shape: tuple = None):
+        """
+        Initialize frame grabber
+
+        Args:
+            cap: Opened cv2.VideoCapture (or compatible) object
+            ring_size: Number of frame slots (at least 2)
+            frame_shape: Expected (height, width, channels) used to preallocate slots
+        """
+        if ring_size < 2:
+            raise ValueError("ring_size must be at least 2")
+
+        self.cap = cap
+        self.ring_size = ring_size
+        self._slots = [None] * ring_size
+        if frame_shape is not None:
+            self._slots = [np.empty(frame_shape, dtype=np.uint8) for _ in range(ring_size)]
+        self._seqs = [0] * ring_size
+        self._timestamps = [0.0] * ring_size
+        self._latest_seq = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.on_frame = None  # Optional callable(frame) run on the acquisition thread
+
+        self.frames_grabbed = 0
+        self.read_failures = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    @property
+    def latest_seq(self) -> int:
+        """Sequence number of the newest frame (0 before the first frame)."""
+        return self._latest_seq
+
+    def start(self):
+        """Start the acquisition thread."""
+        if self._running:
+            return
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="FrameGrabber", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        """Stop the acquisition thread and wake any waiting readers."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        """Acquisition loop."""
+        while self._running:
+            seq = self._latest_seq + 1
+            index = seq % self.ring_size
+            slot = self._slots[index]
+
+            # The slot being filled is never the newest one, so readers
+            # copying the newest frame under the lock cannot see a torn write
+            start = time.perf_counter_ns()
+            try:
+                ret, frame = self.cap.read(slot) if slot is not None else self.cap.read()
+            except Exception:
+                ret, frame = False, None
+
+            if not ret or frame is None:
+                self.read_failures += 1
+                METRICS.inc('frames_failed')
+                time.sleep(0.01)
+                continue
+
+            METRICS.observe('usb_read', start)
+            METRICS.inc('frames_grabbed')
+            timestamp = time.monotonic()
+            if frame is not slot:
+                if slot is not None and slot.shape == frame.shape:
+                    np.copyto(slot, frame)
+                else:
+                    # First frame or resolution change: (re)allocate this slot
+                    slot = frame
+
+            with self._cond:
+                self._slots[index] = slot
+                self._seqs[index] = seq
+                self._timestamps[index] = timestamp
+                self._latest_seq = seq
+                self.frames_grabbed += 1
+                self._cond.notify_all()
+
+            # Observers run outside the lock, before this thread reads into another slot
+            if self.on_frame:
+                try:
+                    self.on_frame(slot)
+                except Exception as e:
+                    print(f"Frame observer failed: {e}")
+
+    def _newest(self, copy: bool) -> Optional[GrabbedFrame]:
+        """Return the newest frame; caller must hold the lock."""
+        if self._latest_seq == 0:
+            return None
+
+        index = self._latest_seq % self.ring_size
+        frame = self._slots[index]
+        return GrabbedFrame(self._seqs[index], self._timestamps[index], frame.copy() if copy else frame)
+
+    def latest(self, copy: bool = True) -> Optional[GrabbedFrame]:
+        """
+        Return the newest frame without waiting
+
+        Args:
+            copy: Return a private copy. Views (copy=False) stay valid only
+                  until the ring wraps, i.e. for about ring_size - 1 frames.
+        """
+        with self._cond:
+            return self._newest(copy)
+
+    def wait_for_next(self, seq: int, timeout: float = 1.0, copy: bool = True) -> Optional[GrabbedFrame]:
+        """
+        Block until a frame newer than seq exists
+
+        Args:
+            seq: Last sequence number the caller has seen (0 for any frame)
+            timeout: Maximum wait in seconds
+            copy: Return a private copy instead of a ring view
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._latest_seq > seq or not self._running, timeout):
+                return None
+            if self._latest_seq <= seq:
+                return None
+            return self._newest(copy)
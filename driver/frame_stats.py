@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Frame Statistics
+Exposure statistics from one histogram pass over a decimated sample grid:
+min/max, mean/std and clipping are all derived from the 256-bin histogram
+"""
+
+import threading
+import collections
+import cv2
+import numpy as np
+from typing import NamedTuple, Optional
+
+from driver.jpeg_frame import is_jpeg_buffer
+
+_LEVELS = np.arange(256, dtype=np.float64)
+_LEVELS_SQUARED = _LEVELS ** 2
+
+# Reduced JPEG decodes (1/2, 1/4, 1/8 scale) used for passthrough buffers
+_REDUCED_GRAYSCALE = {2: cv2.IMREAD_REDUCED_GRAYSCALE_2, 4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+                      8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+
+class FrameStatsResult(NamedTuple):
+    """Statistics of one frame"""
+    min: int
+    max: int
+    mean: float
+    std: float
+    clipped_low: float  # Percent of samples at or below the low clip level
+    clipped_high: float  # Percent of samples at or above the high clip level
+    histogram: np.ndarray  # 256 bins
+    samples: int
+
+class SessionStats(NamedTuple):
+    """Aggregates over every frame seen since the last reset"""
+    frames: int
+    min: int
+    max: int
+    mean: float  # Over all sampled pixels
+    std: float
+    clipped_low: float  # Average percent per frame
+    clipped_high: float
+    recent_mean: float  # Mean brightness over the rolling window
+    histogram: np.ndarray  # Cumulative 256-bin histogram
+
+def stats_from_histogram(histogram: np.ndarray, low_clip: int = 0, high_clip: int = 255) -> Optional[FrameStatsResult]:
+    """Derive frame statistics from a 256-bin histogram."""
+    samples = int(histogram.sum())
+    if samples == 0:
+        return None
+
+    nonzero = np.flatnonzero(histogram)
+    mean = float(histogram @ _LEVELS) / samples
+    variance = max(float(histogram @ _LEVELS_SQUARED) / samples - mean * mean, 0.0)
+    clipped_low = 100.0 * int(histogram[:low_clip + 1].sum()) / samples
+    clipped_high = 100.0 * int(histogram[high_clip:].sum()) / samples
+    return FrameStatsResult(int(nonzero[0]), int(nonzero[-1]), mean, variance ** 0.5,
+                            clipped_low, clipped_high, histogram, samples)
+
+def frame_stats(frame: np.ndarray, step: int = 4, luma: bool = True, low_clip: int = 0,
+                high_clip: int = 255) -> Optional[FrameStatsResult]:
+    """
+    Statistics of a frame in a single histogram pass
+
+    Args:
+        frame: BGR or grayscale uint8 frame (or a passthrough JPEG buffer)
+        step: Sample every step-th pixel in each direction (1 for every pixel)
+        luma: Measure grayscale brightness; otherwise all channel values
+        low_clip: Values at or below this count as clipped shadows
+        high_clip: Values at or above this count as clipped highlights
+    """
+    if frame is None:
+        return None
+    if is_jpeg_buffer(frame):
+        # Let the JPEG decoder do the decimation
+        reduced = max((scale for scale in _REDUCED_GRAYSCALE if scale <= step), default=None)
+        sample = cv2.imdecode(frame.reshape(-1), _REDUCED_GRAYSCALE[reduced] if reduced else cv2.IMREAD_GRAYSCALE)
+        if sample is None:
+            return None
+        if reduced and step > reduced:
+            sample = sample[::step // reduced, ::step // reduced]
+    else:
+        sample = frame[::step, ::step] if step > 1 else frame
+        if luma and sample.ndim == 3:
+            sample = cv2.cvtColor(np.ascontiguousarray(sample), cv2.COLOR_BGR2GRAY)
+
+    histogram = np.bincount(sample.reshape(-1), minlength=256)
+    return stats_from_histogram(histogram, low_clip, high_clip)
+
+class FrameStats:
+    """Per-frame statistics with rolling session aggregates"""
+
+    def __init__(self, step: int = 4, luma: bool = True, window: int = 300, low_clip: int = 0, high_clip: int = 255):
+        """
+        Initialize statistics collector
+
+        Args:
+            step: Decimation grid spacing in pixels
+            luma: Measure grayscale brightness rather than all channels
+            window: Frames in the rolling recent-brightness window
+            low_clip: Shadow clipping level
+            high_clip: Highlight clipping level
+        """
+        self.step = step
+        self.luma = luma
+        self.low_clip = low_clip
+        self.high_clip = high_clip
+        self._lock = threading.Lock()
+        self._window = collections.deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        """Clear session aggregates."""
+        with self._lock:
+            self.latest = None
+            self.frames = 0
+            self._histogram = np.zeros(256, dtype=np.int64)
+            self._clipped_low_sum = 0.0
+            self._clipped_high_sum = 0.0
+            self._window.clear()
+
+    def update(self, frame: np.ndarray) -> Optional[FrameStatsResult]:
+        """Measure a frame and fold it into the session aggregates."""
+        result = frame_stats(frame, self.step, self.luma, self.low_clip, self.high_clip)
+        if result is None:
+            return None
+
+        with self._lock:
+            self.latest = result
+            self.frames += 1
+            self._histogram += result.histogram
+            self._clipped_low_sum += result.clipped_low
+            self._clipped_high_sum += result.clipped_high
+            self._window.append(result.mean)
+        return result
+
+    def session(self) -> Optional[SessionStats]:
+        """Aggregates over all frames since the last reset."""
+        with self._lock:
+            if self.frames == 0:
+                return None
+            histogram = self._histogram.copy()
+            frames = self.frames
+            clipped_low = self._clipped_low_sum / frames
+            clipped_high = self._clipped_high_sum / frames
+            recent_mean = sum(self._window) / len(self._window)
+
+        total = stats_from_histogram(histogram)
+        return SessionStats(frames, total.min, total.max, total.mean, total.std,
+                            clipped_low, clipped_high, recent_mean, histogram)
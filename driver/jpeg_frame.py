@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+JPEG Frame
+Compressed frame as delivered by an MJPEG camera, decoded only on demand
+"""
+
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+SOI = b'\xff\xd8'
+
+# Start-of-frame markers carrying image dimensions (baseline, extended, progressive, lossless)
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def is_jpeg_buffer(frame) -> bool:
+    """Return True if a captured buffer holds compressed JPEG data rather than pixels."""
+    if frame is None:
+        return False
+    if isinstance(frame, (bytes, bytearray, memoryview)):
+        return bytes(frame[:2]) == SOI
+    # Raw MJPEG from VideoCapture arrives as a flat (or 1xN) uint8 array
+    if frame.dtype != np.uint8 or frame.size < 4 or (frame.ndim != 1 and frame.shape[0] != 1):
+        return False
+    flat = frame.reshape(-1)
+    return flat[0] == 0xFF and flat[1] == 0xD8
+
+def jpeg_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Read (width, height) from the JPEG SOF marker without decoding."""
+    pos = 2
+    end = len(data)
+    while pos + 4 <= end:
+        if data[pos] != 0xFF:
+            return None
+        marker = data[pos + 1]
+        if marker == 0xFF:  # Fill byte
+            pos += 1
+            continue
+        length = (data[pos + 2] << 8) | data[pos + 3]
+        if marker in _SOF_MARKERS and pos + 9 <= end:
+            height = (data[pos + 5] << 8) | data[pos + 6]
+            width = (data[pos + 7] << 8) | data[pos + 8]
+            return width, height
+        if marker == 0xDA:  # Start of scan: no SOF before the image data
+            return None
+        pos += 2 + length
+    return None
+
+class JpegFrame:
+    """JPEG-compressed frame with lazy decoding"""
+
+    def __init__(self, data: bytes, timestamp: float = None, decoded: np.ndarray = None):
+        """
+        Initialize JPEG frame
+
+        Args:
+            data: JPEG bytes
+            timestamp: Capture time from time.monotonic()
+            decoded: Already known pixels (skips a later decode)
+        """
+        self.data = data
+        self.timestamp = timestamp
+        self._decoded = decoded
+        self._size = None
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    @property
+    def size(self) -> Optional[Tuple[int, int]]:
+        """(width, height) parsed from the JPEG header."""
+        if self._size is None:
+            if self._decoded is not None:
+                self._size = (self._decoded.shape[1], self._decoded.shape[0])
+            else:
+                self._size = jpeg_dimensions(self.data)
+        return self._size
+
+    @property
+    def is_decoded(self) -> bool:
+        return self._decoded is not None
+
+    def decode(self) -> Optional[np.ndarray]:
+        """Return BGR pixels, decoding once on first use."""
+        if self._decoded is None:
+            self._decoded = cv2.imdecode(np.frombuffer(self.data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return self._decoded
+
+    def save(self, path: str) -> bool:
+        """Write the JPEG bytes to a file as-is (no re-encoding)."""
+        try:
+            with open(path, 'wb') as f:
+                f.write(self.data)
+            return True
+        except OSError as e:
+            print(f"Error saving image: {e}")
+            return False
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Multi-Microscope Manager
+Discovers every matching USB microscope and captures from all of them
+concurrently, one capture worker (thread or process) per device
+"""
+
+import os
+import re
+import sys
+import time
+import queue
+import argparse
+import multiprocessing
+import numpy as np
+from typing import Dict, List, Optional, NamedTuple
+
+import usb.core
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.microscope_driver import MicroscopeDriver
+from driver.shared_frames import SharedFrameWriter, SharedFrameReader
+from driver.discovery import DISCOVERY
+
+WORKER_MODES = ('process', 'thread')
+
+class DeviceSpec(NamedTuple):
+    """One microscope to open"""
+    device_id: str
+    bus: Optional[int]
+    address: Optional[int]
+    video_index: Optional[int]
+    vendor_id: int = 0x05e3
+    product_id: int = 0xf12a
+    fake: bool = False
+
+class MultiFrame(NamedTuple):
+    """Time-aligned frames from several microscopes"""
+    frames: Dict[str, np.ndarray]
+    timestamps: Dict[str, float]
+    skew: float  # Spread between the earliest and latest frame timestamps (s)
+
+def _make_driver(spec: DeviceSpec, threaded: bool, ring_size: int) -> MicroscopeDriver:
+    if spec.fake:
+        from driver.fake_camera import FakeMicroscopeDriver
+        return FakeMicroscopeDriver(threaded=threaded, ring_size=ring_size)
+    return MicroscopeDriver(spec.vendor_id, spec.product_id, threaded=threaded, ring_size=ring_size,
+                            video_device_index=spec.video_index, bus=spec.bus, address=spec.address)
+
+def _capture_process(spec: DeviceSpec, shm_name: str, ring_size: int, ready, stop, failures):
+    """Worker process: read one device into a shared frame ring."""
+    driver = _make_driver(spec, threaded=False, ring_size=ring_size)
+    if not driver.connect():
+        ready.put(None)
+        return
+
+    try:
+        width, height = driver.get_frame_size()
+        writer = SharedFrameWriter((height, width, 3), ring_size, name=shm_name)
+    except Exception as e:
+        # E.g. a stale segment with the same name; report instead of leaving the parent waiting
+        print(f"Capture worker {spec.device_id} failed to start: {e}")
+        ready.put(None)
+        driver.disconnect()
+        return
+    ready.put((height, width))
+    try:
+        while not stop.is_set():
+            if writer.write_from_driver(driver) < 0:
+                with failures.get_lock():
+                    failures.value += 1
+                time.sleep(0.01)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+        driver.disconnect()
+
+class _ThreadWorker:
+    """Capture worker using the driver's own grab thread"""
+
+    def __init__(self, spec: DeviceSpec, ring_size: int):
+        self.spec = spec
+        self.driver = _make_driver(spec, threaded=True, ring_size=ring_size)
+
+    def start(self) -> bool:
+        return self.driver.connect()
+
+    @property
+    def latest_seq(self) -> int:
+        return self.driver.grabber.latest_seq if self.driver.grabber else 0
+
+    @property
+    def failures(self) -> int:
+        return self.driver.grabber.read_failures if self.driver.grabber else 0
+
+    def wait_for_next(self, seq: int, timeout: float):
+        grabbed = self.driver.wait_for_next(seq, timeout)
+        return None if grabbed is None else (grabbed.seq, grabbed.timestamp, grabbed.frame)
+
+    def stop(self):
+        self.driver.disconnect()
+
+class _ProcessWorker:
+    """Capture worker in its own process, publishing through shared memory"""
+
+    def __init__(self, spec: DeviceSpec, ring_size: int, context):
+        self.spec = spec
+        self.ring_size = ring_size
+        self.context = context
+        self.shm_name = f"epiphany_{os.getpid()}_{re.sub(r'[^A-Za-z0-9]', '_', spec.device_id)}"
+        self.reader = None
+        self.process = None
+        self.stop_event = context.Event()
+        self._failures = context.Value('L', 0)
+
+    def start(self, timeout: float = 30.0) -> bool:
+        ready = self.context.Queue()
+        self.process = self.context.Process(
+            target=_capture_process,
+            args=(self.spec, self.shm_name, self.ring_size, ready, self.stop_event, self._failures),
+            name=f"capture-{self.spec.device_id}",
+            daemon=True
+        )
+        self.process.start()
+        shape = self._wait_ready(ready, timeout)
+        if shape is None:
+            self.stop()
+            return False
+
+        self.reader = SharedFrameReader(self.shm_name)
+        return True
+
+    def _wait_ready(self, ready, timeout: float) -> Optional[tuple]:
+        """Frame shape reported by the worker, or None if it failed, died or timed out."""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                return ready.get(timeout=0.1)
+            except queue.Empty:
+                pass
+            if not self.process.is_alive():
+                # A report sent just before exiting may still be in flight
+                try:
+                    return ready.get(timeout=0.1)
+                except queue.Empty:
+                    return None
+        return None
+
+    @property
+    def latest_seq(self) -> int:
+        return self.reader.latest_seq if self.reader else 0
+
+    @property
+    def failures(self) -> int:
+        return self._failures.value
+
+    def wait_for_next(self, seq: int, timeout: float):
+        shared = self.reader.wait_for_next(seq, timeout, copy=True)
+        return None if shared is None else (shared.seq, shared.timestamp, shared.frame)
+
+    def stop(self):
+        self.stop_event.set()
+        if self.process:
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        if self.reader:
+            self.reader.close()
+            self.reader = None
+
+class MicroscopeManager:
+    """Opens several microscopes and captures from all of them at once"""
+
+    def __init__(self, vendor_id: int = None, product_id: int = None, mode: str = 'process', ring_size: int = 4):
+        """
+        Initialize manager
+
+        Args:
+            vendor_id: USB Vendor ID to discover (default: Genesys Logic microscope)
+            product_id: USB Product ID to discover
+            mode: 'process' (one capture process per device, scales across cores)
+                  or 'thread' (one grab thread per device)
+            ring_size: Frame slots per device
+        """
+        if mode not in WORKER_MODES:
+            raise ValueError(f"mode must be one of {WORKER_MODES}")
+
+        self.vendor_id = vendor_id or 0x05e3
+        self.product_id = product_id or 0xf12a
+        self.mode = mode
+        self.ring_size = ring_size
+        self.workers: Dict[str, object] = {}
+        self._context = multiprocessing.get_context('spawn')
+        self._started: Dict[str, float] = {}
+
+    def discover(self) -> List[DeviceSpec]:
+        """Find every connected microscope matching vendor_id:product_id."""
+        if DISCOVERY.available:
+            # sysfs lists the devices and their video nodes without opening anything
+            return [DeviceSpec(camera.device_id, camera.bus, camera.address, camera.video_index,
+                               vendor_id=self.vendor_id, product_id=self.product_id)
+                    for camera in DISCOVERY.find(self.vendor_id, self.product_id)]
+
+        specs = []
+        try:
+            devices = usb.core.find(find_all=True, idVendor=self.vendor_id, idProduct=self.product_id)
+            for device in devices:
+                ports = getattr(device, 'port_numbers', None)
+                specs.append(DeviceSpec(
+                    device_id=f"{device.bus}-{'.'.join(str(p) for p in ports or [device.address])}",
+                    bus=device.bus,
+                    address=device.address,
+                    video_index=None,
+                    vendor_id=self.vendor_id,
+                    product_id=self.product_id
+                ))
+        except Exception as e:
+            print(f"Device discovery failed: {e}")
+        return specs
+
+    @staticmethod
+    def fake_specs(count: int) -> List[DeviceSpec]:
+        """Specs for synthetic microscopes (testing without hardware)."""
+        return [DeviceSpec(f"fake{i}", None, None, None, fake=True) for i in range(count)]
+
+    def open(self, specs: List[DeviceSpec] = None) -> int:
+        """Start a capture worker for each device; returns the number opened."""
+        if specs is None:
+            specs = self.discover()
+
+        for spec in specs:
+            if spec.device_id in self.workers:
+                continue
+            if self.mode == 'process':
+                worker = _ProcessWorker(spec, self.ring_size, self._context)
+            else:
+                worker = _ThreadWorker(spec, self.ring_size)
+
+            if worker.start():
+                self.workers[spec.device_id] = worker
+                self._started[spec.device_id] = time.monotonic()
+            else:
+                print(f"Failed to open microscope {spec.device_id}")
+        return len(self.workers)
+
+    def capture_all(self, timeout: float = 1.0) -> Optional[MultiFrame]:
+        """
+        Capture one frame from every open microscope
+
+        Only frames published after this call started are returned, so all
+        frames are from the same moment to within about one frame period.
+        """
+        if not self.workers:
+            return None
+
+        start_seqs = {device_id: worker.latest_seq for device_id, worker in self.workers.items()}
+        deadline = time.monotonic() + timeout
+        frames, timestamps = {}, {}
+
+        # Cameras run concurrently; each wait only covers the remaining gap
+        for device_id, worker in self.workers.items():
+            result = worker.wait_for_next(start_seqs[device_id], max(0.0, deadline - time.monotonic()))
+            if result is None:
+                print(f"No frame from microscope {device_id}")
+                return None
+            _, timestamps[device_id], frames[device_id] = result
+
+        skew = max(timestamps.values()) - min(timestamps.values())
+        return MultiFrame(frames, timestamps, skew)
+
+    def get_stats(self) -> Dict[str, dict]:
+        """Return per-device throughput statistics."""
+        now = time.monotonic()
+        stats = {}
+        for device_id, worker in self.workers.items():
+            elapsed = max(now - self._started[device_id], 1e-6)
+            frames = worker.latest_seq
+            stats[device_id] = {
+                'frames': frames,
+                'fps': round(frames / elapsed, 2),
+                'failures': worker.failures,
+                'mode': self.mode
+            }
+        return stats
+
+    def close(self):
+        """Stop all capture workers."""
+        for worker in self.workers.values():
+            worker.stop()
+        self.workers.clear()
+        self._started.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def main():
+    """Main function - capture from all connected microscopes"""
+    parser = argparse.ArgumentParser(description="Capture from several microscopes at once")
+    parser.add_argument('--mode', choices=WORKER_MODES, default='process', help="Capture worker type")
+    parser.add_argument('--fake', type=int, default=0, metavar='N', help="Use N synthetic microscopes")
+    parser.add_argument('--seconds', type=float, default=5.0, help="Run time")
+    args = parser.parse_args()
+
+    with MicroscopeManager(mode=args.mode) as manager:
+        specs = manager.fake_specs(args.fake) if args.fake else manager.discover()
+        print(f"Found {len(specs)} microscope(s)")
+        if not manager.open(specs):
+            sys.exit(1)
+
+        captures, worst_skew = 0, 0.0
+        start = time.monotonic()
+        while time.monotonic() - start < args.seconds:
+            multi = manager.capture_all()
+            if multi:
+                captures += 1
+                worst_skew = max(worst_skew, multi.skew)
+
+        print(f"Synchronized captures: {captures}, worst skew {worst_skew * 1000:.1f} ms")
+        for device_id, stats in manager.get_stats().items():
+            print(f"  {device_id}: {stats['frames']} frames, {stats['fps']} fps, {stats['failures']} failures")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Pipeline Metrics
+Low-overhead per-stage latency histograms (HDR-style log-linear buckets)
+and counters, with snapshots as dicts, JSON or Prometheus text and an
+optional local HTTP endpoint
+"""
+
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# 16 linear sub-buckets per power of two: at most ~6% relative error
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+MAX_EXPONENT = 36  # Values are clamped at 2^37 ns (~137 s)
+BUCKET_COUNT = (MAX_EXPONENT - SUB_BITS + 2) * SUB_BUCKETS
+
+# Bucket bounds (seconds) used for the Prometheus histogram export
+PROMETHEUS_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                     0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PREFIX = 'microscope_'
+
+def _bucket_index(value: int) -> int:
+    if value < SUB_BUCKETS:
+        return max(value, 0)
+    exponent = min(value.bit_length() - 1, MAX_EXPONENT)
+    if exponent == MAX_EXPONENT and value >= 1 << (MAX_EXPONENT + 1):
+        return BUCKET_COUNT - 1
+    mantissa = value >> (exponent - SUB_BITS)
+    return (exponent - SUB_BITS + 1) * SUB_BUCKETS + mantissa - SUB_BUCKETS
+
+def _bucket_lower(index: int) -> int:
+    if index < SUB_BUCKETS:
+        return index
+    exponent = index // SUB_BUCKETS + SUB_BITS - 1
+    return (SUB_BUCKETS + index % SUB_BUCKETS) << (exponent - SUB_BITS)
+
+def _bucket_upper(index: int) -> int:
+    return _bucket_lower(index + 1) - 1 if index + 1 < BUCKET_COUNT else _bucket_lower(index) * 2
+
+class LatencyHistogram:
+    """Log-linear histogram of durations in nanoseconds"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self._counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, nanoseconds: int):
+        index = _bucket_index(nanoseconds)
+        with self._lock:
+            self._counts[index] += 1
+            if self.count == 0 or nanoseconds < self.min:
+                self.min = nanoseconds
+            if nanoseconds > self.max:
+                self.max = nanoseconds
+            self.count += 1
+            self.total += nanoseconds
+
+    def percentile(self, q: float) -> int:
+        """Midpoint (ns) of the bucket holding the q-th percentile."""
+        with self._lock:
+            return self._percentile(q)
+
+    def _percentile(self, q: float) -> int:
+        # Caller holds _lock
+        if self.count == 0:
+            return 0
+        target = max(1, int(round(q / 100.0 * self.count)))
+        seen = 0
+        for index, count in enumerate(self._counts):
+            seen += count
+            if seen >= target:
+                if index == BUCKET_COUNT - 1:
+                    return self.max  # Overflow bucket has no meaningful midpoint
+                return min((_bucket_lower(index) + _bucket_upper(index)) // 2, self.max)
+        return self.max
+
+    def cumulative(self, bounds_ns: List[int]) -> List[int]:
+        """Counts at or below each bound (bucket resolution)."""
+        with self._lock:
+            counts = list(self._counts)
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds_ns:
+            while index < BUCKET_COUNT and _bucket_upper(index) <= bound:
+                seen += counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+    def summary(self) -> dict:
+        """Consistent snapshot: all fields come from the same set of samples."""
+        with self._lock:
+            count, total, low, high = self.count, self.total, self.min, self.max
+            p50, p90, p99 = self._percentile(50), self._percentile(90), self._percentile(99)
+        return {
+            'count': count,
+            'mean_ms': total / count / 1e6 if count else 0.0,
+            'p50_ms': p50 / 1e6,
+            'p90_ms': p90 / 1e6,
+            'p99_ms': p99 / 1e6,
+            'min_ms': low / 1e6,
+            'max_ms': high / 1e6,
+        }
+
+class _StageTimer:
+    """Context manager form of Metrics.observe"""
+
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram: LatencyHistogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.record(time.perf_counter_ns() - self._start)
+
+class _NullTimer:
+    """Stand-in for _StageTimer while metrics are disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+class Metrics:
+    """Registry of stage latency histograms, counters and gauges"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stages: Dict[str, LatencyHistogram] = {}
+        self._counters: Dict[str, int] = {}
+        self._gauges: Dict[str, float] = {}
+        self.enabled = True
+
+    def _histogram(self, stage: str) -> LatencyHistogram:
+        histogram = self._stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._stages.setdefault(stage, LatencyHistogram())
+        return histogram
+
+    def observe(self, stage: str, start_ns: int):
+        """Record the time since start_ns (from time.perf_counter_ns()) for a stage."""
+        if self.enabled:
+            self._histogram(stage).record(time.perf_counter_ns() - start_ns)
+
+    def time(self, stage: str) -> _StageTimer:
+        """Time a with-block as one stage sample."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._histogram(stage))
+
+    def inc(self, counter: str, amount: int = 1):
+        """Increase a counter."""
+        if self.enabled:
+            with self._lock:
+                self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def set(self, gauge: str, value: float):
+        """Set a gauge to its current value."""
+        if self.enabled:
+            self._gauges[gauge] = value
+
+    def counter(self, name: str) -> int:
+        return self._counters.get(name, 0)
+
+    def gauge(self, name: str) -> Optional[float]:
+        return self._gauges.get(name)
+
+    def stage(self, name: str) -> Optional[LatencyHistogram]:
+        return self._stages.get(name)
+
+    def reset(self):
+        """Clear all stages and counters."""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def snapshot(self) -> dict:
+        """Current stage summaries, counters and gauges."""
+        with self._lock:
+            stages = dict(self._stages)
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+        return {
+            'timestamp': time.time(),
+            'stages': {name: histogram.summary() for name, histogram in sorted(stages.items())},
+            'counters': dict(sorted(counters.items())),
+            'gauges': dict(sorted(gauges.items())),
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format."""
+        with self._lock:
+            stages = dict(self._stages)
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        lines = []
+        for name, value in sorted(counters.items()):
+            metric = f"{PREFIX}{name}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        for name, value in sorted(gauges.items()):
+            metric = f"{PREFIX}{name}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {value}")
+
+        metric = f"{PREFIX}stage_latency_seconds"
+        lines.append(f"# HELP {metric} Latency of pipeline stages")
+        lines.append(f"# TYPE {metric} histogram")
+        bounds_ns = [int(bound * 1e9) for bound in PROMETHEUS_BOUNDS]
+        for name, histogram in sorted(stages.items()):
+            for bound, count in zip(PROMETHEUS_BOUNDS, histogram.cumulative(bounds_ns)):
+                lines.append(f'{metric}_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{metric}_sum{{stage="{name}"}} {histogram.total / 1e9:.9f}')
+            lines.append(f'{metric}_count{{stage="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry used by the driver, grabber, server and GUI
+METRICS = Metrics()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics = METRICS
+
+    def do_GET(self):
+        if self.path in ('/metrics', '/'):
+            body = self.metrics.to_prometheus().encode()
+            content_type = 'text/plain; version=0.0.4'
+        elif self.path == '/metrics.json':
+            body = self.metrics.to_json().encode()
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer:
+    """Serves /metrics (Prometheus text) and /metrics.json on a background thread"""
+
+    def __init__(self, metrics: Metrics = METRICS, host: str = '127.0.0.1', port: int = 9108):
+        handler = type('MetricsHandler', (_MetricsHandler,), {'metrics': metrics})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, name="MetricsServer", daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> 'MetricsServer':
+        self._thread.start()
+        print(f"Metrics available at http://{self.server.server_address[0]}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+def start_metrics_server(port: int = 9108, host: str = '127.0.0.1', metrics: Metrics = METRICS) -> MetricsServer:
+    """Start the local metrics endpoint."""
+    return MetricsServer(metrics, host, port).start()
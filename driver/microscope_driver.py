@@ -4,71 +4,116 @@ USB Microscope Driver
 Basic microscope control driver using libusb
 """
 
-import usb.core
 import usb.util
 import cv2
 import numpy as np
 import time
 import sys
+import os
 from typing import Optional, Tuple
 
+# Import driver modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.frame_grabber import FrameGrabber, GrabbedFrame
+from driver.jpeg_frame import JpegFrame, is_jpeg_buffer
+from driver.frame_stats import FrameStats, FrameStatsResult, SessionStats
+from driver.backends import UsbBackend
+from driver.metrics import METRICS
+
+MJPG_FOURCC = cv2.VideoWriter_fourcc(*'MJPG')
+
 class MicroscopeDriver:
     """USB Microscope Driver Class"""
     
-    def __init__(self, vendor_id: int = None, product_id: int = None):
+    def __init__(self, vendor_id: int = None, product_id: int = None, threaded: bool = False, ring_size: int = 4,
+                 video_device_index: int = None, bus: int = None, address: int = None, passthrough: bool = False,
+                 backend=None):
         """
         Initialize driver
         
         Args:
             vendor_id: USB Vendor ID (hexadecimal)
             product_id: USB Product ID (hexadecimal)
+            threaded: Start background acquisition on connect
+            ring_size: Number of frame slots used in threaded mode
+            video_device_index: Video device index (/dev/videoN); found through sysfs when omitted
+            bus: USB bus number, to select one of several identical microscopes
+            address: USB device address on that bus
+            passthrough: Request MJPEG and keep frames compressed until pixels are needed
+            backend: Device and capture source (default: real USB hardware; see driver.backends)
         """
         self.device = None
         self.vendor_id = vendor_id or 0x05e3  # Genesys Logic
         self.product_id = product_id or 0xf12a  # Digital Microscope
+        self.bus = bus
+        self.address = address
         self.is_connected = False
-        self.video_device_index = 4  # Microscope video device index
+        self.video_device_index = video_device_index  # Requested /dev/videoN (None: resolve on connect)
+        self.video_index = None  # Node actually opened
         self.cap = None  # OpenCV VideoCapture object
+        self.threaded = threaded
+        self.ring_size = ring_size
+        self.grabber = None  # Background FrameGrabber in threaded mode
+        self.passthrough = passthrough
+        self.stats = None  # FrameStats collector once enable_stats() is called
+        self.backend = backend or UsbBackend()
         
         # Microscope specific settings
         self.supported_resolutions = [(640, 480), (320, 240)]
         self.current_resolution = (640, 480)
+        self.frame_rate = 30
+        
+        # Simulated backends dictate the mode they were configured with
+        mode = getattr(self.backend, 'mode', None)
+        if mode:
+            self.current_resolution = (mode[0], mode[1])
+            self.frame_rate = mode[2]
         
     def connect(self) -> bool:
         """Attempt to connect to the microscope."""
         try:
-            # Find USB device
-            self.device = usb.core.find(
-                idVendor=self.vendor_id, 
-                idProduct=self.product_id
-            )
+            # Find USB device (optionally a specific unit by bus/address)
+            match = {}
+            if self.bus is not None:
+                match['bus'] = self.bus
+            if self.address is not None:
+                match['address'] = self.address
+            self.device = self.backend.find_device(self.vendor_id, self.product_id, **match)
             
             if self.device is None:
                 print("Microscope not found.")
                 return False
             
             # Print device information
-            try:
-                manufacturer = usb.util.get_string(self.device, self.device.iManufacturer)
-                product = usb.util.get_string(self.device, self.device.iProduct)
-                print(f"Connected device: {manufacturer} - {product}")
-            except:
+            strings = self.backend.device_strings(self.device)
+            if strings:
+                print(f"Connected device: {strings[0]} - {strings[1]}")
+            else:
                 print(f"Connected device: {self.device.idVendor:04x}:{self.device.idProduct:04x}")
             
-            # Initialize OpenCV VideoCapture
-            self.cap = cv2.VideoCapture(self.video_device_index)
+            # Initialize OpenCV VideoCapture; the node is looked up again on every
+            # connect so a re-enumerated device is found under its new number
+            self.video_index = self.video_device_index
+            if self.video_index is None:
+                self.video_index = self.backend.find_video_index(self.device)
+            self.cap = self.backend.open_capture(self.video_index)
             if not self.cap.isOpened():
-                print(f"Cannot open video device {self.video_device_index}.")
+                print(f"Cannot open video device {self.video_index}.")
                 return False
             
             # Video settings
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.cap.set(cv2.CAP_PROP_FPS, 30)
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.current_resolution[0])
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.current_resolution[1])
+            self.cap.set(cv2.CAP_PROP_FPS, self.frame_rate)
             self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimize buffer size
             
             self.is_connected = True
             print("Microscope connected successfully!")
+            
+            if self.passthrough:
+                self.enable_passthrough()
+            if self.threaded:
+                self.start_acquisition(self.ring_size)
             return True
             
         except Exception as e:
@@ -77,6 +122,8 @@ class MicroscopeDriver:
     
     def disconnect(self):
         """Disconnect from the microscope."""
+        self.stop_acquisition()
+        
         if self.cap:
             self.cap.release()
             self.cap = None
@@ -100,16 +147,13 @@ class MicroscopeDriver:
             'product_id': f"0x{self.device.idProduct:04x}",
             'bus': self.device.bus,
             'address': self.device.address,
-            'class': self.device.bDeviceClass
+            'class': self.device.bDeviceClass,
+            'video_index': self.video_index
         }
         
-        try:
-            info['manufacturer'] = usb.util.get_string(self.device, self.device.iManufacturer)
-            info['product'] = usb.util.get_string(self.device, self.device.iProduct)
-        except:
-            info['manufacturer'] = "Unknown"
-            info['product'] = "Unknown"
-        
+        manufacturer, product = self.backend.device_strings(self.device) or ("Unknown", "Unknown")
+        info['manufacturer'] = manufacturer
+        info['product'] = product
         return info
     
     def send_control_command(self, request: int, value: int = 0, index: int = 0, data: bytes = None) -> bool:
@@ -164,23 +208,215 @@ class MicroscopeDriver:
         except Exception as e:
             print(f"Error setting brightness: {e}")
             return False
-    
-    def capture_frame(self) -> Optional[np.ndarray]:
-        """Capture a frame."""
+
+    def get_capture_settings(self) -> dict:
+        """Return brightness, exposure and gain as reported by the device (NaN if unknown)."""
+        settings = {'brightness': float('nan'), 'exposure': float('nan'), 'gain': float('nan')}
+        if not self.cap:
+            return settings
+        props = {'brightness': cv2.CAP_PROP_BRIGHTNESS, 'exposure': cv2.CAP_PROP_EXPOSURE,
+                 'gain': cv2.CAP_PROP_GAIN}
+        for name, prop in props.items():
+            try:
+                settings[name] = float(self.cap.get(prop))
+            except Exception:
+                pass
+        return settings
+
+    def start_acquisition(self, ring_size: int = 4) -> bool:
+        """Start the background grab thread (threaded acquisition mode)."""
         if not self.is_connected or not self.cap:
             print("Microscope not connected.")
+            return False
+        
+        if self.grabber and self.grabber.is_running:
+            return True
+        
+        # Compressed frames vary in size, so slots are allocated as they arrive
+        frame_shape = None
+        if not self.passthrough:
+            width, height = self.get_frame_size()
+            frame_shape = (height, width, 3)
+        self.grabber = FrameGrabber(self.cap, ring_size, frame_shape)
+        if self.stats is not None:
+            self.grabber.on_frame = self.stats.update
+        self.grabber.start()
+        return True
+    
+    def stop_acquisition(self):
+        """Stop the background grab thread."""
+        if self.grabber:
+            self.grabber.stop()
+            self.grabber = None
+    
+    def get_latest_frame(self, copy: bool = True, decode: bool = True) -> Optional[GrabbedFrame]:
+        """Return the newest grabbed frame with its sequence number and timestamp."""
+        if not self.grabber:
+            return None
+        return self._decoded(self.grabber.latest(copy), decode)
+    
+    def wait_for_next(self, seq: int = 0, timeout: float = 1.0, copy: bool = True,
+                      decode: bool = True) -> Optional[GrabbedFrame]:
+        """
+        Block until a frame newer than seq has been grabbed
+        
+        In passthrough mode frames are decoded to BGR unless decode is False,
+        in which case the raw JPEG buffer is returned.
+        """
+        if not self.grabber:
             return None
+        return self._decoded(self.grabber.wait_for_next(seq, timeout, copy), decode)
+    
+    @staticmethod
+    def _decoded(grabbed: Optional[GrabbedFrame], decode: bool) -> Optional[GrabbedFrame]:
+        if grabbed is None or not decode or not is_jpeg_buffer(grabbed.frame):
+            return grabbed
+        return grabbed._replace(frame=cv2.imdecode(grabbed.frame.reshape(-1), cv2.IMREAD_COLOR))
+    
+    def enable_passthrough(self) -> bool:
+        """
+        Ask the camera for MJPEG and disable conversion to BGR
+
+        Frames then arrive as the JPEG bytes produced by the device. Returns
+        False if the backend rejected the request; capture_jpeg() still
+        works in that case by encoding pixels.
+        """
+        if not self.cap:
+            print("Microscope not connected.")
+            return False
+        
+        fourcc_ok = self.cap.set(cv2.CAP_PROP_FOURCC, MJPG_FOURCC)
+        convert_ok = self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        self.passthrough = True
+        if not (fourcc_ok and convert_ok):
+            print("MJPEG passthrough not supported by this device - frames will be encoded")
+            return False
+        return True
+    
+    def _read_buffer(self) -> Tuple[Optional[np.ndarray], float]:
+        """Read the next buffer (BGR pixels, or JPEG bytes in passthrough mode)."""
+        if self.grabber:
+            # Threaded mode: return the newest frame without touching the device
+            grabbed = self.grabber.latest() or self.grabber.wait_for_next(0)
+            if grabbed is None:
+                print("Frame capture failed")
+                return None, 0.0
+            return grabbed.frame, grabbed.timestamp
         
+        start = time.perf_counter_ns()
         try:
             ret, frame = self.cap.read()
             if ret:
-                return frame
+                METRICS.observe('usb_read', start)
+                METRICS.inc('frames_grabbed')
+                return frame, time.monotonic()
             else:
+                METRICS.inc('frames_failed')
                 print("Frame capture failed")
-                return None
+                return None, 0.0
         except Exception as e:
             print(f"Error capturing frame: {e}")
+            return None, 0.0
+    
+    def capture_frame(self) -> Optional[np.ndarray]:
+        """Capture a frame."""
+        if not self.is_connected or not self.cap:
+            print("Microscope not connected.")
+            return None
+        
+        start = time.perf_counter_ns()
+        frame, _ = self._read_buffer()
+        if self.stats is not None and not self.grabber and frame is not None:
+            # Threaded mode measures every grabbed frame on the acquisition thread instead
+            self.stats.update(frame)
+        if is_jpeg_buffer(frame):
+            # Passthrough mode: pixels were asked for, so decode now
+            decode_start = time.perf_counter_ns()
+            frame = cv2.imdecode(frame.reshape(-1), cv2.IMREAD_COLOR)
+            METRICS.observe('jpeg_decode', decode_start)
+        if frame is not None:
+            METRICS.observe('capture', start)
+        return frame
+    
+    def capture_buffer(self) -> Tuple[Optional[np.ndarray], float]:
+        """
+        Capture the next buffer as delivered, with its monotonic timestamp
+        
+        Returns BGR pixels, or the device JPEG in passthrough mode, without
+        decoding, so callers can decide cheaply whether a frame is needed.
+        """
+        if not self.is_connected or not self.cap:
+            print("Microscope not connected.")
+            return None, 0.0
+        frame, timestamp = self._read_buffer()
+        if self.stats is not None and not self.grabber and frame is not None:
+            self.stats.update(frame)
+        return frame, timestamp
+    
+    def capture_jpeg(self, quality: int = 95) -> Optional[JpegFrame]:
+        """
+        Capture a frame as JPEG
+        
+        In passthrough mode the device's own JPEG bytes are returned without
+        decoding or re-encoding; otherwise the frame is encoded at quality.
+        """
+        if not self.is_connected or not self.cap:
+            print("Microscope not connected.")
+            return None
+        
+        frame, timestamp = self._read_buffer()
+        if frame is None:
             return None
+        if is_jpeg_buffer(frame):
+            return JpegFrame(frame.tobytes(), timestamp)
+        
+        start = time.perf_counter_ns()
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            print("JPEG encoding failed")
+            return None
+        METRICS.observe('jpeg_encode', start)
+        return JpegFrame(buffer.tobytes(), timestamp, decoded=frame)
+    
+    def enable_stats(self, step: int = 4, luma: bool = True, window: int = 300) -> FrameStats:
+        """
+        Measure exposure statistics of every frame
+        
+        In threaded mode every grabbed frame is measured on the acquisition
+        thread; otherwise each capture_frame() call is measured.
+        """
+        self.stats = FrameStats(step, luma, window)
+        if self.grabber:
+            self.grabber.on_frame = self.stats.update
+        return self.stats
+    
+    def disable_stats(self):
+        """Stop measuring frame statistics."""
+        self.stats = None
+        if self.grabber:
+            self.grabber.on_frame = None
+    
+    def get_frame_stats(self) -> Optional[FrameStatsResult]:
+        """Statistics of the most recently measured frame."""
+        return self.stats.latest if self.stats else None
+    
+    def get_session_stats(self) -> Optional[SessionStats]:
+        """Aggregates over all measured frames since enable_stats()."""
+        return self.stats.session() if self.stats else None
+    
+    def burst(self, n: int, output_dir: str = '.', **kwargs):
+        """
+        Capture n consecutive frames and save them on a parallel encode pool
+        
+        Returns a BurstJob (see driver.burst) whose wait() gives the saved paths.
+        """
+        from driver.burst import burst
+        return burst(self, n, output_dir, **kwargs)
+    
+    def capture_averaged(self, n: int = 8) -> Optional[np.ndarray]:
+        """Capture the mean of n consecutive frames (lower sensor noise)."""
+        from driver.denoise import capture_averaged
+        return capture_averaged(self, n)
     
     def start_video_stream(self):
         """Start video stream."""
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Slide Mosaic
+Stitches live frames of a slide moved under the microscope into one large
+image: each frame is registered against a reference frame by phase
+correlation on a downsampled grayscale copy (refined on a full-resolution
+centre patch), then feather-blended into a
+tiled canvas. Only recently used tiles stay in memory; the rest are spilled
+to disk and reloaded when the scan returns to them.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import collections
+import cv2
+import numpy as np
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+# Import driver modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.metrics import METRICS
+from driver.pyramid import PyramidWriter
+
+TILE_SIZE = 256
+REFINE_SIZE = 128  # Edge of the full-resolution patch used to refine the coarse shift
+
+class MosaicUpdate(NamedTuple):
+    """Result of adding one frame"""
+    x: float  # Canvas position of the frame's top-left corner
+    y: float
+    response: float  # Phase correlation peak; low values mean no reliable match
+    blended: bool  # The frame was blended into the canvas
+    lost: bool  # Registration failed and the frame was ignored
+
+class _Tile:
+    """Blended pixels and accumulated blend weight of one canvas tile"""
+    __slots__ = ('image', 'weight')
+
+    def __init__(self, size: int):
+        self.image = np.zeros((size, size, 3), dtype=np.uint8)
+        self.weight = np.zeros((size, size), dtype=np.float32)
+
+class Mosaic:
+    """Incrementally stitched canvas built from overlapping frames"""
+
+    def __init__(self, scale: float = 0.25, tile_size: int = TILE_SIZE, max_tiles: int = 48,
+                 blend_step: float = 8.0, rekey: float = 0.25, rekey_response: float = 0.5,
+                 min_response: float = 0.1, feather: float = 0.2,
+                 max_weight: float = 4.0, tile_dir: str = None):
+        """
+        Initialize mosaic
+
+        Args:
+            scale: Registration image size relative to the frame
+            tile_size: Canvas tile edge in pixels
+            max_tiles: Tiles kept in memory; least recently used tiles are spilled
+            blend_step: Movement in pixels since the last blended frame before
+                        the next one is blended (a still slide costs registration only)
+            rekey: Movement, as a fraction of the frame size, after which the
+                   current frame becomes the registration reference (fewer
+                   reference changes means less accumulated error)
+            rekey_response: Correlation peak below which the current frame
+                            becomes the reference while the match is still reliable
+            min_response: Phase correlation peak below which a frame counts as lost
+            feather: Fraction of the frame edge over which blend weight ramps up
+            max_weight: Cap on a pixel's accumulated weight, so later passes
+                        still refresh the canvas
+            tile_dir: Directory for spilled tiles (default: a temporary directory
+                      removed by close())
+        """
+        self.scale = scale
+        self.tile_size = tile_size
+        self.max_tiles = max_tiles
+        self.blend_step = blend_step
+        self.rekey = rekey
+        self.rekey_response = rekey_response
+        self.min_response = min_response
+        self.feather = feather
+        self.max_weight = max_weight
+        self._owns_dir = tile_dir is None
+        self.tile_dir = tempfile.mkdtemp(prefix="mosaic-") if tile_dir is None else tile_dir
+        os.makedirs(self.tile_dir, exist_ok=True)
+
+        self._tiles: 'collections.OrderedDict[Tuple[int, int], _Tile]' = collections.OrderedDict()
+        self._spilled = set()
+        self._window = None
+        self._weights = None
+        self._key_gray = None
+        self._key_patch = None
+        self._patch_window = None
+        self._key_position = (0.0, 0.0)
+        self._blend_position = None
+        self.position = (0.0, 0.0)
+        self.bounds = None  # (x0, y0, x1, y1) of blended pixels
+        self.frames_added = 0
+        self.frames_blended = 0
+        self.frames_lost = 0
+
+    def close(self):
+        """Drop all tiles and remove a temporary tile directory."""
+        self._tiles.clear()
+        self._spilled.clear()
+        if self._owns_dir:
+            shutil.rmtree(self.tile_dir, ignore_errors=True)
+
+    def __enter__(self) -> 'Mosaic':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        # Shrink first so the color conversion touches fewer pixels
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return np.float32(small)
+
+    def _patch(self, frame: np.ndarray, cx: int, cy: int) -> Optional[np.ndarray]:
+        """Full-resolution grayscale patch centred on (cx, cy), None if it leaves the frame."""
+        size = self._patch_window.shape[0]
+        x0, y0 = cx - size // 2, cy - size // 2
+        if x0 < 0 or y0 < 0 or x0 + size > frame.shape[1] or y0 + size > frame.shape[0]:
+            return None
+        patch = frame[y0:y0 + size, x0:x0 + size]
+        if patch.ndim == 3:
+            patch = cv2.cvtColor(patch, cv2.COLOR_BGR2GRAY)
+        return np.float32(patch)
+
+    def _refine(self, frame: np.ndarray, dx: float, dy: float) -> Tuple[float, float]:
+        """Correct the coarse shift to subpixel accuracy at full resolution."""
+        if self._key_patch is None:
+            return dx, dy
+        height, width = frame.shape[:2]
+        ix, iy = int(round(dx)), int(round(dy))
+        patch = self._patch(frame, width // 2 + ix, height // 2 + iy)
+        if patch is None:
+            return dx, dy
+        (rx, ry), response = cv2.phaseCorrelate(self._key_patch, patch, self._patch_window)
+        # Keep the coarse estimate if the patch is featureless or disagrees
+        if response < self.min_response or max(abs(ix + rx - dx), abs(iy + ry - dy)) > 1.0 / self.scale:
+            return dx, dy
+        return ix + rx, iy + ry
+
+    def _set_key(self, frame: np.ndarray, gray: np.ndarray, x: float, y: float):
+        height, width = frame.shape[:2]
+        self._key_gray = gray
+        self._key_patch = self._patch(frame, width // 2, height // 2)
+        self._key_position = (x, y)
+
+    def _feather(self, height: int, width: int) -> np.ndarray:
+        """Blend weight of each frame pixel, highest in the middle."""
+        if self._weights is None or self._weights.shape != (height, width):
+            def ramp(n):
+                edge = np.minimum(np.arange(n) + 0.5, n - np.arange(n) - 0.5)
+                return np.clip(edge / max(1.0, n * self.feather), 0.05, 1.0).astype(np.float32)
+            self._weights = np.outer(ramp(height), ramp(width))
+        return self._weights
+
+    def add(self, frame: np.ndarray) -> Optional[MosaicUpdate]:
+        """
+        Register a BGR frame and blend it in if the slide has moved far enough
+
+        Returns a MosaicUpdate, or None for an empty frame.
+        """
+        if frame is None:
+            return None
+        self.frames_added += 1
+
+        start = time.perf_counter_ns()
+        gray = self._prepare(frame)
+        if self._key_gray is None or self._key_gray.shape != gray.shape:
+            self._window = cv2.createHanningWindow(gray.shape[::-1], cv2.CV_32F)
+            size = min(REFINE_SIZE, frame.shape[0] // 2, frame.shape[1] // 2) & ~1
+            self._patch_window = cv2.createHanningWindow((size, size), cv2.CV_32F)
+            self._key_gray = None
+            response, dx, dy = 1.0, 0.0, 0.0
+        else:
+            (dx, dy), response = cv2.phaseCorrelate(self._key_gray, gray, self._window)
+            if response >= self.min_response:
+                dx, dy = self._refine(frame, dx / self.scale, dy / self.scale)
+        METRICS.observe('mosaic_register', start)
+
+        if response < self.min_response:
+            self.frames_lost += 1
+            METRICS.inc('mosaic_frames_lost')
+            x, y = self.position
+            return MosaicUpdate(x, y, response, False, True)
+
+        # Content moving by (dx, dy) in the image means the view moved by (-dx, -dy)
+        x, y = self._key_position[0] - dx, self._key_position[1] - dy
+        self.position = (x, y)
+        if self._key_gray is None or response < self.rekey_response or \
+                np.hypot(dx, dy) > self.rekey * min(frame.shape[:2]):
+            self._set_key(frame, gray, x, y)
+
+        if self._blend_position is not None and \
+                np.hypot(x - self._blend_position[0], y - self._blend_position[1]) < self.blend_step:
+            return MosaicUpdate(x, y, response, False, False)
+
+        start = time.perf_counter_ns()
+        self._blend(frame, int(round(x)), int(round(y)))
+        METRICS.observe('mosaic_blend', start)
+        self.frames_blended += 1
+        self._blend_position = (x, y)
+        return MosaicUpdate(x, y, response, True, False)
+
+    def _blend(self, frame: np.ndarray, x: int, y: int):
+        """Weighted running average of the frame into every tile it covers."""
+        height, width = frame.shape[:2]
+        weights = self._feather(height, width)
+        size = self.tile_size
+
+        for ty in range(y // size, (y + height - 1) // size + 1):
+            for tx in range(x // size, (x + width - 1) // size + 1):
+                tile = self._tile((tx, ty))
+                # Overlap in canvas coordinates, then in tile and frame coordinates
+                x0, x1 = max(x, tx * size), min(x + width, (tx + 1) * size)
+                y0, y1 = max(y, ty * size), min(y + height, (ty + 1) * size)
+                tile_rows, tile_cols = slice(y0 - ty * size, y1 - ty * size), slice(x0 - tx * size, x1 - tx * size)
+                frame_rows, frame_cols = slice(y0 - y, y1 - y), slice(x0 - x, x1 - x)
+
+                weight = weights[frame_rows, frame_cols]
+                accumulated = tile.weight[tile_rows, tile_cols]
+                total = accumulated + weight
+                alpha = (weight / total)[..., None]
+                current = tile.image[tile_rows, tile_cols].astype(np.float32)
+                current += (frame[frame_rows, frame_cols] - current) * alpha
+                tile.image[tile_rows, tile_cols] = current + 0.5
+                np.minimum(total, self.max_weight, out=tile.weight[tile_rows, tile_cols])
+
+        bounds = (x, y, x + width, y + height)
+        if self.bounds is not None:
+            bounds = (min(self.bounds[0], x), min(self.bounds[1], y),
+                      max(self.bounds[2], x + width), max(self.bounds[3], y + height))
+        self.bounds = bounds
+
+        while len(self._tiles) > self.max_tiles:
+            self._spill(*self._tiles.popitem(last=False))
+
+    def _tile_path(self, key: Tuple[int, int]) -> str:
+        return os.path.join(self.tile_dir, f"tile_{key[0]}_{key[1]}.png")
+
+    def _tile(self, key: Tuple[int, int]) -> _Tile:
+        """Working-set tile for key, reloaded or created as needed."""
+        tile = self._tiles.get(key)
+        if tile is not None:
+            self._tiles.move_to_end(key)
+            return tile
+        tile = self._load(key) if key in self._spilled else None
+        if tile is None:
+            tile = _Tile(self.tile_size)
+        self._tiles[key] = tile
+        return tile
+
+    def _spill(self, key: Tuple[int, int], tile: _Tile):
+        # The weight travels as the alpha channel, scaled to max_weight
+        alpha = np.uint8(np.clip(tile.weight * (255.0 / self.max_weight) + 0.5, 0, 255))
+        cv2.imwrite(self._tile_path(key), cv2.merge([*cv2.split(tile.image), alpha]),
+                    [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        self._spilled.add(key)
+        METRICS.inc('mosaic_tiles_spilled')
+
+    def _load(self, key: Tuple[int, int]) -> Optional[_Tile]:
+        stored = cv2.imread(self._tile_path(key), cv2.IMREAD_UNCHANGED)
+        if stored is None:
+            print(f"Cannot read mosaic tile {key}")
+            return None
+        tile = _Tile(self.tile_size)
+        tile.image[:] = stored[..., :3]
+        tile.weight[:] = stored[..., 3] * (self.max_weight / 255.0)
+        return tile
+
+    def tile_keys(self) -> Iterator[Tuple[int, int]]:
+        """Keys (tx, ty) of every tile in memory or on disk."""
+        return iter(sorted(set(self._tiles) | self._spilled))
+
+    def read_tile(self, key: Tuple[int, int]) -> Optional[np.ndarray]:
+        """BGR pixels of one tile without changing the working set."""
+        tile = self._tiles.get(key)
+        if tile is not None:
+            return tile.image.copy()
+        if key in self._spilled:
+            stored = cv2.imread(self._tile_path(key), cv2.IMREAD_COLOR)
+            if stored is not None:
+                return stored
+        return None
+
+    def flush(self):
+        """Write every tile in memory to the tile directory (they stay in memory)."""
+        for key, tile in self._tiles.items():
+            self._spill(key, tile)
+
+    def read_region(self, x: int, y: int, width: int, height: int) -> np.ndarray:
+        """Canvas pixels of a rectangle (black where nothing was blended)."""
+        output = np.zeros((height, width, 3), dtype=np.uint8)
+        size = self.tile_size
+        for ty in range(y // size, (y + height - 1) // size + 1):
+            for tx in range(x // size, (x + width - 1) // size + 1):
+                image = self.read_tile((tx, ty))
+                if image is None:
+                    continue
+                x0, x1 = max(x, tx * size), min(x + width, (tx + 1) * size)
+                y0, y1 = max(y, ty * size), min(y + height, (ty + 1) * size)
+                output[y0 - y:y1 - y, x0 - x:x1 - x] = image[y0 - ty * size:y1 - ty * size,
+                                                             x0 - tx * size:x1 - tx * size]
+        return output
+
+    def save_pyramid(self, path: str, **kwargs) -> bool:
+        """
+        Save the stitched image as a tiled pyramid file
+
+        The canvas is streamed a strip at a time, so the full image is never
+        held in memory. kwargs are passed to PyramidWriter.
+        """
+        if self.bounds is None:
+            print("Mosaic is empty")
+            return False
+        x0, y0, x1, y1 = self.bounds
+        writer = PyramidWriter(path, x1 - x0, y1 - y0, **kwargs)
+        try:
+            for y in range(y0, y1, writer.tile_size):
+                writer.write_strip(self.read_region(x0, y, x1 - x0, min(writer.tile_size, y1 - y)))
+        finally:
+            complete = writer.close()
+        return complete
+
+    def render(self, scale: float = 1.0) -> Optional[np.ndarray]:
+        """
+        Assemble the stitched image, optionally downscaled
+
+        Tiles are placed one at a time, so memory use is the output size.
+        Returns None before any frame has been blended.
+        """
+        if self.bounds is None:
+            return None
+        x0, y0, x1, y1 = self.bounds
+        width, height = max(1, int(round((x1 - x0) * scale))), max(1, int(round((y1 - y0) * scale)))
+        output = np.zeros((height, width, 3), dtype=np.uint8)
+
+        for key in self.tile_keys():
+            image = self.read_tile(key)
+            if image is None:
+                continue
+            # Tile corners in output pixels; rounding both edges keeps neighbours seamless
+            left = int(round((key[0] * self.tile_size - x0) * scale))
+            top = int(round((key[1] * self.tile_size - y0) * scale))
+            right = int(round(((key[0] + 1) * self.tile_size - x0) * scale))
+            bottom = int(round(((key[1] + 1) * self.tile_size - y0) * scale))
+            if right <= left or bottom <= top:
+                continue
+            if scale != 1.0:
+                image = cv2.resize(image, (right - left, bottom - top), interpolation=cv2.INTER_AREA)
+            # Clip to the output
+            cl, ct = max(0, -left), max(0, -top)
+            cr, cb = min(right, width) - left, min(bottom, height) - top
+            if cr <= cl or cb <= ct:
+                continue
+            output[top + ct:top + cb, left + cl:left + cr] = image[ct:cb, cl:cr]
+        return output
+
+    def save(self, path: str, scale: float = 1.0) -> bool:
+        """Save the stitched image."""
+        image = self.render(scale)
+        if image is None:
+            print("Mosaic is empty")
+            return False
+        return cv2.imwrite(path, image)
+
+    def get_status(self) -> Dict:
+        """Registration and memory statistics."""
+        return {
+            'frames_added': self.frames_added,
+            'frames_blended': self.frames_blended,
+            'frames_lost': self.frames_lost,
+            'position': (round(self.position[0], 1), round(self.position[1], 1)),
+            'bounds': self.bounds,
+            'tiles_in_memory': len(self._tiles),
+            'tiles_total': len(set(self._tiles) | self._spilled),
+        }
+
+def scan(driver, mosaic: Mosaic, duration: float = None, count: int = None) -> int:
+    """
+    Feed live frames into a mosaic
+
+    In threaded mode the newest frame is always taken, so a slow blend skips
+    frames instead of falling behind the camera.
+
+    Args:
+        driver: Connected MicroscopeDriver
+        mosaic: Mosaic to build
+        duration: Seconds to scan (None for no limit)
+        count: Frames to add (None for no limit)
+
+    Returns the number of frames added.
+    """
+    deadline = time.monotonic() + duration if duration is not None else None
+    seq = 0
+    added = 0
+    while (count is None or added < count) and (deadline is None or time.monotonic() < deadline):
+        if driver.grabber:
+            # Registration copies what it keeps, so the ring slot need not be copied
+            grabbed = driver.wait_for_next(seq, timeout=0.5, copy=False)
+            if grabbed is None:
+                continue
+            seq, frame = grabbed.seq, grabbed.frame
+        else:
+            frame = driver.capture_frame()
+            if frame is None:
+                continue
+        mosaic.add(frame)
+        added += 1
+    return added
+
+def main():
+    """Stitch a slide scan from the microscope."""
+    parser = argparse.ArgumentParser(description="Microscope slide mosaic")
+    parser.add_argument('output', help="Stitched image path")
+    parser.add_argument('--duration', type=float, default=30.0, help="Seconds to scan")
+    parser.add_argument('--fake', action='store_true', help="Use a synthetic camera instead of the device")
+    parser.add_argument('--device', type=int, help="Video device index")
+    parser.add_argument('--scale', type=float, default=0.25, help="Registration scale")
+    parser.add_argument('--max-tiles', type=int, default=48, help="Tiles kept in memory")
+    parser.add_argument('--tile-dir', help="Keep the canvas tiles in this directory")
+    parser.add_argument('--preview-scale', type=float, default=1.0, help="Scale of the saved image")
+    parser.add_argument('--pyramid', help="Also save a tiled pyramid file for the viewer")
+    args = parser.parse_args()
+
+    if args.fake:
+        from driver.fake_camera import FakeMicroscopeDriver
+        driver = FakeMicroscopeDriver(threaded=True)
+    else:
+        from driver.microscope_driver import MicroscopeDriver
+        driver = MicroscopeDriver(threaded=True, video_device_index=args.device)
+    if not driver.connect():
+        print("Microscope connection failed")
+        return
+
+    with Mosaic(scale=args.scale, max_tiles=args.max_tiles, tile_dir=args.tile_dir) as mosaic:
+        try:
+            print(f"Scanning for {args.duration:.0f} s - move the slide slowly")
+            scan(driver, mosaic, duration=args.duration)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            driver.disconnect()
+
+        if args.tile_dir:
+            mosaic.flush()
+        status = mosaic.get_status()
+        print(f"Added {status['frames_added']} frames, blended {status['frames_blended']}, "
+              f"lost {status['frames_lost']}, {status['tiles_total']} tiles")
+        if mosaic.save(args.output, args.preview_scale):
+            print(f"Mosaic saved: {args.output}")
+        if args.pyramid and mosaic.save_pyramid(args.pyramid):
+            print(f"Pyramid saved: {args.pyramid}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Tiled Image Pyramid
+Single-file multi-resolution format for large mosaics and captures: fixed
+size tiles at successive 2x downsampled levels, a fixed-size index of tile
+offsets that readers memory-map, and individually encoded tiles, so a
+viewer decodes only the tiles it shows.
+
+Layout:
+    header  - magic, version, width, height, tile size, channels, levels, codec
+    index   - (offset, length) per tile, level 0 first, row-major
+    tiles   - JPEG or PNG encoded tiles
+
+The writer takes level-0 strips one tile high, encodes tiles on a thread
+pool and builds the coarser levels from each strip as it arrives, so memory
+use is a few strips regardless of image size.
+"""
+
+import os
+import sys
+import mmap
+import math
+import struct
+import argparse
+import collections
+import cv2
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, List, Optional, Tuple
+
+MAGIC = b'EPYR'
+VERSION = 1
+HEADER = struct.Struct('<4sHIIHBBB13x')  # Padded to 32 bytes so the index is aligned
+INDEX_DTYPE = np.dtype([('offset', '<u8'), ('length', '<u4')])
+CODECS = {'jpg': 0, 'png': 1}
+DEFAULT_TILE_SIZE = 256
+
+def level_count(width: int, height: int, tile_size: int) -> int:
+    """Levels needed until the whole image fits in one tile."""
+    levels = 1
+    while max(width, height) > tile_size:
+        width, height = (width + 1) // 2, (height + 1) // 2
+        levels += 1
+    return levels
+
+def level_shape(width: int, height: int, level: int) -> Tuple[int, int]:
+    """(width, height) of a level."""
+    scale = 1 << level
+    return -(-width // scale), -(-height // scale)
+
+class PyramidWriter:
+    """Streams a pyramid file from level-0 strips"""
+
+    def __init__(self, path: str, width: int, height: int, channels: int = 3, tile_size: int = DEFAULT_TILE_SIZE,
+                 format: str = 'jpg', quality: int = 90, workers: int = None):
+        """
+        Initialize writer
+
+        Args:
+            path: Output file
+            width: Image width in pixels
+            height: Image height in pixels
+            channels: 3 for BGR, 1 for grayscale
+            tile_size: Tile edge in pixels (even)
+            format: 'jpg' or 'png' (lossless)
+            quality: JPEG quality
+            workers: Encoding threads (OpenCV releases the GIL; defaults to the CPU count)
+        """
+        if format not in CODECS:
+            raise ValueError(f"format must be one of {tuple(CODECS)}")
+        if tile_size % 2:
+            raise ValueError("tile_size must be even")
+
+        self.path = path
+        self.width = width
+        self.height = height
+        self.channels = channels
+        self.tile_size = tile_size
+        self.format = format
+        self.levels = level_count(width, height, tile_size)
+        self._params = [cv2.IMWRITE_JPEG_QUALITY, quality] if format == 'jpg' else [cv2.IMWRITE_PNG_COMPRESSION, 3]
+
+        # Index position of each level's first tile
+        self._grids = []
+        self._bases = []
+        total = 0
+        for level in range(self.levels):
+            w, h = level_shape(width, height, level)
+            grid = (-(-w // tile_size), -(-h // tile_size))
+            self._grids.append(grid)
+            self._bases.append(total)
+            total += grid[0] * grid[1]
+        self._index = np.zeros(total, dtype=INDEX_DTYPE)
+        self._next_row = [0] * self.levels
+        self._carry: List[Optional[np.ndarray]] = [None] * self.levels  # Half strip waiting for its pair
+
+        self._workers = workers or os.cpu_count() or 1
+        self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="pyramid-encode")
+        self._pending: Deque = collections.deque()
+        self._file = open(path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, VERSION, width, height, tile_size, channels, self.levels,
+                                     CODECS[format]))
+        self._file.write(self._index.tobytes())  # Rewritten by close()
+        self._offset = self._file.tell()
+
+    def __enter__(self) -> 'PyramidWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write_strip(self, strip: np.ndarray):
+        """
+        Add the next level-0 strip: tile_size rows (fewer for the last) of full width
+
+        The strip must not be modified afterwards; tiles are encoded from it
+        in the background.
+        """
+        self._add_strip(0, strip)
+
+    def _add_strip(self, level: int, strip: np.ndarray):
+        row = self._next_row[level]
+        columns, rows = self._grids[level]
+        if row >= rows:
+            raise ValueError(f"Too many strips for level {level}")
+        self._next_row[level] += 1
+
+        base = self._bases[level] + row * columns
+        size = self.tile_size
+        for column in range(columns):
+            tile = strip[:, column * size:(column + 1) * size]
+            self._pending.append((base + column, self._executor.submit(self._encode, tile)))
+
+        if level + 1 < self.levels:
+            # Each strip halves into half a strip of the next level; pairs make a full one
+            w, h = strip.shape[1], strip.shape[0]
+            half = cv2.resize(strip, ((w + 1) // 2, (h + 1) // 2), interpolation=cv2.INTER_AREA)
+            carry = self._carry[level + 1]
+            if carry is None:
+                self._carry[level + 1] = half
+            else:
+                self._carry[level + 1] = None
+                self._add_strip(level + 1, np.vstack((carry, half)))
+
+        self._drain(limit=self._workers * 4)
+
+    def _encode(self, tile: np.ndarray) -> bytes:
+        ok, buffer = cv2.imencode('.' + self.format, np.ascontiguousarray(tile), self._params)
+        if not ok:
+            raise RuntimeError("Tile encoding failed")
+        return buffer.tobytes()
+
+    def _drain(self, limit: int = 0):
+        """Write finished tiles in submission order, waiting while more than limit are queued."""
+        while self._pending and (len(self._pending) > limit or self._pending[0][1].done()):
+            position, future = self._pending.popleft()
+            data = future.result()
+            self._file.write(data)
+            self._index[position] = (self._offset, len(data))
+            self._offset += len(data)
+
+    def close(self) -> bool:
+        """Flush the coarse levels and write the index; False if strips were missing."""
+        if self._file is None:
+            return True
+        try:
+            # A level fed an odd number of strips still holds a half strip
+            for level in range(1, self.levels):
+                carry, self._carry[level] = self._carry[level], None
+                if carry is not None:
+                    self._add_strip(level, carry)
+            self._drain()
+            self._file.seek(HEADER.size)
+            self._file.write(self._index.tobytes())
+        finally:
+            self._file.close()
+            self._file = None
+            self._executor.shutdown(wait=True)
+
+        complete = all(done == grid[1] for done, grid in zip(self._next_row, self._grids))
+        if not complete:
+            print(f"Pyramid incomplete: {self._next_row[0]} of {self._grids[0][1]} strips written")
+        return complete
+
+def write_pyramid(image: np.ndarray, path: str, **kwargs) -> bool:
+    """Write an in-memory image as a pyramid file (kwargs as for PyramidWriter)."""
+    height, width = image.shape[:2]
+    channels = image.shape[2] if image.ndim == 3 else 1
+    writer = PyramidWriter(path, width, height, channels, **kwargs)
+    try:
+        for y in range(0, height, writer.tile_size):
+            writer.write_strip(image[y:y + writer.tile_size])
+    finally:
+        complete = writer.close()
+    return complete
+
+class PyramidImage:
+    """Lazily decoded, memory-mapped pyramid file"""
+
+    def __init__(self, path: str, cache_tiles: int = 128):
+        """
+        Open a pyramid file
+
+        Args:
+            path: Pyramid file
+            cache_tiles: Decoded tiles kept (least recently used are dropped)
+        """
+        self.path = path
+        self.cache_tiles = cache_tiles
+        self._cache: 'collections.OrderedDict[Tuple[int, int, int], np.ndarray]' = collections.OrderedDict()
+        self._map = None
+        self._index = None
+        self.tiles_decoded = 0
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.width, self.height, self.tile_size, self.channels, self.levels, codec = \
+                HEADER.unpack_from(self._map, 0)
+        except (ValueError, struct.error):
+            self.close()
+            raise ValueError(f"Not a pyramid file: {path}")
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"Not a pyramid file: {path}")
+        self.format = {code: name for name, code in CODECS.items()}.get(codec, 'jpg')
+
+        self._grids = []
+        self._bases = []
+        total = 0
+        for level in range(self.levels):
+            w, h = level_shape(self.width, self.height, level)
+            grid = (-(-w // self.tile_size), -(-h // self.tile_size))
+            self._grids.append(grid)
+            self._bases.append(total)
+            total += grid[0] * grid[1]
+        self._index = np.frombuffer(self._map, dtype=INDEX_DTYPE, count=total, offset=HEADER.size)
+
+    def close(self):
+        self._cache.clear()
+        self._index = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self) -> 'PyramidImage':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def level_shape(self, level: int) -> Tuple[int, int]:
+        """(width, height) of a level."""
+        return level_shape(self.width, self.height, level)
+
+    def grid(self, level: int) -> Tuple[int, int]:
+        """(columns, rows) of tiles in a level."""
+        return self._grids[level]
+
+    def level_for_zoom(self, zoom: float) -> int:
+        """Coarsest level that still has at least one pixel per screen pixel at zoom."""
+        if zoom >= 1.0:
+            return 0
+        return min(self.levels - 1, int(math.floor(math.log2(1.0 / zoom) + 1e-9)))
+
+    def read_tile(self, level: int, column: int, row: int) -> Optional[np.ndarray]:
+        """Decoded tile (edge tiles are smaller), or None if missing."""
+        key = (level, column, row)
+        tile = self._cache.get(key)
+        if tile is not None:
+            self._cache.move_to_end(key)
+            return tile
+
+        columns, rows = self._grids[level]
+        if not (0 <= column < columns and 0 <= row < rows):
+            return None
+        offset, length = self._index[self._bases[level] + row * columns + column]
+        if not length:
+            return None
+        data = np.frombuffer(self._map, dtype=np.uint8, count=int(length), offset=int(offset))
+        tile = cv2.imdecode(data, cv2.IMREAD_UNCHANGED)
+        if tile is None:
+            print(f"Cannot decode pyramid tile {key}")
+            return None
+        self.tiles_decoded += 1
+        self._cache[key] = tile
+        while len(self._cache) > self.cache_tiles:
+            self._cache.popitem(last=False)
+        return tile
+
+    def read_region(self, x: float, y: float, width: float, height: float, zoom: float = 1.0) -> np.ndarray:
+        """
+        Viewport of the image at a zoom factor
+
+        x, y, width and height are in full-resolution pixels; the result is
+        (height * zoom, width * zoom). Only tiles of the matching level that
+        intersect the viewport are decoded. Areas outside the image are black.
+        """
+        level = self.level_for_zoom(zoom)
+        factor = float(1 << level)
+        out_w, out_h = max(1, int(round(width * zoom))), max(1, int(round(height * zoom)))
+
+        # Viewport at the chosen level, widened to whole pixels
+        left, top = int(math.floor(x / factor)), int(math.floor(y / factor))
+        right, bottom = int(math.ceil((x + width) / factor)), int(math.ceil((y + height) / factor))
+        shape = (bottom - top, right - left) + ((self.channels,) if self.channels > 1 else ())
+        region = np.zeros(shape, dtype=np.uint8)
+
+        size = self.tile_size
+        columns, rows = self._grids[level]
+        for row in range(max(0, top // size), min(rows, -(-bottom // size))):
+            for column in range(max(0, left // size), min(columns, -(-right // size))):
+                tile = self.read_tile(level, column, row)
+                if tile is None:
+                    continue
+                tx, ty = column * size, row * size
+                x0, y0 = max(left, tx), max(top, ty)
+                x1, y1 = min(right, tx + tile.shape[1]), min(bottom, ty + tile.shape[0])
+                if x1 > x0 and y1 > y0:
+                    region[y0 - top:y1 - top, x0 - left:x1 - left] = tile[y0 - ty:y1 - ty, x0 - tx:x1 - tx]
+
+        # Trim the sub-pixel offset and scale to the requested size
+        sx, sy = x / factor - left, y / factor - top
+        scale = zoom * factor
+        if abs(sx) < 1e-6 and abs(sy) < 1e-6 and abs(scale - 1.0) < 1e-6 and region.shape[:2] == (out_h, out_w):
+            return region
+        matrix = np.float32([[scale, 0, -sx * scale], [0, scale, -sy * scale]])
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        if interpolation == cv2.INTER_AREA:
+            # warpAffine has no area filter; resize first, then shift
+            region = cv2.resize(region, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            matrix = np.float32([[1, 0, -sx * scale], [0, 1, -sy * scale]])
+            interpolation = cv2.INTER_LINEAR
+        return cv2.warpAffine(region, matrix, (out_w, out_h), flags=interpolation, borderValue=0)
+
+    def read_level(self, level: int) -> np.ndarray:
+        """Whole level as one image."""
+        width, height = self.level_shape(level)
+        factor = 1 << level
+        return self.read_region(0, 0, width * factor, height * factor, 1.0 / factor)
+
+def main():
+    """Convert an image to a pyramid file, or export one level of a pyramid."""
+    parser = argparse.ArgumentParser(description="Tiled image pyramid conversion")
+    parser.add_argument('input', help="Image or pyramid file")
+    parser.add_argument('output', help="Pyramid file, or image when exporting")
+    parser.add_argument('--export-level', type=int, help="Export this level of a pyramid input")
+    parser.add_argument('--tile-size', type=int, default=DEFAULT_TILE_SIZE, help="Tile edge in pixels")
+    parser.add_argument('--format', choices=tuple(CODECS), default='jpg', help="Tile encoding")
+    parser.add_argument('--quality', type=int, default=90, help="JPEG quality")
+    args = parser.parse_args()
+
+    if args.export_level is not None:
+        with PyramidImage(args.input) as pyramid:
+            level = min(args.export_level, pyramid.levels - 1)
+            cv2.imwrite(args.output, pyramid.read_level(level))
+            print(f"Level {level} {pyramid.level_shape(level)} saved: {args.output}")
+        return
+
+    image = cv2.imread(args.input, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        print(f"Cannot read {args.input}")
+        sys.exit(1)
+    if image.ndim == 3 and image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    if write_pyramid(image, args.output, tile_size=args.tile_size, format=args.format, quality=args.quality):
+        with PyramidImage(args.output) as pyramid:
+            print(f"Pyramid saved: {args.output} ({pyramid.width}x{pyramid.height}, {pyramid.levels} levels)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Video Recorder
+Pipelined recording: capture hands frames to a bounded queue and a
+dedicated encoder thread writes them with cv2.VideoWriter
+"""
+
+import os
+import csv
+import time
+import threading
+import collections
+import cv2
+import numpy as np
+from typing import Optional, NamedTuple
+
+from driver.metrics import METRICS
+
+QUEUE_POLICIES = ('block', 'drop_oldest', 'drop_newest')
+
+class RecordingReport(NamedTuple):
+    """Summary returned when a recording stops"""
+    path: str
+    timestamps_path: str
+    frames_written: int
+    frames_dropped: int
+    frames_late: int
+    duration: float  # Seconds between first and last recorded frame
+    average_fps: float
+    max_queue_depth: int
+
+class VideoRecorder:
+    """Records frames to a video file on a background encoder thread"""
+
+    def __init__(self, path: str, fps: float = 30.0, fourcc: str = 'MJPG', queue_size: int = 32,
+                 policy: str = 'drop_oldest', late_threshold: float = None):
+        """
+        Initialize recorder
+
+        Args:
+            path: Output video path (.avi for MJPG, .mp4 for mp4v)
+            fps: Nominal frame rate stored in the container
+            fourcc: Four character codec code
+            queue_size: Maximum frames waiting for the encoder
+            policy: What write() does when the queue is full:
+                    'block' waits, 'drop_oldest' discards the oldest queued frame,
+                    'drop_newest' discards the incoming frame
+            late_threshold: Capture-to-encode delay (s) after which a frame
+                            counts as late (default: two frame periods)
+        """
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"policy must be one of {QUEUE_POLICIES}")
+
+        self.path = path
+        self.timestamps_path = os.path.splitext(path)[0] + '_timestamps.csv'
+        self.fps = fps
+        self.fourcc = fourcc
+        self.queue_size = queue_size
+        self.policy = policy
+        self.late_threshold = late_threshold if late_threshold is not None else 2.0 / fps
+
+        self._queue = collections.deque()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._writer = None
+        self._frame_size = None
+
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.frames_late = 0
+        self.max_queue_depth = 0
+        self._first_timestamp = None
+        self._last_timestamp = None
+
+    @property
+    def is_recording(self) -> bool:
+        return self._running
+
+    def start(self) -> bool:
+        """Start the encoder thread."""
+        if self._running:
+            return True
+
+        self._running = True
+        self._thread = threading.Thread(target=self._encode_loop, name="VideoRecorder", daemon=True)
+        self._thread.start()
+        print(f"Recording started: {self.path}")
+        return True
+
+    def write(self, frame: np.ndarray, timestamp: float = None, copy: bool = False) -> bool:
+        """
+        Queue a frame for encoding
+
+        Args:
+            frame: BGR frame
+            timestamp: Capture time from time.monotonic() (now if None)
+            copy: Copy the frame first (needed if the caller reuses its buffer)
+
+        Returns False if the frame was dropped or the recorder is stopped.
+        """
+        if not self._running:
+            return False
+
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if copy:
+            frame = frame.copy()
+
+        with self._cond:
+            if len(self._queue) >= self.queue_size:
+                if self.policy == 'drop_newest':
+                    self.frames_dropped += 1
+                    METRICS.inc('record_frames_dropped')
+                    return False
+                if self.policy == 'drop_oldest':
+                    self._queue.popleft()
+                    self.frames_dropped += 1
+                    METRICS.inc('record_frames_dropped')
+                else:
+                    self._cond.wait_for(lambda: len(self._queue) < self.queue_size or not self._running)
+                    if not self._running:
+                        return False
+
+            self._queue.append((frame, timestamp))
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._cond.notify_all()
+        return True
+
+    def _open_writer(self, frame: np.ndarray) -> bool:
+        height, width = frame.shape[:2]
+        self._frame_size = (width, height)
+        self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps,
+                                       self._frame_size, frame.ndim == 3)
+        if not self._writer.isOpened():
+            print(f"Cannot open video writer: {self.path}")
+            self._writer = None
+            return False
+        return True
+
+    def _encode_loop(self):
+        """Encoder thread: drain the queue until stopped and empty."""
+        with open(self.timestamps_path, 'w', newline='') as timestamps_file:
+            timestamps = csv.writer(timestamps_file)
+            timestamps.writerow(['frame', 'timestamp', 'relative_time', 'encode_delay'])
+
+            while True:
+                with self._cond:
+                    self._cond.wait_for(lambda: self._queue or not self._running)
+                    if not self._queue:
+                        break
+                    frame, timestamp = self._queue.popleft()
+                    self._cond.notify_all()
+
+                if self._writer is None and not self._open_writer(frame):
+                    # Nothing can be written: stop taking frames and drop what is queued
+                    with self._cond:
+                        dropped = 1 + len(self._queue)
+                        self._queue.clear()
+                        self._running = False
+                        self.frames_dropped += dropped
+                        self._cond.notify_all()
+                    METRICS.inc('record_frames_dropped', dropped)
+                    break
+
+                start = time.perf_counter_ns()
+                if (frame.shape[1], frame.shape[0]) != self._frame_size:
+                    frame = cv2.resize(frame, self._frame_size)
+
+                self._writer.write(frame)
+                METRICS.observe('record_encode', start)
+                METRICS.inc('record_frames_written')
+                delay = time.monotonic() - timestamp
+                if delay > self.late_threshold:
+                    self.frames_late += 1
+
+                if self._first_timestamp is None:
+                    self._first_timestamp = timestamp
+                self._last_timestamp = timestamp
+                timestamps.writerow([self.frames_written, f"{timestamp:.6f}",
+                                     f"{timestamp - self._first_timestamp:.6f}", f"{delay:.6f}"])
+                self.frames_written += 1
+
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+    def stop(self) -> RecordingReport:
+        """Finish encoding queued frames, close the file and return a report."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+        duration = 0.0
+        if self._first_timestamp is not None:
+            duration = self._last_timestamp - self._first_timestamp
+        average_fps = (self.frames_written - 1) / duration if duration > 0 else 0.0
+
+        report = RecordingReport(self.path, self.timestamps_path, self.frames_written, self.frames_dropped,
+                                 self.frames_late, duration, average_fps, self.max_queue_depth)
+        print(f"Recording stopped: {self.frames_written} frames written, "
+              f"{self.frames_dropped} dropped, {self.frames_late} late")
+        return report
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._running:
+            self.stop()
+
+def record(driver, path: str, duration: float, fps: float = 30.0, **recorder_kwargs) -> Optional[RecordingReport]:
+    """
+    Record from a connected driver for a fixed duration
+
+    In threaded mode every grabbed frame is recorded with its grab
+    timestamp; otherwise frames are read synchronously.
+    """
+    if not driver.is_connected:
+        print("Microscope not connected.")
+        return None
+
+    recorder = VideoRecorder(path, fps, **recorder_kwargs)
+    recorder.start()
+    seq = 0
+    end = time.monotonic() + duration
+    try:
+        while time.monotonic() < end:
+            if driver.grabber:
+                grabbed = driver.wait_for_next(seq, timeout=0.5)
+                if grabbed is None:
+                    continue
+                seq = grabbed.seq
+                recorder.write(grabbed.frame, grabbed.timestamp)
+            else:
+                frame = driver.capture_frame()
+                if frame is not None:
+                    recorder.write(frame)
+    except KeyboardInterrupt:
+        pass
+    return recorder.stop()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Shared Memory Frame Channel
+Zero-copy frame transport between a capture process and consumer processes
+built on multiprocessing.shared_memory
+
+Layout of the shared block:
+    header     - magic, version, ring size, height, width, channels, slot stride,
+                 writer pid, latest seq
+    slot table - per slot: seqlock counter, frame seq, timestamp (float64 bits)
+    slot data  - ring_size fixed-stride frame buffers (64-byte aligned)
+
+The writer bumps a slot's seqlock counter to an odd value before touching
+the pixels and back to even afterwards. Readers map slots as NumPy views
+and compare the counter before and after use to detect torn frames.
+"""
+
+import os
+import sys
+import time
+import argparse
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from typing import Optional, NamedTuple, Tuple
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.microscope_driver import MicroscopeDriver
+
+MAGIC = 0x45504946  # "EPIF"
+VERSION = 1
+
+HEADER_FIELDS = 9
+SLOT_FIELDS = 3
+ALIGNMENT = 64
+
+# Header field indices
+H_MAGIC, H_VERSION, H_RING, H_HEIGHT, H_WIDTH, H_CHANNELS, H_STRIDE, H_PID, H_LATEST = range(HEADER_FIELDS)
+# Slot table field indices
+S_LOCK, S_SEQ, S_TIME = range(SLOT_FIELDS)
+
+class SharedFrame(NamedTuple):
+    """Frame mapped from shared memory"""
+    seq: int
+    timestamp: float
+    frame: np.ndarray
+    slot: int
+    version: int
+
+def _align(size: int) -> int:
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _layout(ring_size: int, shape: Tuple[int, int, int]):
+    """Return (slot table offset, data offset, slot stride, total size)."""
+    table_offset = HEADER_FIELDS * 8
+    data_offset = _align(table_offset + ring_size * SLOT_FIELDS * 8)
+    stride = _align(int(np.prod(shape)))
+    return table_offset, data_offset, stride, data_offset + ring_size * stride
+
+def attach_shared_memory(name: str) -> shared_memory.SharedMemory:
+    """
+    Map an existing block without registering it with the resource tracker
+
+    Attaching normally registers the block with the tracker, which unlinks
+    it when the reader exits (or double-unregisters it when reader and
+    writer share a tracker). Only the writer owns the block's lifetime.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    register = resource_tracker.register
+
+    def register_except_shm(resource_name, rtype):
+        if rtype != 'shared_memory':
+            register(resource_name, rtype)
+
+    resource_tracker.register = register_except_shm
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+class _SharedRing:
+    """Common NumPy views over the shared block"""
+
+    def _map(self, ring_size: int, shape: Tuple[int, int, int]):
+        table_offset, data_offset, stride, _ = _layout(ring_size, shape)
+        buf = self.shm.buf
+        self.header = np.ndarray((HEADER_FIELDS,), dtype=np.uint64, buffer=buf)
+        self.table = np.ndarray((ring_size, SLOT_FIELDS), dtype=np.uint64, buffer=buf, offset=table_offset)
+        self.slots = [
+            np.ndarray(shape, dtype=np.uint8, buffer=buf, offset=data_offset + i * stride)
+            for i in range(ring_size)
+        ]
+        self.ring_size = ring_size
+        self.shape = shape
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def latest_seq(self) -> int:
+        return int(self.header[H_LATEST])
+
+    def _release_views(self):
+        # Views must be dropped before the mapping can be closed
+        self.header = None
+        self.table = None
+        self.slots = []
+
+class SharedFrameWriter(_SharedRing):
+    """Capture side of the channel: owns the shared block"""
+
+    def __init__(self, shape: Tuple[int, int, int] = (480, 640, 3), ring_size: int = 4, name: str = None):
+        """
+        Create a shared frame ring
+
+        Args:
+            shape: Frame shape (height, width, channels)
+            ring_size: Number of frame slots
+            name: Shared memory name (random if None)
+        """
+        if len(shape) == 2:
+            shape = (shape[0], shape[1], 1)
+        shape = tuple(int(v) for v in shape)
+
+        _, _, stride, size = _layout(ring_size, shape)
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._map(ring_size, shape)
+
+        self.table[:] = 0
+        self.header[:] = [MAGIC, VERSION, ring_size, shape[0], shape[1], shape[2], stride, os.getpid(), 0]
+        self._seq = 0
+        self._pending = None
+
+    def begin_write(self) -> Tuple[int, np.ndarray]:
+        """
+        Claim the next slot for writing
+
+        Returns (seq, view) so the producer can fill the slot in place,
+        e.g. cap.read(view). Must be followed by commit_write().
+        """
+        seq = self._seq + 1
+        index = seq % self.ring_size
+        self.table[index, S_LOCK] += 1  # odd: write in progress
+        self._pending = (seq, index)
+        return seq, self.slots[index]
+
+    def commit_write(self, timestamp: float = None):
+        """Publish the slot claimed by begin_write()."""
+        seq, index = self._pending
+        self.table[index, S_SEQ] = seq
+        self.table[index, S_TIME:S_TIME + 1].view(np.float64)[0] = time.monotonic() if timestamp is None else timestamp
+        self.table[index, S_LOCK] += 1  # even: slot consistent
+        self.header[H_LATEST] = seq
+        self._seq = seq
+        self._pending = None
+
+    def abort_write(self):
+        """Release the slot claimed by begin_write() without publishing it."""
+        _, index = self._pending
+        self.table[index, S_LOCK] += 1
+        self._pending = None
+
+    def write(self, frame: np.ndarray, timestamp: float = None) -> int:
+        """Copy a frame into the next slot and publish it."""
+        seq, view = self.begin_write()
+        try:
+            np.copyto(view, frame.reshape(self.shape))
+        except Exception:
+            self.abort_write()
+            raise
+        self.commit_write(timestamp)
+        return seq
+
+    def write_from_driver(self, driver: MicroscopeDriver, seq: int = 0, timeout: float = 1.0) -> int:
+        """
+        Publish one frame from a connected driver
+
+        In threaded mode the newest grabbed frame after seq is copied in
+        directly from the grabber ring; otherwise the device is read
+        straight into the shared slot. Returns the driver sequence number
+        consumed (threaded mode) or 0, and -1 on failure.
+        """
+        if driver.grabber:
+            grabbed = driver.wait_for_next(seq, timeout, copy=False)
+            if grabbed is None:
+                return -1
+            self.write(grabbed.frame, grabbed.timestamp)
+            return grabbed.seq
+
+        if not driver.is_connected or not driver.cap:
+            print("Microscope not connected.")
+            return -1
+
+        if driver.passthrough:
+            # Compressed frames must be decoded before they fit a pixel slot
+            frame = driver.capture_frame()
+            if frame is None:
+                return -1
+            self.write(frame)
+            return 0
+
+        _, view = self.begin_write()
+        try:
+            ret, frame = driver.cap.read(view)
+        except Exception:
+            ret, frame = False, None
+
+        if not ret or frame is None:
+            self.abort_write()
+            return -1
+
+        if frame is not view:
+            np.copyto(view, frame.reshape(self.shape))
+        self.commit_write()
+        return 0
+
+    def close(self):
+        """Close and remove the shared block."""
+        self._release_views()
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class SharedFrameReader(_SharedRing):
+    """Consumer side of the channel: maps an existing shared block"""
+
+    def __init__(self, name: str):
+        """
+        Attach to a shared frame ring
+
+        Args:
+            name: Shared memory name used by the writer
+        """
+        self.shm = attach_shared_memory(name)
+
+        header = np.ndarray((HEADER_FIELDS,), dtype=np.uint64, buffer=self.shm.buf)
+        if int(header[H_MAGIC]) != MAGIC or int(header[H_VERSION]) != VERSION:
+            del header
+            self.shm.close()
+            raise ValueError(f"{name} is not a shared frame ring")
+
+        shape = (int(header[H_HEIGHT]), int(header[H_WIDTH]), int(header[H_CHANNELS]))
+        ring_size = int(header[H_RING])
+        del header
+        self._map(ring_size, shape)
+
+    def read_latest(self, copy: bool = False, retries: int = 3) -> Optional[SharedFrame]:
+        """
+        Return the newest consistent frame
+
+        Args:
+            copy: Copy the pixels out of shared memory (validated before returning)
+            retries: Attempts before giving up on a slot that keeps changing
+        """
+        for _ in range(retries):
+            seq = self.latest_seq
+            if seq == 0:
+                return None
+
+            index = seq % self.ring_size
+            version = int(self.table[index, S_LOCK])
+            if version & 1 or int(self.table[index, S_SEQ]) != seq:
+                continue
+
+            timestamp = float(self.table[index, S_TIME:S_TIME + 1].view(np.float64)[0])
+            frame = self.slots[index]
+            if copy:
+                frame = frame.copy()
+            shared = SharedFrame(seq, timestamp, frame, index, version)
+            if self.is_valid(shared):
+                return shared
+        return None
+
+    def wait_for_next(self, seq: int, timeout: float = 1.0, copy: bool = False, poll: float = 0.0005) -> Optional[SharedFrame]:
+        """Poll until a frame newer than seq is published."""
+        deadline = time.monotonic() + timeout
+        while self.latest_seq <= seq:
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(poll)
+        return self.read_latest(copy)
+
+    def is_valid(self, shared: SharedFrame) -> bool:
+        """Check that a mapped frame was not overwritten while in use."""
+        return int(self.table[shared.slot, S_LOCK]) == shared.version
+
+    def close(self):
+        """Detach from the shared block."""
+        self._release_views()
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def main():
+    """Main function - publish or consume a shared frame ring"""
+    parser = argparse.ArgumentParser(description="Shared memory frame channel")
+    parser.add_argument('--name', default='epiphany_frames', help="Shared memory name")
+    parser.add_argument('--read', action='store_true', help="Consume frames instead of publishing")
+    parser.add_argument('--fake', action='store_true', help="Publish from a synthetic camera")
+    parser.add_argument('--seconds', type=float, default=10.0, help="Run time")
+    args = parser.parse_args()
+
+    if args.read:
+        with SharedFrameReader(args.name) as reader:
+            seq, frames, torn = reader.latest_seq, 0, 0
+            mean = float('nan')
+            start = time.monotonic()
+            while time.monotonic() - start < args.seconds:
+                shared = reader.wait_for_next(seq)
+                if shared is None:
+                    continue
+                mean = float(shared.frame.mean())
+                if not reader.is_valid(shared):
+                    torn += 1
+                    continue
+                seq = shared.seq
+                frames += 1
+            elapsed = time.monotonic() - start
+            print(f"Read {frames} frames ({frames / elapsed:.1f} fps), {torn} torn, last mean {mean:.1f}")
+        return
+
+    if args.fake:
+        from driver.fake_camera import FakeMicroscopeDriver
+        driver = FakeMicroscopeDriver()
+    else:
+        driver = MicroscopeDriver()
+    if not driver.connect():
+        sys.exit(1)
+
+    width, height = driver.get_frame_size()
+    try:
+        with SharedFrameWriter((height, width, 3), name=args.name) as writer:
+            print(f"Publishing frames to shared memory '{writer.name}'")
+            start = time.monotonic()
+            while time.monotonic() - start < args.seconds:
+                writer.write_from_driver(driver)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        driver.disconnect()
+
+if __name__ == "__main__":
+    main()
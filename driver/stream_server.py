@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+MJPEG Stream Server
+asyncio HTTP server that lets several viewers watch one microscope: each
+frame is captured and JPEG-encoded once and the same bytes are fanned out
+to every client
+
+Endpoints:
+    /stream        - multipart/x-mixed-replace MJPEG stream
+    /snapshot.jpg  - single JPEG of the newest frame
+    /status        - JSON server statistics
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import cv2
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.microscope_driver import MicroscopeDriver
+from driver.jpeg_frame import is_jpeg_buffer
+from driver.metrics import METRICS, start_metrics_server
+from driver.adaptive_quality import AdaptiveQuality, build_ladder
+from driver.change_detect import ChangeDetector
+
+BOUNDARY = b'frame'
+SNAPSHOT_MAX_AGE = 0.5  # Seconds a published frame may be reused for /snapshot.jpg
+REQUEST_TIMEOUT = 10.0
+
+_STREAM_HEADER = (b"HTTP/1.1 200 OK\r\n"
+                  b"Content-Type: multipart/x-mixed-replace; boundary=" + BOUNDARY + b"\r\n"
+                  b"Cache-Control: no-cache, no-store\r\n"
+                  b"Connection: close\r\n\r\n")
+
+def _response(status: str, content_type: str, body: bytes) -> bytes:
+    return (f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n"
+            f"Cache-Control: no-cache, no-store\r\nConnection: close\r\n\r\n").encode() + body
+
+class _Viewer:
+    """One streaming client with a single-frame mailbox"""
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.peer = str(writer.get_extra_info('peername'))
+        self.pending = None
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.frames_sent = 0
+        self.frames_dropped = 0
+
+    def offer(self, chunk: bytes):
+        """Hand over a frame, replacing one the client has not taken yet."""
+        if self.pending is not None:
+            self.frames_dropped += 1
+            METRICS.inc('stream_frames_dropped')
+        self.pending = chunk
+        self.ready.set()
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+
+class MjpegStreamServer:
+    """Serves one driver's frames to any number of HTTP clients"""
+
+    def __init__(self, driver: MicroscopeDriver, host: str = '127.0.0.1', port: int = 8080, quality: int = 80,
+                 fps: float = None, adaptive: AdaptiveQuality = None, change_detector: ChangeDetector = None):
+        """
+        Initialize stream server
+
+        Args:
+            driver: Connected driver (threaded mode lets capture overlap sending)
+            host: Interface to listen on
+            port: TCP port (0 picks a free one)
+            quality: JPEG quality for encoded frames (passthrough frames are forwarded as-is)
+            fps: Maximum stream rate (None for the camera rate)
+            adaptive: Controller that lowers quality, scale and frame rate when
+                      capture and encoding cannot keep up (slow viewers only
+                      lose frames; they never degrade the shared stream)
+            change_detector: Skip encoding and sending frames that match the
+                             last one published (its refresh interval keeps
+                             a still stream alive)
+        """
+        self.driver = driver
+        self.host = host
+        self.port = port
+        self.quality = quality
+        self.interval = 1.0 / fps if fps else 0.0
+        self.adaptive = adaptive
+        self.change_detector = change_detector
+        self.viewers: List[_Viewer] = []
+        self.frames_encoded = 0
+        self.latest: Optional[bytes] = None
+        self.latest_time = 0.0
+        self._latest_chunk: Optional[bytes] = None
+        self._server = None
+        self._producer = None
+        self._demand = None
+        self._waiters: List[asyncio.Future] = []
+        # One thread owns the device, as in AsyncMicroscopeDriver
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stream-capture")
+
+    async def start(self) -> 'MjpegStreamServer':
+        """Start listening and the capture task."""
+        self._demand = asyncio.Event()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._producer = asyncio.ensure_future(self._produce())
+        print(f"Streaming at http://{self.host}:{self.port}/stream")
+        return self
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def close(self):
+        """Stop capturing and disconnect every client."""
+        if self._producer:
+            self._producer.cancel()
+            try:
+                await self._producer
+            except asyncio.CancelledError:
+                pass
+            self._producer = None
+        for viewer in list(self.viewers):
+            viewer.close()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for waiter in self._waiters:
+            waiter.cancel()
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> 'MjpegStreamServer':
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def get_status(self) -> dict:
+        """Return server statistics."""
+        return {
+            'clients': len(self.viewers),
+            'frames_encoded': self.frames_encoded,
+            'frames_unchanged': self.change_detector.frames_unchanged if self.change_detector else 0,
+            'adaptive': self.adaptive.get_status() if self.adaptive else None,
+            'viewers': [{'peer': viewer.peer, 'sent': viewer.frames_sent, 'dropped': viewer.frames_dropped}
+                        for viewer in self.viewers],
+        }
+
+    def _next_jpeg(self, seq: int) -> Optional[Tuple[int, bytes, float]]:
+        """
+        Capture thread: the next frame as JPEG bytes with its capture time, encoded at most once
+
+        The bytes are None for a frame skipped by the adaptive controller and
+        empty for a frame the change detector found unchanged.
+        """
+        if self.driver.grabber:
+            grabbed = self.driver.wait_for_next(seq, 0.5, copy=False, decode=False)
+            if grabbed is None:
+                return None
+            seq, frame, captured = grabbed.seq, grabbed.frame, grabbed.timestamp
+            if self.adaptive and self.adaptive.should_skip():
+                return seq, None, captured
+        else:
+            if self.adaptive and self.adaptive.should_skip():
+                time.sleep(1.0 / self.driver.frame_rate)  # Let one frame period pass unread
+                return seq + 1, None, time.monotonic()
+            if not self.adaptive and not self.change_detector:
+                jpeg = self.driver.capture_jpeg(self.quality)
+                return (seq + 1, jpeg.data, jpeg.timestamp) if jpeg else None
+            frame, captured = self.driver.capture_buffer()
+            if frame is None:
+                return None
+            seq += 1
+
+        if self.change_detector and not self.change_detector.check(frame):
+            return seq, b'', captured
+        data = self._encode(frame)
+        return (seq, data, captured) if data else None
+
+    def _encode(self, frame) -> Optional[bytes]:
+        if self.adaptive:
+            return self.adaptive.encode(frame)
+        if is_jpeg_buffer(frame):
+            return frame.tobytes()
+        start = time.perf_counter_ns()
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return None
+        METRICS.observe('jpeg_encode', start)
+        return buffer.tobytes()
+
+    async def _produce(self):
+        """Capture and publish frames while anyone is watching."""
+        loop = asyncio.get_running_loop()
+        seq = 0
+        next_time = loop.time()
+
+        while self.driver.is_connected:
+            if not self.viewers and not self._waiters:
+                # Nobody is watching: stop capturing until a client arrives
+                self._demand.clear()
+                await self._demand.wait()
+                continue
+
+            if self.interval:
+                delay = next_time - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                next_time = max(next_time + self.interval, loop.time())
+
+            result = await loop.run_in_executor(self._executor, self._next_jpeg, seq)
+            if result is None:
+                await asyncio.sleep(0.05)
+                continue
+            seq, jpeg, captured = result
+            if jpeg is None:
+                continue  # Skipped by the adaptive controller
+            if jpeg:
+                self._publish(jpeg)
+            elif self.latest is not None:
+                # Still scene: the last published frame is current
+                self.latest_time = time.monotonic()
+                self._wake_waiters(self.latest)
+            # An unchanged frame still counts as kept up with
+            if self.adaptive:
+                self.adaptive.record(time.monotonic() - captured)
+
+    def _publish(self, jpeg: bytes):
+        self.frames_encoded += 1
+        self.latest = jpeg
+        self.latest_time = time.monotonic()
+
+        # The part header and frame are joined once; every client gets the same object
+        chunk = b"".join((b"--", BOUNDARY, b"\r\nContent-Type: image/jpeg\r\nContent-Length: ",
+                          str(len(jpeg)).encode(), b"\r\n\r\n", jpeg, b"\r\n"))
+        self._latest_chunk = chunk
+        for viewer in self.viewers:
+            viewer.offer(chunk)
+        self._wake_waiters(jpeg)
+
+    def _wake_waiters(self, jpeg: bytes):
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(jpeg)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            path = await asyncio.wait_for(self._read_request(reader), REQUEST_TIMEOUT)
+            if path is None:
+                writer.write(_response("405 Method Not Allowed", 'text/plain', b"GET only\n"))
+            elif path in ('/stream', '/stream.mjpg', '/'):
+                await self._stream(writer)
+            elif path == '/snapshot.jpg':
+                jpeg = await self._snapshot()
+                if jpeg is None:
+                    writer.write(_response("503 Service Unavailable", 'text/plain', b"No frame available\n"))
+                else:
+                    writer.write(_response("200 OK", 'image/jpeg', jpeg))
+            elif path == '/status':
+                writer.write(_response("200 OK", 'application/json', json.dumps(self.get_status()).encode()))
+            else:
+                writer.write(_response("404 Not Found", 'text/plain', b"Not found\n"))
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    @staticmethod
+    async def _read_request(reader: asyncio.StreamReader) -> Optional[str]:
+        """Read the request head; returns the path of a GET request, None otherwise."""
+        request_line = (await reader.readline()).decode('latin-1').split()
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+        if len(request_line) < 2 or request_line[0] != 'GET':
+            return None
+        return request_line[1].split('?', 1)[0]
+
+    async def _snapshot(self) -> Optional[bytes]:
+        if self.latest is not None and time.monotonic() - self.latest_time < SNAPSHOT_MAX_AGE:
+            return self.latest
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._demand.set()
+        try:
+            return await asyncio.wait_for(waiter, 5.0)
+        except asyncio.TimeoutError:
+            return None
+
+    async def _stream(self, writer: asyncio.StreamWriter):
+        viewer = _Viewer(writer)
+        self.viewers.append(viewer)
+        if self.change_detector and self._latest_chunk is not None:
+            viewer.offer(self._latest_chunk)  # A still scene may not publish again for a while
+        self._demand.set()
+        print(f"Viewer connected: {viewer.peer} ({len(self.viewers)} watching)")
+        try:
+            writer.write(_STREAM_HEADER)
+            while True:
+                await viewer.ready.wait()
+                viewer.ready.clear()
+                if viewer.closed:
+                    break
+                chunk, viewer.pending = viewer.pending, None
+                writer.write(chunk)
+                # A slow client waits here; frames published meanwhile replace each other
+                await writer.drain()
+                viewer.frames_sent += 1
+                METRICS.inc('stream_frames_sent')
+        finally:
+            self.viewers.remove(viewer)
+            print(f"Viewer disconnected: {viewer.peer} ({viewer.frames_sent} sent, {viewer.frames_dropped} dropped)")
+
+def main():
+    """Main function - stream the microscope over HTTP"""
+    parser = argparse.ArgumentParser(description="Microscope MJPEG stream server")
+    parser.add_argument('--host', default='127.0.0.1', help="Interface to listen on (0.0.0.0 for the LAN)")
+    parser.add_argument('--port', type=int, default=8080, help="TCP port")
+    parser.add_argument('--quality', type=int, default=80, help="JPEG quality")
+    parser.add_argument('--fps', type=float, help="Maximum stream frame rate")
+    parser.add_argument('--fake', action='store_true', help="Use a synthetic camera instead of the device")
+    parser.add_argument('--device', type=int, help="Video device index")
+    parser.add_argument('--passthrough', action='store_true', help="Forward the camera's MJPEG frames without re-encoding")
+    parser.add_argument('--adaptive', action='store_true', help="Lower quality, scale and frame rate when encoding falls behind")
+    parser.add_argument('--target-fps', type=float, default=15.0, help="Frame rate the adaptive controller holds")
+    parser.add_argument('--max-latency', type=float, default=0.15, help="Capture-to-publish latency budget in seconds")
+    parser.add_argument('--skip-unchanged', action='store_true',
+                        help="Do not encode or send frames while the scene is still")
+    parser.add_argument('--change-threshold', type=float, default=6.0,
+                        help="Gray-level change that counts as a new scene")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus metrics on this local port")
+    args = parser.parse_args()
+
+    if args.fake:
+        from driver.fake_camera import FakeMicroscopeDriver
+        driver = FakeMicroscopeDriver(threaded=True, passthrough=args.passthrough)
+    else:
+        driver = MicroscopeDriver(threaded=True, passthrough=args.passthrough, video_device_index=args.device)
+
+    if not driver.connect():
+        print("Failed to connect to microscope.")
+        sys.exit(1)
+    if args.metrics_port is not None:
+        start_metrics_server(args.metrics_port)
+
+    adaptive = None
+    if args.adaptive:
+        adaptive = AdaptiveQuality(min(args.target_fps, args.fps or driver.frame_rate, driver.frame_rate),
+                                   args.max_latency, build_ladder(max_quality=args.quality))
+
+    # Resend a still scene once a second so viewers and proxies see a live stream
+    change_detector = ChangeDetector(args.change_threshold, refresh=1.0) if args.skip_unchanged else None
+
+    async def serve():
+        async with MjpegStreamServer(driver, args.host, args.port, args.quality, args.fps, adaptive,
+                                     change_detector) as server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        driver.disconnect()
+
+if __name__ == "__main__":
+    main()
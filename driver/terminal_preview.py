@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Terminal Preview Renderer
+Vectorized ASCII / ANSI 256-color / half-block rendering of microscope frames
+"""
+
+import sys
+import time
+import cv2
+import numpy as np
+from typing import Optional
+
+ASCII_CHARS = " .:-=+*#%@"  # From dark to bright
+
+# Terminal control sequences
+CURSOR_HOME = "\x1b[H"
+CLEAR_SCREEN = "\x1b[2J"
+HIDE_CURSOR = "\x1b[?25l"
+SHOW_CURSOR = "\x1b[?25h"
+RESET = "\x1b[0m"
+
+MODES = ('ascii', 'ansi', 'half')
+
+def _char_lut(charset: str) -> np.ndarray:
+    """Map every 8-bit intensity to the byte of its character."""
+    codes = np.frombuffer(charset.encode('ascii'), dtype=np.uint8)
+    index = np.minimum(np.arange(256) * len(charset) // 256, len(charset) - 1)
+    return codes[index]
+
+def _sgr_table(template: str) -> np.ndarray:
+    """Fixed-width escape sequences for all 256 colors, one row per color."""
+    return np.array([list(template.format(n).encode('ascii')) for n in range(256)], dtype=np.uint8)
+
+_ASCII_LUT = _char_lut(ASCII_CHARS)
+_FG_TABLE = _sgr_table("\x1b[38;5;{:03d}m")
+_FG_BG_PREFIX = np.frombuffer(b"\x1b[38;5;", dtype=np.uint8)
+_NUMBER_TABLE = np.array([list(f"{n:03d}".encode('ascii')) for n in range(256)], dtype=np.uint8)
+_HALF_BLOCK = np.frombuffer("▀".encode('utf-8'), dtype=np.uint8)
+_CUBE_LUT = (np.arange(256) * 6 // 256).astype(np.uint16)
+
+def fit_size(frame_shape: tuple, width: int, height: Optional[int] = None, char_aspect: float = 0.5) -> tuple:
+    """Return (width, height) in cells, keeping the frame aspect ratio when height is None."""
+    if height is None:
+        frame_h, frame_w = frame_shape[:2]
+        height = max(1, int(round(width * frame_h / frame_w * char_aspect)))
+    return width, height
+
+def _resize(frame: np.ndarray, width: int, height: int) -> np.ndarray:
+    if frame.shape[1] == width and frame.shape[0] == height:
+        return frame
+    return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+def _to_gray(frame: np.ndarray) -> np.ndarray:
+    return frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+def _to_bgr(frame: np.ndarray) -> np.ndarray:
+    return cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR) if frame.ndim == 2 else frame
+
+def _color_index(bgr: np.ndarray) -> np.ndarray:
+    """Quantize BGR pixels to the xterm 6x6x6 color cube (indices 16-231)."""
+    cube = _CUBE_LUT[bgr]
+    return 16 + 36 * cube[..., 2] + 6 * cube[..., 1] + cube[..., 0]
+
+def _join_rows(cells: np.ndarray, row_suffix: bytes) -> str:
+    """Flatten an (h, w, n) byte grid into text, appending row_suffix to every row."""
+    height = cells.shape[0]
+    rows = cells.reshape(height, -1)
+    suffix = np.broadcast_to(np.frombuffer(row_suffix, dtype=np.uint8), (height, len(row_suffix)))
+    text = np.concatenate([rows, suffix], axis=1).tobytes()
+    return text[:-1].decode('utf-8')  # Drop the final newline
+
+def render_ascii(frame: np.ndarray, width: int = 80, height: Optional[int] = None,
+                 charset: str = ASCII_CHARS) -> str:
+    """Render a frame as plain ASCII art."""
+    width, height = fit_size(frame.shape, width, height)
+    gray = _to_gray(_resize(frame, width, height))
+    lut = _ASCII_LUT if charset == ASCII_CHARS else _char_lut(charset)
+    return _join_rows(lut[gray][..., np.newaxis], b"\n")
+
+def render_ansi(frame: np.ndarray, width: int = 80, height: Optional[int] = None,
+                charset: str = ASCII_CHARS) -> str:
+    """Render a frame as ASCII art colored with ANSI 256-color escapes."""
+    width, height = fit_size(frame.shape, width, height)
+    bgr = _to_bgr(_resize(frame, width, height))
+    lut = _ASCII_LUT if charset == ASCII_CHARS else _char_lut(charset)
+
+    cells = np.empty((height, width, _FG_TABLE.shape[1] + 1), dtype=np.uint8)
+    cells[..., :-1] = _FG_TABLE[_color_index(bgr)]
+    cells[..., -1] = lut[_to_gray(bgr)]
+    return _join_rows(cells, (RESET + "\n").encode('ascii'))
+
+def render_half_blocks(frame: np.ndarray, width: int = 80, height: Optional[int] = None) -> str:
+    """Render a frame with upper half blocks: two pixels per cell (fg = top, bg = bottom)."""
+    width, height = fit_size(frame.shape, width, height)
+    bgr = _to_bgr(_resize(frame, width, height * 2))
+    colors = _color_index(bgr)
+    top, bottom = colors[0::2], colors[1::2]
+
+    # ESC[38;5;NNN;48;5;NNNm + "▀"
+    parts = [
+        np.broadcast_to(_FG_BG_PREFIX, (height, width, len(_FG_BG_PREFIX))),
+        _NUMBER_TABLE[top],
+        np.broadcast_to(np.frombuffer(b";48;5;", dtype=np.uint8), (height, width, 6)),
+        _NUMBER_TABLE[bottom],
+        np.broadcast_to(np.frombuffer(b"m", dtype=np.uint8), (height, width, 1)),
+        np.broadcast_to(_HALF_BLOCK, (height, width, len(_HALF_BLOCK))),
+    ]
+    return _join_rows(np.concatenate(parts, axis=2), (RESET + "\n").encode('ascii'))
+
+def render(frame: np.ndarray, width: int = 80, height: Optional[int] = None, mode: str = 'ascii') -> str:
+    """Render a frame in the given mode ('ascii', 'ansi' or 'half')."""
+    if mode == 'ascii':
+        return render_ascii(frame, width, height)
+    if mode == 'ansi':
+        return render_ansi(frame, width, height)
+    if mode == 'half':
+        return render_half_blocks(frame, width, height)
+    raise ValueError(f"Unknown preview mode: {mode}")
+
+def run_live(driver, width: int = 80, height: Optional[int] = None, mode: str = 'ascii',
+             max_fps: float = 30.0, stream=None, status=None, denoiser=None):
+    """
+    Continuously redraw the preview in place until interrupted
+
+    Args:
+        driver: Connected MicroscopeDriver (threaded mode paces to the camera)
+        width: Preview width in cells
+        height: Preview height in cells (None keeps the aspect ratio)
+        mode: Render mode ('ascii', 'ansi' or 'half')
+        max_fps: Upper bound on redraw rate
+        stream: Output stream (defaults to stdout)
+        status: Optional callable(frame) returning an extra status line
+        denoiser: Optional TemporalDenoiser applied before rendering
+    """
+    stream = stream or sys.stdout
+    min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+    seq = 0
+    frames = 0
+    start = time.monotonic()
+    last_draw = 0.0
+
+    stream.write(CLEAR_SCREEN + HIDE_CURSOR)
+    try:
+        while True:
+            if driver.grabber:
+                grabbed = driver.wait_for_next(seq, timeout=1.0)
+                if grabbed is None:
+                    continue
+                seq, frame = grabbed.seq, grabbed.frame
+            else:
+                frame = driver.capture_frame()
+                if frame is None:
+                    time.sleep(0.1)
+                    continue
+            if denoiser:
+                frame = denoiser.update(frame)
+
+            now = time.monotonic()
+            if now - last_draw < min_interval:
+                time.sleep(min_interval - (now - last_draw))
+            last_draw = time.monotonic()
+
+            frames += 1
+            fps = frames / max(last_draw - start, 1e-6)
+            footer = f"{fps:5.1f} fps  frame {frames}"
+            if status:
+                footer += "  " + status(frame)
+
+            stream.write(CURSOR_HOME + render(frame, width, height, mode) + "\n" + footer + "\x1b[K")
+            stream.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stream.write(RESET + SHOW_CURSOR + "\n")
+        stream.flush()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Time-lapse Capture
+Shots are scheduled against absolute monotonic deadlines (start + k * interval),
+so capture and save time never accumulate into drift. Frames are written on a
+background thread to an indexed image sequence or a video file.
+"""
+
+import os
+import sys
+import csv
+import time
+import queue
+import argparse
+import threading
+import cv2
+import numpy as np
+from typing import Optional, NamedTuple, Union
+
+# Import driver modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.jpeg_frame import JpegFrame
+from driver.recorder import VideoRecorder
+
+OUTPUT_MODES = ('sequence', 'video')
+IMAGE_FORMATS = ('jpg', 'png', 'tiff', 'bmp')
+
+# Final approach to a deadline is spun rather than slept, for sub-millisecond accuracy
+SPIN_WINDOW = 0.002
+
+class TimeLapseReport(NamedTuple):
+    """Summary returned when a time-lapse ends"""
+    output: str
+    shots_taken: int
+    shots_missed: int  # Deadlines skipped because the previous shot overran
+    capture_failures: int
+    write_failures: int  # Shots captured but not saved
+    mean_error_ms: float  # Mean |capture time - scheduled time|
+    max_error_ms: float
+    duration: float
+
+class TimeLapse:
+    """Drift-free scheduled capture from a MicroscopeDriver"""
+
+    def __init__(self, driver, interval: float, output: str, count: int = None, duration: float = None,
+                 mode: str = 'sequence', keep_warm: bool = True, warmup: float = 2.0, warmup_frames: int = 5,
+                 format: str = 'jpg', quality: int = 95, video_fps: float = 30.0, queue_size: int = 8):
+        """
+        Initialize time-lapse
+
+        Args:
+            driver: MicroscopeDriver (connected if keep_warm is True)
+            interval: Seconds between shots
+            output: Directory for 'sequence' mode, video path for 'video' mode
+            count: Number of shots (None for no limit)
+            duration: Session length in seconds (None for no limit)
+            mode: 'sequence' (numbered images + index.csv) or 'video'
+            keep_warm: Stay connected between shots; otherwise disconnect
+                       after each shot and reconnect warmup seconds before the next
+            warmup: Seconds to reconnect ahead of a shot
+            warmup_frames: Frames discarded after reconnecting (exposure settling)
+            format: Image format for sequence mode
+            quality: JPEG quality
+            video_fps: Playback rate of the time-lapse video
+            queue_size: Shots waiting for the writer before capture blocks
+        """
+        if mode not in OUTPUT_MODES:
+            raise ValueError(f"mode must be one of {OUTPUT_MODES}")
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if format not in IMAGE_FORMATS:
+            raise ValueError(f"format must be one of {IMAGE_FORMATS}")
+
+        self.driver = driver
+        self.interval = interval
+        self.output = output
+        self.count = count
+        self.duration = duration
+        self.mode = mode
+        self.keep_warm = keep_warm
+        self.warmup = min(warmup, interval)
+        self.warmup_frames = warmup_frames
+        self.format = format
+        self.quality = quality
+        self.video_fps = video_fps
+        self.queue_size = queue_size
+
+        self._stop = threading.Event()
+        self._queue = None
+        self._writer_thread = None
+        self._recorder = None
+        self._index_file = None
+        self._index = None
+
+        self.shots_taken = 0
+        self.shots_missed = 0
+        self.capture_failures = 0
+        self.write_failures = 0
+        self._error_sum = 0.0
+        self._error_max = 0.0
+
+    def stop(self):
+        """Ask a running time-lapse to finish after the current shot."""
+        self._stop.set()
+
+    def _sleep_until(self, deadline: float) -> bool:
+        """Wait for a monotonic deadline; returns False if stopped first."""
+        remaining = deadline - time.monotonic()
+        if remaining > SPIN_WINDOW and self._stop.wait(remaining - SPIN_WINDOW):
+            return False
+        while time.monotonic() < deadline:
+            pass
+        return not self._stop.is_set()
+
+    def _warm_up(self) -> bool:
+        """Reconnect and let exposure settle."""
+        if not self.driver.is_connected and not self.driver.connect():
+            return False
+        for _ in range(self.warmup_frames):
+            self.driver.capture_frame()
+        return True
+
+    def _shoot(self) -> Optional[Union[np.ndarray, JpegFrame]]:
+        """Take one shot; passthrough JPEGs stay compressed for sequence output."""
+        driver = self.driver
+        if driver.grabber:
+            grabbed = driver.get_latest_frame()
+            return grabbed.frame if grabbed else None
+        if driver.passthrough and self.mode == 'sequence' and self.format == 'jpg':
+            return driver.capture_jpeg(self.quality)
+        return driver.capture_frame()
+
+    def _open_output(self):
+        if self.mode == 'video':
+            self._recorder = VideoRecorder(self.output, self.video_fps, queue_size=self.queue_size,
+                                           policy='block', late_threshold=float('inf'))
+            self._recorder.start()
+            return
+
+        os.makedirs(self.output, exist_ok=True)
+        self._index_file = open(os.path.join(self.output, 'index.csv'), 'w', newline='')
+        self._index = csv.writer(self._index_file)
+        self._index.writerow(['shot', 'scheduled', 'captured', 'error_ms', 'file'])
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._writer_thread = threading.Thread(target=self._write_loop, name="TimeLapseWriter", daemon=True)
+        self._writer_thread.start()
+
+    def _close_output(self):
+        if self._recorder:
+            self._recorder.stop()
+            self._recorder = None
+        if self._writer_thread:
+            self._queue.put(None)
+            self._writer_thread.join()
+            self._writer_thread = None
+            self._index_file.close()
+
+    def _write_loop(self):
+        """Writer thread: save queued shots and index them."""
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.quality] if self.format == 'jpg' else []
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            shot, scheduled, captured, frame = item
+            filename = f"shot_{shot:06d}.{self.format}"
+            path = os.path.join(self.output, filename)
+            # A failed write must not end the thread, or run() blocks on the full queue
+            try:
+                if isinstance(frame, JpegFrame):
+                    ok = frame.save(path)
+                else:
+                    ok = cv2.imwrite(path, frame, params)
+            except cv2.error as e:
+                print(f"Error writing {path}: {e}")
+                ok = False
+            if not ok:
+                print(f"Cannot write {path}")
+                self.write_failures += 1
+                continue
+            self._index.writerow([shot, f"{scheduled:.6f}", f"{captured:.6f}",
+                                  f"{(captured - scheduled) * 1000:.3f}", filename])
+            self._index_file.flush()
+
+    def run(self) -> TimeLapseReport:
+        """Run the schedule until count/duration is reached or stop() is called."""
+        self._stop.clear()
+        self._open_output()
+        start = time.monotonic()
+        shot = 0
+        try:
+            while not self._stop.is_set():
+                if self.count is not None and self.shots_taken >= self.count:
+                    break
+                scheduled = start + shot * self.interval
+                if self.duration is not None and scheduled - start > self.duration:
+                    break
+
+                if not self.keep_warm:
+                    if not self._sleep_until(scheduled - self.warmup):
+                        break
+                    if not self._warm_up():
+                        self.capture_failures += 1
+                        shot += 1
+                        continue
+                if not self._sleep_until(scheduled):
+                    break
+
+                frame = self._shoot()
+                captured = time.monotonic()
+                if not self.keep_warm:
+                    self.driver.disconnect()
+
+                if frame is None:
+                    self.capture_failures += 1
+                else:
+                    error = abs(captured - scheduled)
+                    self._error_sum += error
+                    self._error_max = max(self._error_max, error)
+                    self.shots_taken += 1
+                    if self._recorder:
+                        if isinstance(frame, JpegFrame):
+                            frame = frame.decode()
+                        self._recorder.write(frame, captured)
+                    else:
+                        self._queue.put((shot, scheduled - start, captured - start, frame))
+
+                # Next deadline still ahead; skip any that were overrun
+                next_shot = shot + 1
+                behind = time.monotonic() - (start + next_shot * self.interval)
+                if behind > 0:
+                    skipped = int(behind // self.interval) + 1
+                    self.shots_missed += skipped
+                    next_shot += skipped
+                shot = next_shot
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._close_output()
+
+        mean_error = self._error_sum / self.shots_taken if self.shots_taken else 0.0
+        report = TimeLapseReport(self.output, self.shots_taken, self.shots_missed, self.capture_failures,
+                                 self.write_failures, mean_error * 1000, self._error_max * 1000,
+                                 time.monotonic() - start)
+        print(f"Time-lapse finished: {report.shots_taken} shots, {report.shots_missed} missed, "
+              f"{report.write_failures} not saved, max error {report.max_error_ms:.2f} ms")
+        return report
+
+def main():
+    """Run a time-lapse from the command line."""
+    parser = argparse.ArgumentParser(description="Microscope time-lapse capture")
+    parser.add_argument('output', help="Output directory (sequence) or video file (--video)")
+    parser.add_argument('--interval', type=float, required=True, help="Seconds between shots")
+    parser.add_argument('--count', type=int, help="Number of shots")
+    parser.add_argument('--duration', type=float, help="Session length in seconds")
+    parser.add_argument('--video', action='store_true', help="Write a video instead of images")
+    parser.add_argument('--video-fps', type=float, default=30.0, help="Playback rate of the video")
+    parser.add_argument('--format', default='jpg', choices=IMAGE_FORMATS, help="Image format for sequences")
+    parser.add_argument('--reconnect', action='store_true', help="Disconnect between shots")
+    parser.add_argument('--warmup', type=float, default=2.0, help="Seconds to reconnect before a shot")
+    parser.add_argument('--threaded', action='store_true', help="Keep a background grabber running")
+    parser.add_argument('--passthrough', action='store_true', help="Save device JPEGs as-is")
+    parser.add_argument('--fake', action='store_true', help="Use the synthetic camera")
+    args = parser.parse_args()
+
+    if args.fake:
+        from driver.fake_camera import FakeMicroscopeDriver
+        driver = FakeMicroscopeDriver(threaded=args.threaded, passthrough=args.passthrough)
+    else:
+        from driver.microscope_driver import MicroscopeDriver
+        driver = MicroscopeDriver(threaded=args.threaded, passthrough=args.passthrough)
+
+    if not driver.connect():
+        print("Microscope connection failed")
+        return
+
+    timelapse = TimeLapse(driver, args.interval, args.output, count=args.count, duration=args.duration,
+                          mode='video' if args.video else 'sequence', keep_warm=not args.reconnect,
+                          warmup=args.warmup, format=args.format, video_fps=args.video_fps)
+    try:
+        timelapse.run()
+    finally:
+        if driver.is_connected:
+            driver.disconnect()
+
+if __name__ == "__main__":
+    main()
@@ -10,12 +10,25 @@ import cv2
 import numpy as np
 from PIL import Image, ImageTk
 import threading
+import queue
+import time
 import sys
 import os
 
 # Import driver module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from driver.microscope_driver import MicroscopeDriver
+from driver.denoise import TemporalDenoiser
+from driver.focus_meter import FocusMeter
+from driver.change_detect import ChangeDetector
+from driver.metrics import METRICS
+from driver.pyramid import write_pyramid
+from gui.pyramid_viewer import PyramidViewer, pyramid_for
+
+DISPLAY_SIZE = (400, 300)  # Video display size (width, height)
+TARGET_FPS = 30
+POLL_INTERVAL_MS = 5  # How often the Tk thread checks for a new frame
+SAVE_FILETYPES = [("JPEG files", "*.jpg"), ("PNG files", "*.png"), ("Tiled pyramid", "*.epyr"), ("All files", "*.*")]
 
 class MicroscopeGUI:
     """Microscope GUI class"""
@@ -25,10 +38,34 @@ class MicroscopeGUI:
         self.root.title("USB Microscope Control")
         self.root.geometry("800x600")
         
-        self.driver = MicroscopeDriver()
+        self.driver = MicroscopeDriver(threaded=True)
         self.is_streaming = False
         self.current_frame = None
         
+        # Streaming state: the worker thread fills a latest-only queue that
+        # the Tk thread drains, so Tk is only ever touched from mainloop
+        self.video_thread = None
+        self.frame_queue = queue.Queue(maxsize=1)
+        self.poll_job = None
+        self.photo = None
+        self.frames_displayed = 0
+        self.frames_dropped = 0
+        self.fps_window_start = 0.0
+        self.fps_window_count = 0
+        self.display_fps = 0.0
+        
+        # Temporal denoise, applied on the worker thread when enabled
+        self.denoiser = TemporalDenoiser()
+        self.denoise_enabled = False
+        
+        # Focus score of each streamed frame, computed on the worker thread
+        self.focus_meter = FocusMeter()
+        
+        # Still-scene detection: unchanged frames skip conversion and display
+        # (refreshed once a second so the view never looks frozen)
+        self.change_detector = ChangeDetector(refresh=1.0)
+        self.skip_unchanged = False
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -78,6 +115,32 @@ class MicroscopeGUI:
         self.capture_btn = ttk.Button(control_frame, text="Take Photo", command=self.capture_image, state="disabled")
         self.capture_btn.grid(row=2, column=1, sticky=tk.W, padx=(5, 0), pady=(10, 0))
         
+        # Large image viewer (works without a microscope)
+        self.open_image_btn = ttk.Button(control_frame, text="Open Image", command=self.open_image)
+        self.open_image_btn.grid(row=2, column=1, sticky=tk.W, padx=(85, 0), pady=(10, 0))
+        
+        # Temporal denoise toggle
+        self.denoise_var = tk.BooleanVar(value=False)
+        self.denoise_check = ttk.Checkbutton(control_frame, text="Denoise", variable=self.denoise_var,
+                                             command=self.on_denoise_toggle)
+        self.denoise_check.grid(row=3, column=1, sticky=tk.W, padx=(5, 0), pady=(10, 0))
+        
+        # Skip unchanged frames toggle
+        self.skip_unchanged_var = tk.BooleanVar(value=False)
+        self.skip_unchanged_check = ttk.Checkbutton(control_frame, text="Skip unchanged",
+                                                    variable=self.skip_unchanged_var,
+                                                    command=self.on_skip_unchanged_toggle)
+        self.skip_unchanged_check.grid(row=3, column=1, sticky=tk.W, padx=(85, 0), pady=(10, 0))
+        
+        # Focus readout with peak-hold
+        ttk.Label(control_frame, text="Focus:").grid(row=4, column=0, sticky=tk.W, pady=(10, 0))
+        self.focus_label = ttk.Label(control_frame, text="--")
+        self.focus_label.grid(row=4, column=1, sticky=tk.W, padx=(5, 0), pady=(10, 0))
+        self.focus_bar = ttk.Progressbar(control_frame, maximum=1.0, length=150)
+        self.focus_bar.grid(row=5, column=1, sticky=tk.W, padx=(5, 0))
+        self.reset_peak_btn = ttk.Button(control_frame, text="Reset Peak", command=self.focus_meter.reset_peak)
+        self.reset_peak_btn.grid(row=6, column=1, sticky=tk.W, padx=(5, 0), pady=(5, 0))
+        
         # Video frame
         video_frame = ttk.LabelFrame(main_frame, text="Video", padding="5")
         video_frame.grid(row=1, column=1, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(10, 0))
@@ -85,6 +148,9 @@ class MicroscopeGUI:
         self.video_label = ttk.Label(video_frame, text="No video", background="black", foreground="white")
         self.video_label.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
+        self.stream_stats_label = ttk.Label(video_frame, text="")
+        self.stream_stats_label.grid(row=1, column=0, sticky=tk.W)
+        
         # Info frame
         info_frame = ttk.LabelFrame(main_frame, text="Device Information", padding="5")
         info_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
@@ -136,6 +202,7 @@ class MicroscopeGUI:
         
         self.info_text.delete(1.0, tk.END)
         self.video_label.config(image="", text="No video")
+        self.stream_stats_label.config(text="")
     
     def on_brightness_change(self, value):
         """LED brightness change"""
@@ -143,6 +210,16 @@ class MicroscopeGUI:
             brightness = int(float(value))
             self.driver.set_led_brightness(brightness)
     
+    def on_denoise_toggle(self):
+        """Enable or disable temporal denoising of the stream"""
+        self.denoise_enabled = self.denoise_var.get()
+        self.denoiser.reset()
+    
+    def on_skip_unchanged_toggle(self):
+        """Enable or disable skipping of frames that match the last one shown"""
+        self.skip_unchanged = self.skip_unchanged_var.get()
+        self.change_detector.reset()
+    
     def start_video(self):
         """Start video stream"""
         if not self.is_streaming:
@@ -151,100 +228,193 @@ class MicroscopeGUI:
             self.start_video_btn.config(state="disabled")
             self.stop_video_btn.config(state="normal")
             
-            # Start video stream thread (for actual implementation)
-            # self.video_thread = threading.Thread(target=self.video_loop)
-            # self.video_thread.daemon = True
-            # self.video_thread.start()
+            # Single PhotoImage reused for every frame via paste()
+            if self.photo is None:
+                self.photo = ImageTk.PhotoImage("RGB", DISPLAY_SIZE)
+            self.video_label.config(image=self.photo, text="")
+            
+            self.frames_displayed = 0
+            self.frames_dropped = 0
+            self.focus_meter.reset_peak()
+            self.change_detector.reset()
+            self.fps_window_start = time.monotonic()
+            self.fps_window_count = 0
+            self.display_fps = 0.0
             
-            # Currently show dummy image
-            self.show_dummy_video()
+            self.video_thread = threading.Thread(target=self.video_loop, name="VideoLoop")
+            self.video_thread.daemon = True
+            self.video_thread.start()
+            
+            self.poll_job = self.root.after(POLL_INTERVAL_MS, self.poll_frames)
     
     def stop_video(self):
         """Stop video stream"""
         if self.is_streaming:
             self.is_streaming = False
+            if self.poll_job is not None:
+                self.root.after_cancel(self.poll_job)
+                self.poll_job = None
+            if self.video_thread is not None:
+                self.video_thread.join(timeout=1.0)
+                self.video_thread = None
+            
+            # Discard any frame still waiting for display
+            try:
+                self.frame_queue.get_nowait()
+            except queue.Empty:
+                pass
+            
             self.driver.stop_video_stream()
             self.start_video_btn.config(state="normal")
             self.stop_video_btn.config(state="disabled")
             self.video_label.config(image="", text="Video stopped")
     
-    def show_dummy_video(self):
-        """Show actual microscope video"""
-        if not self.driver.is_connected:
-            return
-        
-        # Capture actual frame
-        frame = self.driver.capture_frame()
+    def video_loop(self):
+        """Capture worker: grab, convert and hand frames to the Tk thread"""
+        seq = 0
+        frame_interval = 1.0 / TARGET_FPS
         
-        if frame is not None:
-            # Convert OpenCV BGR to RGB
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Convert to PIL image
-            pil_image = Image.fromarray(frame_rgb)
-            pil_image = pil_image.resize((400, 300))
+        while self.is_streaming:
+            if self.driver.grabber:
+                grabbed = self.driver.wait_for_next(seq, timeout=0.5)
+                if grabbed is None:
+                    continue
+                seq, frame = grabbed.seq, grabbed.frame
+            else:
+                started = time.monotonic()
+                frame = self.driver.capture_frame()
+                if frame is None:
+                    time.sleep(frame_interval)
+                    continue
+                # Pace synchronous reads to the target frame rate
+                remaining = frame_interval - (time.monotonic() - started)
+                if remaining > 0:
+                    time.sleep(remaining)
             
-            # Convert to tkinter image
-            tk_image = ImageTk.PhotoImage(pil_image)
+            if self.denoise_enabled:
+                # The denoiser reuses its output buffer, so keep a copy for capture_image
+                frame = self.denoiser.update(frame).copy()
             
-            self.video_label.config(image=tk_image, text="")
-            self.video_label.image = tk_image  # Keep reference
+            if self.skip_unchanged and not self.change_detector.check(frame):
+                continue
             
-            self.current_frame = frame
-        else:
-            # Connected but cannot get frame
-            self.video_label.config(image="", text="No frame\n(Check lighting)")
+            self.focus_meter.update(frame, seq)
             
-        # Update again after 1 second (real-time effect)
-        if self.is_streaming:
-            self.root.after(1000, self.show_dummy_video)
+            # Resize before color conversion so the conversion touches fewer pixels
+            start = time.perf_counter_ns()
+            small = cv2.resize(frame, DISPLAY_SIZE, interpolation=cv2.INTER_AREA)
+            frame_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+            METRICS.observe('gui_convert', start)
+            self.submit_frame(frame, frame_rgb)
     
-    def video_loop(self):
-        """Video loop (for actual implementation)"""
-        while self.is_streaming:
-            frame = self.driver.capture_frame()
-            if frame is not None:
-                # Display frame in GUI
-                self.display_frame(frame)
-            time.sleep(0.033)  # ~30 FPS
+    def submit_frame(self, frame, frame_rgb):
+        """Queue a frame for display, replacing one the Tk thread has not shown yet"""
+        try:
+            self.frame_queue.put_nowait((frame, frame_rgb))
+        except queue.Full:
+            try:
+                self.frame_queue.get_nowait()
+                self.frames_dropped += 1
+                METRICS.inc('gui_frames_dropped')
+            except queue.Empty:
+                pass
+            try:
+                self.frame_queue.put_nowait((frame, frame_rgb))
+            except queue.Full:
+                self.frames_dropped += 1
+                METRICS.inc('gui_frames_dropped')
     
-    def display_frame(self, frame):
-        """Display frame in GUI"""
-        # Convert OpenCV BGR to RGB
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    def poll_frames(self):
+        """Tk thread: display the newest queued frame, then reschedule"""
+        if not self.is_streaming:
+            return
         
-        # Convert to PIL image
-        pil_image = Image.fromarray(frame_rgb)
-        pil_image = pil_image.resize((400, 300))
+        try:
+            frame, frame_rgb = self.frame_queue.get_nowait()
+        except queue.Empty:
+            pass
+        else:
+            self.display_frame(frame, frame_rgb)
         
-        # Convert to tkinter image
-        tk_image = ImageTk.PhotoImage(pil_image)
+        self.poll_job = self.root.after(POLL_INTERVAL_MS, self.poll_frames)
+    
+    def display_frame(self, frame, frame_rgb=None):
+        """Display frame in GUI (Tk thread only)"""
+        start = time.perf_counter_ns()
+        if frame_rgb is None:
+            small = cv2.resize(frame, DISPLAY_SIZE, interpolation=cv2.INTER_AREA)
+            frame_rgb = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
         
-        self.video_label.config(image=tk_image)
-        self.video_label.image = tk_image  # Keep reference
+        if self.photo is None:
+            self.photo = ImageTk.PhotoImage("RGB", DISPLAY_SIZE)
+            self.video_label.config(image=self.photo, text="")
+        self.photo.paste(Image.fromarray(frame_rgb))
+        METRICS.observe('gui_display', start)
+        METRICS.inc('gui_frames_displayed')
         
         self.current_frame = frame
+        self.frames_displayed += 1
+        self.update_focus_readout()
+        self.update_stream_stats()
+    
+    def update_focus_readout(self):
+        """Show the latest focus score and its peak-hold"""
+        reading = self.focus_meter.latest
+        if reading is None:
+            return
+        self.focus_label.config(text=f"{reading.score:.1f}  (peak {reading.peak:.1f})")
+        self.focus_bar.config(value=min(reading.relative, 1.0))
+    
+    def update_stream_stats(self):
+        """Refresh display/drop counters about once per second"""
+        self.fps_window_count += 1
+        now = time.monotonic()
+        elapsed = now - self.fps_window_start
+        if elapsed < 1.0:
+            return
+        
+        self.display_fps = self.fps_window_count / elapsed
+        self.fps_window_start = now
+        self.fps_window_count = 0
+        self.stream_stats_label.config(
+            text=f"FPS: {self.display_fps:.1f}  Displayed: {self.frames_displayed}  Dropped: {self.frames_dropped}"
+                 f"  Unchanged: {self.change_detector.frames_unchanged}"
+        )
     
     def capture_image(self):
         """Capture image"""
         if self.current_frame is not None:
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".jpg",
-                filetypes=[("JPEG files", "*.jpg"), ("PNG files", "*.png"), ("All files", "*.*")]
-            )
+            filename = filedialog.asksaveasfilename(defaultextension=".jpg", filetypes=SAVE_FILETYPES)
             if filename:
-                cv2.imwrite(filename, self.current_frame)
+                self.save_image(filename, self.current_frame)
                 messagebox.showinfo("Success", f"Image saved: {filename}")
         else:
             # Save dummy image
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".jpg",
-                filetypes=[("JPEG files", "*.jpg"), ("PNG files", "*.png"), ("All files", "*.*")]
-            )
+            filename = filedialog.asksaveasfilename(defaultextension=".jpg", filetypes=SAVE_FILETYPES)
             if filename:
                 dummy_image = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
-                cv2.imwrite(filename, dummy_image)
+                self.save_image(filename, dummy_image)
                 messagebox.showinfo("Success", f"Test image saved: {filename}")
+    
+    @staticmethod
+    def save_image(filename, image):
+        """Save as a plain image, or as a tiled pyramid for .epyr"""
+        if filename.lower().endswith('.epyr'):
+            return write_pyramid(image, filename)
+        return cv2.imwrite(filename, image)
+    
+    def open_image(self):
+        """Open an image in the zoom/pan viewer (plain images are converted to a pyramid once)"""
+        filename = filedialog.askopenfilename(
+            filetypes=[("Tiled pyramid", "*.epyr"), ("Images", "*.jpg *.png *.tif *.tiff"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+        try:
+            # The window's event bindings keep the viewer alive until it is closed
+            PyramidViewer(self.root, pyramid_for(filename))
+        except (ValueError, OSError) as e:
+            messagebox.showerror("Error", f"Cannot open image: {e}")
 
 def main():
     """Main function"""
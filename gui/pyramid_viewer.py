@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Pyramid Image Viewer
+Zoom and pan window for tiled pyramid files: each redraw decodes only the
+tiles visible at the level matching the zoom, so memory stays bounded by
+the window size and the tile cache
+"""
+
+import tkinter as tk
+from tkinter import ttk, filedialog
+import cv2
+from PIL import Image, ImageTk
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.pyramid import PyramidImage, write_pyramid
+
+VIEW_SIZE = (800, 600)  # Initial window size (width, height)
+ZOOM_STEP = 1.25
+MAX_ZOOM = 8.0
+
+def pyramid_for(path: str) -> str:
+    """
+    Pyramid file for an image path
+
+    Plain images are converted once to a .epyr file next to them, reused
+    while it is newer than the image.
+    """
+    if path.lower().endswith('.epyr'):
+        return path
+    pyramid_path = os.path.splitext(path)[0] + '.epyr'
+    if os.path.exists(pyramid_path) and os.path.getmtime(pyramid_path) >= os.path.getmtime(path):
+        return pyramid_path
+    image = cv2.imread(path, cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Cannot read {path}")
+    if not write_pyramid(image, pyramid_path):
+        raise ValueError(f"Cannot write {pyramid_path}")
+    return pyramid_path
+
+class PyramidViewer:
+    """Toplevel window showing one pyramid file"""
+
+    def __init__(self, master, path: str, cache_tiles: int = 128):
+        self.pyramid = PyramidImage(path, cache_tiles=cache_tiles)
+        self.window = tk.Toplevel(master)
+        self.window.title(f"{os.path.basename(path)} ({self.pyramid.width}x{self.pyramid.height})")
+        self.window.geometry(f"{VIEW_SIZE[0]}x{VIEW_SIZE[1] + 24}")
+
+        self.canvas = tk.Canvas(self.window, bg="black", highlightthickness=0)
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.status_label = ttk.Label(self.window, text="")
+        self.status_label.pack(fill=tk.X)
+        self.image_item = self.canvas.create_image(0, 0, anchor=tk.NW)
+        self.photo = None
+
+        # View state: top-left corner in full-resolution pixels and screen pixels per image pixel
+        self.x = 0.0
+        self.y = 0.0
+        self.zoom = 1.0
+        self.view_size = VIEW_SIZE
+        self.drag_start = None
+        self.redraw_job = None
+        self.fit()
+
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.canvas.bind("<ButtonPress-1>", self.on_drag_start)
+        self.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.bind("<MouseWheel>", self.on_wheel)  # Windows / macOS
+        self.canvas.bind("<Button-4>", lambda event: self.zoom_at(ZOOM_STEP, event.x, event.y))  # X11
+        self.canvas.bind("<Button-5>", lambda event: self.zoom_at(1 / ZOOM_STEP, event.x, event.y))
+        self.window.bind("<plus>", lambda event: self.zoom_at(ZOOM_STEP))
+        self.window.bind("<minus>", lambda event: self.zoom_at(1 / ZOOM_STEP))
+        self.window.bind("<Key-0>", lambda event: self.fit())
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+    def close(self):
+        """Close the window and the file"""
+        if self.redraw_job is not None:
+            self.window.after_cancel(self.redraw_job)
+            self.redraw_job = None
+        self.window.destroy()
+        self.pyramid.close()
+
+    def fit(self):
+        """Zoom to show the whole image, centred"""
+        width, height = self.view_size
+        self.zoom = min(width / self.pyramid.width, height / self.pyramid.height, 1.0)
+        self.x = (self.pyramid.width - width / self.zoom) / 2
+        self.y = (self.pyramid.height - height / self.zoom) / 2
+        self.schedule_redraw()
+
+    def zoom_at(self, factor: float, sx: float = None, sy: float = None):
+        """Zoom keeping the image point under screen position (sx, sy) fixed"""
+        width, height = self.view_size
+        sx = width / 2 if sx is None else sx
+        sy = height / 2 if sy is None else sy
+        minimum = min(width / self.pyramid.width, height / self.pyramid.height, 1.0) / 2
+        zoom = min(MAX_ZOOM, max(minimum, self.zoom * factor))
+        self.x += sx / self.zoom - sx / zoom
+        self.y += sy / self.zoom - sy / zoom
+        self.zoom = zoom
+        self.schedule_redraw()
+
+    def on_wheel(self, event):
+        self.zoom_at(ZOOM_STEP if event.delta > 0 else 1 / ZOOM_STEP, event.x, event.y)
+
+    def on_drag_start(self, event):
+        self.drag_start = (event.x, event.y)
+
+    def on_drag(self, event):
+        if self.drag_start is None:
+            return
+        self.x -= (event.x - self.drag_start[0]) / self.zoom
+        self.y -= (event.y - self.drag_start[1]) / self.zoom
+        self.drag_start = (event.x, event.y)
+        self.schedule_redraw()
+
+    def on_resize(self, event):
+        if (event.width, event.height) != self.view_size and event.width > 1 and event.height > 1:
+            self.view_size = (event.width, event.height)
+            self.schedule_redraw()
+
+    def schedule_redraw(self):
+        """Coalesce bursts of drag and wheel events into one redraw"""
+        if self.redraw_job is None:
+            self.redraw_job = self.window.after_idle(self.redraw)
+
+    def redraw(self):
+        """Fetch the visible tiles at the current zoom and show them"""
+        self.redraw_job = None
+        # Keep at least part of the image in view
+        width, height = self.view_size
+        span_x, span_y = width / self.zoom, height / self.zoom
+        self.x = min(max(self.x, -span_x / 2), self.pyramid.width - span_x / 2)
+        self.y = min(max(self.y, -span_y / 2), self.pyramid.height - span_y / 2)
+
+        view = self.pyramid.read_region(self.x, self.y, span_x, span_y, self.zoom)
+        if view.ndim == 3:
+            view = cv2.cvtColor(view, cv2.COLOR_BGR2RGB)
+        self.photo = ImageTk.PhotoImage(Image.fromarray(view))
+        self.canvas.itemconfig(self.image_item, image=self.photo)
+
+        level = self.pyramid.level_for_zoom(self.zoom)
+        self.status_label.config(
+            text=f"Zoom: {self.zoom * 100:.0f}%  Level: {level}/{self.pyramid.levels - 1}  "
+                 f"Tiles decoded: {self.pyramid.tiles_decoded}"
+        )
+
+def main():
+    """Main function"""
+    root = tk.Tk()
+    root.withdraw()
+    path = sys.argv[1] if len(sys.argv) > 1 else filedialog.askopenfilename(
+        filetypes=[("Tiled pyramid", "*.epyr"), ("Images", "*.jpg *.png *.tif *.tiff"), ("All files", "*.*")]
+    )
+    if not path:
+        return
+    viewer = PyramidViewer(root, pyramid_for(path))
+    viewer.window.protocol("WM_DELETE_WINDOW", lambda: (viewer.close(), root.destroy()))
+
+    try:
+        root.mainloop()
+    except KeyboardInterrupt:
+        print("Application terminated")
+
+if __name__ == "__main__":
+    main()
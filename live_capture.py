@@ -7,25 +7,71 @@ import sys
 import os
 import cv2
 import time
+import argparse
 from datetime import datetime
 
 # Import driver module
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from driver.microscope_driver import MicroscopeDriver
+from driver.terminal_preview import MODES, render_ascii, run_live
+from driver.recorder import record
+from driver.denoise import TemporalDenoiser
+from driver.focus_meter import FOCUS_METHODS, FocusMeter
+from driver.frame_stats import frame_stats
+from driver.metrics import start_metrics_server
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Microscope real-time capture")
+    parser.add_argument('--live', action='store_true', help="Continuously redraw a terminal preview")
+    parser.add_argument('--mode', choices=MODES, default='ascii', help="Live preview render mode")
+    parser.add_argument('--width', type=int, default=80, help="Live preview width in characters")
+    parser.add_argument('--fake', action='store_true', help="Use a synthetic camera instead of the device")
+    parser.add_argument('--replay', metavar='PATH', help="Replay a video file or image directory instead of the device")
+    parser.add_argument('--passthrough', action='store_true', help="Keep the camera's MJPEG frames compressed")
+    parser.add_argument('--denoise', action='store_true', help="Temporally denoise the live preview")
+    parser.add_argument('--focus', choices=FOCUS_METHODS, help="Show a live focus score with peak-hold")
+    parser.add_argument('--average', type=int, default=1, help="Save screenshots as the mean of N frames")
+    parser.add_argument('--metrics-port', type=int, help="Serve Prometheus metrics on this local port")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
     print("=== Microscope Real-time Capture ===")
     
     # Initialize and connect driver
-    driver = MicroscopeDriver()
+    if args.fake:
+        from driver.fake_camera import FakeMicroscopeDriver
+        driver = FakeMicroscopeDriver(threaded=args.live, passthrough=args.passthrough)
+    elif args.replay:
+        from driver.backends import ReplayBackend
+        driver = MicroscopeDriver(threaded=args.live, passthrough=args.passthrough,
+                                  backend=ReplayBackend(args.replay))
+    else:
+        driver = MicroscopeDriver(threaded=args.live, passthrough=args.passthrough)
     
     if not driver.connect():
         print("Microscope connection failed")
         return
     
     print("Microscope connected successfully!")
+    
+    if args.metrics_port is not None:
+        start_metrics_server(args.metrics_port)
+    
+    if args.live:
+        # Redraw in place at the camera frame rate until Ctrl+C
+        try:
+            run_live(driver, width=args.width, mode=args.mode,
+                     status=FocusMeter(args.focus).status if args.focus else None,
+                     denoiser=TemporalDenoiser() if args.denoise else None)
+        finally:
+            driver.disconnect()
+            print("Microscope disconnected")
+        return
     print("Commands:")
     print("  's' - Save screenshot")
+    print("  'r' - Record video")
+    print("  'u' - Burst capture")
     print("  'b' - Adjust brightness")
     print("  'q' - Quit")
     print("  Enter - Capture frame and display ASCII")
@@ -35,22 +81,64 @@ def main():
     try:
         while True:
             # Wait for user input
-            print(f"\n[Frame {frame_count}] Enter command (Enter/s/b/q): ", end="")
+            print(f"\n[Frame {frame_count}] Enter command (Enter/s/r/u/b/q): ", end="")
             command = input().strip().lower()
             
             if command == 'q':
                 break
             elif command == 's':
-                # Save screenshot
-                frame = driver.capture_frame()
-                if frame is not None:
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"microscope_{timestamp}.jpg"
-                    cv2.imwrite(filename, frame)
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"microscope_{timestamp}.jpg"
+                if args.average > 1:
+                    # Mean of consecutive frames to suppress sensor noise
+                    frame = driver.capture_averaged(args.average)
+                    saved = frame is not None and cv2.imwrite(filename, frame)
+                else:
+                    # Save screenshot (device JPEG is written as-is in passthrough mode)
+                    jpeg = driver.capture_jpeg()
+                    saved = jpeg is not None and jpeg.save(filename)
+                if saved:
                     print(f"✅ Screenshot saved: {filename}")
                 else:
                     print("❌ Frame capture failed")
             
+            elif command == 'r':
+                # Record video
+                print("Enter recording length in seconds: ", end="")
+                try:
+                    seconds = float(input())
+                except ValueError:
+                    print("❌ Invalid value")
+                    continue
+                
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                filename = f"microscope_{timestamp}.avi"
+                report = record(driver, filename, seconds)
+                if report and report.frames_written:
+                    print(f"✅ Video saved: {filename} ({report.frames_written} frames, "
+                          f"{report.average_fps:.1f} fps, {report.frames_dropped} dropped)")
+                else:
+                    print("❌ Recording failed")
+            
+            elif command == 'u':
+                # Burst capture, encoded in parallel
+                print("Enter number of frames: ", end="")
+                try:
+                    count = int(input())
+                except ValueError:
+                    print("❌ Invalid value")
+                    continue
+                
+                job = driver.burst(count, prefix="microscope_burst")
+                if job is None:
+                    print("❌ Burst capture failed")
+                    continue
+                print(f"Captured {job.count} frames at {job.capture_fps:.1f} fps, saving...")
+                with job:
+                    for done, total, path in job.progress():
+                        print(f"\r  {done}/{total} {path}", end="", flush=True)
+                print(f"\n✅ Burst saved: {job.count} frames")
+            
             elif command == 'b':
                 # Adjust brightness
                 print("Enter brightness value (0-255): ", end="")
@@ -75,18 +163,14 @@ def main():
                     
                     print("\nMicroscope real-time preview:")
                     print("-" * 60)
-                    ascii_chars = " .:-=+*#%@"
-                    for row in gray_small[::2]:  # Every 2 rows
-                        line = ""
-                        for pixel in row[::2]:  # Every 2 pixels
-                            char_index = min(len(ascii_chars) - 1, int(pixel) * len(ascii_chars) // 256)
-                            line += ascii_chars[char_index]
-                        print(line)
+                    print(render_ascii(gray_small, 30, 23))
                     print("-" * 60)
                     
-                    # Image statistics
-                    print(f"Average brightness: {gray_small.mean():.1f}")
-                    print(f"Pixel range: {frame.min()} ~ {frame.max()}")
+                    # Image statistics (one histogram pass over a decimated grid)
+                    stats = frame_stats(frame)
+                    print(f"Average brightness: {stats.mean:.1f}  Std: {stats.std:.1f}")
+                    print(f"Pixel range: {stats.min} ~ {stats.max}  "
+                          f"Clipped: {stats.clipped_low:.1f}% dark, {stats.clipped_high:.1f}% bright")
                     
                 else:
                     print("❌ Frame capture failed")
@@ -1,12 +1,33 @@
 use std::sync::Mutex;
+use base64::Engine;
 use lazy_static::lazy_static;
 use crate::models::{MicroscopeStatus, CaptureResult, StreamFrame};
-use crate::utils::{AppConfig, PythonBridge};
+use crate::utils::{AppConfig, CaptureServer, PythonBridge, ServerResponse, Result, OP_CAPTURE, OP_FRAME_IF_CHANGED};
 
 // Global streaming state
 lazy_static! {
     static ref STREAMING_STATE: Mutex<bool> = Mutex::new(false);
     static ref APP_CONFIG: AppConfig = AppConfig::new();
+    static ref CAPTURE_SERVER: Mutex<Option<CaptureServer>> = Mutex::new(None);
+}
+
+/// Send a request to the persistent capture server, starting it on first use
+/// and restarting it if the previous process has exited.
+fn capture_server_request(opcode: u8, quality: u8) -> Result<ServerResponse> {
+    let mut guard = CAPTURE_SERVER
+        .lock()
+        .unwrap_or_else(|poisoned| poisoned.into_inner());
+
+    let alive = guard.as_mut().map_or(false, |server| server.is_alive());
+    if !alive {
+        *guard = Some(CaptureServer::spawn(&APP_CONFIG)?);
+    }
+
+    let result = guard.as_mut().unwrap().request(opcode, quality);
+    if result.is_err() && !guard.as_mut().map_or(false, |server| server.is_alive()) {
+        *guard = None;
+    }
+    result
 }
 
 #[tauri::command]
@@ -46,29 +67,14 @@ pub async fn check_microscope() -> std::result::Result<MicroscopeStatus, String>
 #[tauri::command]
 pub async fn get_live_frame() -> std::result::Result<StreamFrame, String> {
     log::debug!("Capturing live frame");
-    
-    let bridge = PythonBridge::new(AppConfig::new());
-    let temp_file = APP_CONFIG.get_temp_file("microscope_live_frame.jpg");
-    let temp_file_str = temp_file.to_string_lossy();
-    
-    match bridge.capture_frame(&temp_file_str) {
-        Ok(output) => {
-            let lines: Vec<&str> = output.lines().collect();
-            
-            if lines.len() >= 3 && lines[0] == "SUCCESS" {
-                let base64_data = lines[1];
-                if let Ok(timestamp) = lines[2].parse::<u64>() {
-                    return Ok(StreamFrame::success(base64_data.to_string(), timestamp));
-                }
-            }
-            
-            let error_msg = if output.starts_with("ERROR:") {
-                output[6..].to_string()
-            } else {
-                "Camera busy or unavailable".to_string()
-            };
-            
-            Ok(StreamFrame::error(error_msg))
+
+    // Quality 0 lets the server's adaptive controller pick quality and scale;
+    // a still scene comes back without a payload and is not re-sent
+    match capture_server_request(OP_FRAME_IF_CHANGED, 0) {
+        Ok(response) if response.unchanged => Ok(StreamFrame::unchanged(response.timestamp)),
+        Ok(response) => {
+            let base64_data = base64::engine::general_purpose::STANDARD.encode(&response.payload);
+            Ok(StreamFrame::success(base64_data, response.timestamp))
         }
         Err(e) => {
             log::error!("Failed to capture live frame: {}", e);
@@ -80,32 +86,19 @@ pub async fn get_live_frame() -> std::result::Result<StreamFrame, String> {
 #[tauri::command]
 pub async fn capture_image() -> std::result::Result<CaptureResult, String> {
     log::info!("Capturing high-quality image");
-    
-    let bridge = PythonBridge::new(AppConfig::new());
+
     let temp_file = APP_CONFIG.get_temp_file("microscope_capture.jpg");
-    let temp_file_str = temp_file.to_string_lossy();
-    
-    match bridge.capture_high_quality_image(&temp_file_str) {
-        Ok(output) => {
-            if output.starts_with("SUCCESS:") {
-                let json_part = &output[8..]; // Remove "SUCCESS:" prefix
-                if let Ok(data) = serde_json::from_str::<serde_json::Value>(json_part) {
-                    if let Some(base64_data) = data["base64"].as_str() {
-                        return Ok(CaptureResult::success(
-                            Some(temp_file_str.to_string()),
-                            Some(base64_data.to_string()),
-                        ));
-                    }
-                }
+    let temp_file_str = temp_file.to_string_lossy().to_string();
+
+    match capture_server_request(OP_CAPTURE, 95) {
+        Ok(response) => {
+            log::debug!("Captured {}x{} image", response.width, response.height);
+            if let Err(e) = std::fs::write(&temp_file, &response.payload) {
+                return Ok(CaptureResult::error(format!("Failed to write image: {}", e)));
             }
-            
-            let error_msg = if output.starts_with("ERROR:") {
-                output[6..].to_string()
-            } else {
-                "Unknown error occurred".to_string()
-            };
-            
-            Ok(CaptureResult::error(error_msg))
+
+            let base64_data = base64::engine::general_purpose::STANDARD.encode(&response.payload);
+            Ok(CaptureResult::success(Some(temp_file_str), Some(base64_data)))
         }
         Err(e) => {
             log::error!("Failed to capture image: {}", e);
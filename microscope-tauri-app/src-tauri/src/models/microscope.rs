@@ -65,6 +65,16 @@ impl StreamFrame {
         }
     }
 
+    /// The scene has not changed since the last frame; keep showing it
+    pub fn unchanged(timestamp: u64) -> Self {
+        Self {
+            success: true,
+            image_base64: None,
+            timestamp,
+            error: None,
+        }
+    }
+
     pub fn error(error: String) -> Self {
         Self {
             success: false,
@@ -79,7 +89,8 @@ impl StreamFrame {
 pub struct DeviceConfig {
     pub vendor_id: u16,
     pub product_id: u16,
-    pub video_device_index: u8,
+    /// /dev/videoN of the microscope; None lets the capture server find it via sysfs
+    pub video_device_index: Option<u8>,
     pub default_width: u32,
     pub default_height: u32,
     pub default_fps: u32,
@@ -90,7 +101,7 @@ impl Default for DeviceConfig {
         Self {
             vendor_id: 0x05e3,  // Genesys Logic
             product_id: 0xf12a, // Digital Microscope
-            video_device_index: 4,
+            video_device_index: None,
             default_width: 640,
             default_height: 480,
             default_fps: 30,
@@ -0,0 +1,121 @@
+use std::io::{Read, Write};
+use std::process::{Child, ChildStdin, ChildStdout, Command, Stdio};
+use std::thread;
+use std::time::{Duration, Instant};
+use crate::utils::{AppConfig, EpiphanyError, Result};
+
+// Protocol constants, see driver/capture_server.py
+pub const OP_FRAME: u8 = 0x01;
+pub const OP_CAPTURE: u8 = 0x02;
+pub const OP_FRAME_IF_CHANGED: u8 = 0x05;
+const OP_QUIT: u8 = 0xFF;
+const STATUS_OK: u8 = 0x00;
+const STATUS_UNCHANGED: u8 = 0x02;
+const RESPONSE_HEADER_SIZE: usize = 20;
+const SHUTDOWN_TIMEOUT: Duration = Duration::from_secs(2);
+
+pub struct ServerResponse {
+    pub width: u16,
+    pub height: u16,
+    pub timestamp: u64,
+    pub payload: Vec<u8>,
+    /// OP_FRAME_IF_CHANGED found the scene still; the payload is empty
+    pub unchanged: bool,
+}
+
+/// Long-lived Python capture server speaking the length-prefixed protocol
+/// over the child's stdin/stdout. The device stays open between requests.
+pub struct CaptureServer {
+    child: Child,
+    stdin: ChildStdin,
+    stdout: ChildStdout,
+}
+
+impl CaptureServer {
+    pub fn spawn(config: &AppConfig) -> Result<Self> {
+        let mut command = Command::new(&config.python_path);
+        command
+            .arg(&config.capture_server_script)
+            .arg("--stdio")
+            .arg("--passthrough")
+            .arg("--adaptive");
+        if let Some(index) = config.device.video_device_index {
+            command.arg("--device").arg(index.to_string());
+        }
+        let mut child = command
+            .stdin(Stdio::piped())
+            .stdout(Stdio::piped())
+            .stderr(Stdio::inherit())
+            .spawn()
+            .map_err(|e| EpiphanyError::PythonExecutionError(format!("Failed to start capture server: {}", e)))?;
+
+        let stdin = child.stdin.take().ok_or_else(|| {
+            EpiphanyError::PythonExecutionError("Capture server stdin unavailable".to_string())
+        })?;
+        let stdout = child.stdout.take().ok_or_else(|| {
+            EpiphanyError::PythonExecutionError("Capture server stdout unavailable".to_string())
+        })?;
+
+        log::info!("Capture server started (pid {})", child.id());
+        Ok(Self { child, stdin, stdout })
+    }
+
+    pub fn is_alive(&mut self) -> bool {
+        matches!(self.child.try_wait(), Ok(None))
+    }
+
+    pub fn request(&mut self, opcode: u8, argument: u8) -> Result<ServerResponse> {
+        let mut header = [0u8; 8];
+        header[0] = opcode;
+        header[1] = argument;
+        self.stdin
+            .write_all(&header)
+            .and_then(|_| self.stdin.flush())
+            .map_err(|e| EpiphanyError::CameraAccessError(format!("Capture server write failed: {}", e)))?;
+
+        let mut response = [0u8; RESPONSE_HEADER_SIZE];
+        self.stdout
+            .read_exact(&mut response)
+            .map_err(|e| EpiphanyError::CameraAccessError(format!("Capture server read failed: {}", e)))?;
+
+        let status = response[1];
+        let width = u16::from_be_bytes([response[2], response[3]]);
+        let height = u16::from_be_bytes([response[4], response[5]]);
+        let mut timestamp_bytes = [0u8; 8];
+        timestamp_bytes.copy_from_slice(&response[8..16]);
+        let timestamp = u64::from_be_bytes(timestamp_bytes);
+        let length = u32::from_be_bytes([response[16], response[17], response[18], response[19]]) as usize;
+
+        let mut payload = vec![0u8; length];
+        self.stdout
+            .read_exact(&mut payload)
+            .map_err(|e| EpiphanyError::CameraAccessError(format!("Capture server read failed: {}", e)))?;
+
+        if status != STATUS_OK && status != STATUS_UNCHANGED {
+            return Err(EpiphanyError::CameraAccessError(
+                String::from_utf8_lossy(&payload).to_string(),
+            ));
+        }
+
+        Ok(ServerResponse { width, height, timestamp, payload, unchanged: status == STATUS_UNCHANGED })
+    }
+}
+
+impl Drop for CaptureServer {
+    fn drop(&mut self) {
+        let _ = self.stdin.write_all(&[OP_QUIT, 0, 0, 0, 0, 0, 0, 0]);
+        let _ = self.stdin.flush();
+        // Give the server a moment to exit cleanly, but never block shutdown
+        // on one stuck in a capture
+        let deadline = Instant::now() + SHUTDOWN_TIMEOUT;
+        loop {
+            match self.child.try_wait() {
+                Ok(Some(_)) => return,
+                Ok(None) if Instant::now() < deadline => thread::sleep(Duration::from_millis(20)),
+                _ => break,
+            }
+        }
+        let _ = self.child.kill();
+        let _ = self.child.wait();
+    }
+}
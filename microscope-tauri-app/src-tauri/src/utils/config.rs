@@ -5,6 +5,7 @@ use crate::models::DeviceConfig;
 pub struct AppConfig {
     pub device: DeviceConfig,
     pub python_path: String,
+    pub capture_server_script: PathBuf,
     pub temp_dir: PathBuf,
     pub output_dir: PathBuf,
 }
@@ -17,6 +18,7 @@ impl AppConfig {
         Self {
             device: DeviceConfig::default(),
             python_path: Self::get_python_path(&current_dir),
+            capture_server_script: current_dir.join("../../driver/capture_server.py"),
             temp_dir: PathBuf::from("/tmp"),
             output_dir: PathBuf::from(&home_dir),
         }
@@ -1,7 +1,9 @@
+pub mod capture_server;
 pub mod config;
 pub mod error;
 pub mod python;
 
+pub use capture_server::*;
 pub use config::*;
 pub use error::*;
 pub use python::*;
\ No newline at end of file
@@ -1,3 +1,5 @@
+use std::fs;
+use std::path::Path;
 use std::process::Command;
 use crate::utils::{AppConfig, EpiphanyError, Result};
 
@@ -36,6 +38,16 @@ impl PythonBridge {
     }
 
     pub fn check_device_connection(&self) -> Result<bool> {
+        // Reading sysfs takes microseconds; spawning Python and lsusb takes far longer
+        let usb_devices = Path::new(SYSFS_USB_DEVICES);
+        if usb_devices.is_dir() {
+            return Ok(usb_device_present(
+                usb_devices,
+                self.config.device.vendor_id,
+                self.config.device.product_id,
+            ));
+        }
+
         let script = format!(
             r#"
 import subprocess
@@ -60,107 +72,24 @@ except Exception as e:
         let output = self.execute_script(&script)?;
         Ok(output.contains("CONNECTED"))
     }
+}
 
-    pub fn capture_frame(&self, temp_file: &str) -> Result<String> {
-        let script = format!(
-            r#"
-import cv2
-import base64
-import sys
-import time
-import os
-
-try:
-    cap = cv2.VideoCapture({})
-    
-    if not cap.isOpened():
-        print('ERROR:Cannot open camera')
-        sys.exit(1)
-    
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, {})
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, {})
-    cap.set(cv2.CAP_PROP_FPS, {})
-    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
-    
-    for _ in range(1):
-        cap.read()
-    
-    ret, frame = cap.read()
-    cap.release()
-    
-    if not ret:
-        print('ERROR:Cannot capture frame')
-        sys.exit(1)
-    
-    cv2.imwrite('{}', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-    
-    with open('{}', 'rb') as f:
-        img_data = f.read()
-    
-    img_base64 = base64.b64encode(img_data).decode('utf-8')
-    timestamp = int(time.time() * 1000)
-    
-    os.remove('{}')
-    
-    print('SUCCESS')
-    print(img_base64)
-    print(timestamp)
-    
-except Exception as e:
-    print('ERROR:' + str(e))
-"#,
-            self.config.device.video_device_index,
-            self.config.device.default_width,
-            self.config.device.default_height,
-            self.config.device.default_fps,
-            temp_file,
-            temp_file,
-            temp_file
-        );
-
-        self.execute_script(&script)
-    }
-
-    pub fn capture_high_quality_image(&self, temp_file: &str) -> Result<String> {
-        let script = format!(
-            r#"
-import cv2
-import base64
-import sys
+const SYSFS_USB_DEVICES: &str = "/sys/bus/usb/devices";
 
-try:
-    cap = cv2.VideoCapture({})
-    
-    if not cap.isOpened():
-        print('ERROR:Cannot open camera')
-        sys.exit(1)
-    
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, {})
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, {})
-    
-    ret, frame = cap.read()
-    cap.release()
-    
-    if not ret:
-        print('ERROR:Cannot capture frame')
-        sys.exit(1)
-    
-    cv2.imwrite('{}', frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-    
-    _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 95])
-    img_base64 = base64.b64encode(buffer).decode('utf-8')
-    
-    print('SUCCESS:' + '{{"base64":"' + img_base64 + '"}}')
-    
-except Exception as e:
-    print('ERROR:' + str(e))
-"#,
-            self.config.device.video_device_index,
-            self.config.device.default_width,
-            self.config.device.default_height,
-            temp_file
-        );
+/// Whether sysfs lists a USB device with this VID:PID. No device is opened.
+fn usb_device_present(usb_devices: &Path, vendor_id: u16, product_id: u16) -> bool {
+    let entries = match fs::read_dir(usb_devices) {
+        Ok(entries) => entries,
+        Err(_) => return false,
+    };
+    entries.flatten().any(|entry| {
+        let path = entry.path();
+        read_hex_id(&path.join("idVendor")) == Some(vendor_id)
+            && read_hex_id(&path.join("idProduct")) == Some(product_id)
+    })
+}
 
-        self.execute_script(&script)
-    }
-}
\ No newline at end of file
+fn read_hex_id(path: &Path) -> Option<u16> {
+    let text = fs::read_to_string(path).ok()?;
+    u16::from_str_radix(text.trim(), 16).ok()
+}
@@ -2,6 +2,10 @@ import { useState, useCallback, useRef, useEffect } from "react";
 import { invoke } from "@tauri-apps/api/core";
 import { StreamFrame } from "../types";
 
+// Upper bound on the request rate; the capture server adapts quality to what we can consume
+const MAX_FPS = 30;
+const MIN_FRAME_INTERVAL_MS = 1000 / MAX_FPS;
+
 interface UseStreamingProps {
   onLog: (message: string) => void;
   onFpsUpdate: (fps: number) => void;
@@ -25,6 +29,7 @@ export const useStreaming = ({
   const lastFpsUpdateRef = useRef(Date.now());
   const streamIntervalRef = useRef<number | null>(null);
   const isRequestingFrameRef = useRef(false);
+  const isStreamingRef = useRef(false);
 
   const getLiveFrame = useCallback(async () => {
     if (!isConnected || isRequestingFrameRef.current) return;
@@ -67,8 +72,17 @@ export const useStreaming = ({
       setRecordingSessionCount(prev => prev + 1);
       onLog("Live recording started");
 
-      // Update frames at 10fps (100ms interval)
-      streamIntervalRef.current = setInterval(getLiveFrame, 100);
+      // Request the next frame as soon as the previous one has arrived,
+      // at most MAX_FPS; slow machines simply receive frames less often
+      isStreamingRef.current = true;
+      const pump = async () => {
+        const started = Date.now();
+        await getLiveFrame();
+        if (!isStreamingRef.current) return;
+        const wait = Math.max(0, MIN_FRAME_INTERVAL_MS - (Date.now() - started));
+        streamIntervalRef.current = window.setTimeout(pump, wait);
+      };
+      pump();
     } catch (error) {
       onLog(`Failed to start streaming: ${error}`);
     }
@@ -77,9 +91,10 @@ export const useStreaming = ({
   const stopLiveStream = useCallback(async () => {
     if (!isLiveStreaming) return;
 
-    // Clear interval immediately
+    // Stop the frame loop immediately
+    isStreamingRef.current = false;
     if (streamIntervalRef.current) {
-      clearInterval(streamIntervalRef.current);
+      clearTimeout(streamIntervalRef.current);
       streamIntervalRef.current = null;
     }
 
@@ -108,8 +123,9 @@ export const useStreaming = ({
   // Clean up streaming on component unmount
   useEffect(() => {
     return () => {
+      isStreamingRef.current = false;
       if (streamIntervalRef.current) {
-        clearInterval(streamIntervalRef.current);
+        clearTimeout(streamIntervalRef.current);
       }
     };
   }, []);
@@ -14,6 +14,7 @@ export interface CaptureResult {
 
 export interface StreamFrame {
   success: boolean;
+  // Omitted when the scene is unchanged since the previous frame
   image_base64?: string;
   timestamp: number;
   error?: string;
@@ -3,9 +3,16 @@
 Display captured microscope images as ASCII art
 """
 
+import sys
+import os
 import cv2
 import numpy as np
 
+# Import driver module
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from driver.terminal_preview import render_ascii
+from driver.frame_stats import frame_stats
+
 def image_to_ascii(image_path, width=80, height=60):
     """Convert image to ASCII art"""
     # Read image
@@ -16,37 +23,25 @@ def image_to_ascii(image_path, width=80, height=60):
     
     print(f"Original image size: {img.shape[1]}x{img.shape[0]}")
     print(f"Image type: {img.dtype}")
-    print(f"Pixel value range: {img.min()} ~ {img.max()}")
+    value_stats = frame_stats(img, step=1, luma=False)
+    print(f"Pixel value range: {value_stats.min} ~ {value_stats.max}")
     
-    # Resize image
+    # Resize and convert to grayscale (used for statistics below)
     resized = cv2.resize(img, (width, height))
-    
-    # Convert to grayscale
     gray = cv2.cvtColor(resized, cv2.COLOR_BGR2GRAY)
     
-    # ASCII character set (from dark to bright)
-    ascii_chars = " .:-=+*#%@"
-    
     print(f"\nMicroscope image ASCII preview ({width}x{height}):")
     print("=" * width)
-    
-    # Convert each pixel to ASCII character
-    for row in gray:
-        line = ""
-        for pixel in row:
-            # Convert pixel value to ASCII character index
-            char_index = min(len(ascii_chars) - 1, int(pixel) * len(ascii_chars) // 256)
-            line += ascii_chars[char_index]
-        print(line)
-    
+    print(render_ascii(gray, width, height))
     print("=" * width)
     
     # Image statistics
     print(f"\nImage statistics:")
-    print(f"Average brightness: {gray.mean():.1f}")
-    print(f"Standard deviation: {gray.std():.1f}")
-    print(f"Minimum value: {gray.min()}")
-    print(f"Maximum value: {gray.max()}")
+    stats = frame_stats(gray, step=1)
+    print(f"Average brightness: {stats.mean:.1f}")
+    print(f"Standard deviation: {stats.std:.1f}")
+    print(f"Minimum value: {stats.min}")
+    print(f"Maximum value: {stats.max}")
 
 def main():
     print("=== Microscope Image ASCII Viewer ===")
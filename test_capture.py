@@ -10,6 +10,8 @@ import cv2
 # Import driver module
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from driver.microscope_driver import MicroscopeDriver
+from driver.terminal_preview import render_ascii
+from driver.frame_stats import frame_stats
 
 def main():
     print("=== Microscope Image Capture Test ===")
@@ -37,20 +39,12 @@ def main():
         
         # Print image information
         print(f"Image type: {frame.dtype}")
-        print(f"Image range: {frame.min()} ~ {frame.max()}")
+        stats = frame_stats(frame, step=1, luma=False)
+        print(f"Image range: {stats.min} ~ {stats.max}")
         
         # Image preview (small version as ASCII art)
-        small_frame = cv2.resize(frame, (80, 60))
-        gray_small = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
-        
         print("\nMicroscope image preview (ASCII):")
-        ascii_chars = " .:-=+*#%@"
-        for row in gray_small[::2]:  # Every 2 rows
-            line = ""
-            for pixel in row[::2]:  # Every 2 pixels
-                char_index = min(len(ascii_chars) - 1, int(pixel) * len(ascii_chars) // 256)
-                line += ascii_chars[char_index]
-            print(line)
+        print(render_ascii(frame, 40, 30))
     else:
         print("Image capture failed")
     
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Shared test helpers for tests that drive the synthetic camera
+"""
+
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.fake_camera import FakeMicroscopeDriver
+
+class FakeDriverMixin:
+    """TestCase mixin creating connected fake drivers that are released after the test"""
+
+    driver_defaults = {}  # Per-class FakeMicroscopeDriver arguments, e.g. a small frame size
+
+    def make_driver(self, **kwargs) -> FakeMicroscopeDriver:
+        """Connected non-realtime FakeMicroscopeDriver; kwargs override the defaults."""
+        kwargs = {'realtime': False, **self.driver_defaults, **kwargs}
+        driver = FakeMicroscopeDriver(**kwargs)
+        driver.connect()
+        # Some tests disconnect the driver themselves
+        self.addCleanup(lambda: driver.is_connected and driver.disconnect())
+        return driver
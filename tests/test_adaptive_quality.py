@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Adaptive Stream Quality Tests
+"""
+
+import unittest
+import cv2
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.adaptive_quality import AdaptiveQuality, StreamSettings, build_ladder
+from driver.capture_server import CaptureServer, OP_CAPTURE, OP_FRAME, RESPONSE_HEADER
+from driver.fake_camera import FakeMicroscopeDriver
+from driver.metrics import METRICS
+
+def feed(controller, fps, latency, seconds, start=0.0):
+    """Deliver frames at a steady rate; returns the time reached."""
+    now = start
+    for _ in range(int(fps * seconds)):
+        now += 1.0 / fps
+        controller.record(latency, now)
+    return now
+
+class TestLadder(unittest.TestCase):
+    """Quality ladder test class"""
+
+    def test_order(self):
+        """Quality drops first, then scale, then frame rate"""
+        ladder = build_ladder(max_quality=85, min_quality=40, quality_step=15, scales=(1.0, 0.5), max_skip=1)
+        self.assertEqual(ladder, [
+            StreamSettings(85, 1.0, 0), StreamSettings(70, 1.0, 0), StreamSettings(55, 1.0, 0),
+            StreamSettings(40, 1.0, 0), StreamSettings(40, 0.5, 0), StreamSettings(40, 0.5, 1),
+        ])
+
+class TestAdaptiveQuality(unittest.TestCase):
+    """Controller test class"""
+
+    def setUp(self):
+        """Test setup"""
+        METRICS.reset()
+        self.controller = AdaptiveQuality(target_fps=15, max_latency=0.15)
+        self.controller._last_decision = 0.0
+
+    def test_holds_when_healthy(self):
+        """A consumer keeping up stays at full quality"""
+        feed(self.controller, 20, 0.02, 5)
+        self.assertEqual(self.controller.level, 0)
+        self.assertAlmostEqual(self.controller.fps, 20, delta=1)
+
+    def test_pause_is_not_a_slowdown(self):
+        """A consumer that stops and resumes keeps its settings"""
+        now = feed(self.controller, 20, 0.02, 2)
+        feed(self.controller, 20, 0.02, 3, now + 30)
+        self.assertEqual(self.controller.level, 0)
+
+    def test_degrades_on_low_fps(self):
+        """Falling short of the target frame rate steps down"""
+        feed(self.controller, 8, 0.02, 3.5)
+        self.assertGreaterEqual(self.controller.level, 2)
+        self.assertEqual(METRICS.counter('stream_quality_downgrades'), self.controller.level)
+        self.assertEqual(METRICS.gauge('stream_jpeg_quality'), self.controller.settings.quality)
+
+    def test_degrades_on_latency(self):
+        """Latency over budget steps down even at full frame rate"""
+        feed(self.controller, 20, 0.3, 1.5)
+        self.assertEqual(self.controller.level, 1)
+
+    def test_recovers_with_headroom(self):
+        """Quality returns after several healthy decisions"""
+        now = feed(self.controller, 8, 0.02, 3.5)
+        degraded = self.controller.level
+        feed(self.controller, 20, 0.02, 10, now)
+        self.assertLess(self.controller.level, degraded)
+        self.assertGreater(self.controller.upgrades, 0)
+
+    def test_skip_counts_as_attempted(self):
+        """Deliberately skipped frames do not count as a shortfall"""
+        self.controller.level = len(self.controller.ladder) - 2  # skip 1
+        self.assertEqual(self.controller.settings.skip, 1)
+        feed(self.controller, 10, 0.02, 3)
+        self.assertLessEqual(self.controller.level, len(self.controller.ladder) - 2)
+
+        skipped = [self.controller.should_skip() for _ in range(6)]
+        self.assertEqual(skipped.count(True), 3)
+
+    def test_encode_follows_settings(self):
+        """Encoding applies scale and forwards device JPEGs at the top rung"""
+        frame = np.random.default_rng(1).integers(0, 256, (240, 320, 3), dtype=np.uint8)
+        device_jpeg = cv2.imencode('.jpg', frame)[1].reshape(1, -1)
+        self.assertEqual(self.controller.encode(device_jpeg), device_jpeg.tobytes())
+
+        self.controller.level = self.controller.ladder.index(StreamSettings(40, 0.5, 0))
+        for source in (frame, device_jpeg):
+            decoded = cv2.imdecode(np.frombuffer(self.controller.encode(source), np.uint8), cv2.IMREAD_COLOR)
+            self.assertEqual(decoded.shape, (120, 160, 3))
+
+class TestAdaptiveCaptureServer(unittest.TestCase):
+    """Capture server integration test class"""
+
+    def test_live_frames_adapt_and_captures_do_not(self):
+        """Default FRAME requests follow the controller; CAPTURE stays full size"""
+        driver = FakeMicroscopeDriver(realtime=False)
+        driver.connect()
+        try:
+            adaptive = AdaptiveQuality(ladder=build_ladder(scales=(1.0, 0.5), max_skip=0))
+            server = CaptureServer(driver, adaptive=adaptive)
+            adaptive.level = len(adaptive.ladder) - 1
+
+            header, _ = server.handle_request(OP_FRAME, 0)
+            self.assertEqual(RESPONSE_HEADER.unpack(header)[2:4], (320, 240))
+            header, _ = server.handle_request(OP_CAPTURE, 0)
+            self.assertEqual(RESPONSE_HEADER.unpack(header)[2:4], (640, 480))
+            self.assertEqual(server.get_status()['adaptive']['scale'], 0.5)
+        finally:
+            driver.disconnect()
+
+    def test_passthrough_is_forwarded(self):
+        """At full quality the device JPEG is served without decoding or re-encoding"""
+        driver = FakeMicroscopeDriver(realtime=False, passthrough=True)
+        driver.connect()
+        try:
+            server = CaptureServer(driver, adaptive=AdaptiveQuality())
+            METRICS.reset()
+            for _ in range(5):
+                header, payload = server.handle_request(OP_FRAME, 0)
+                self.assertEqual(RESPONSE_HEADER.unpack(header)[1], 0)
+                self.assertEqual(payload[:2], b'\xff\xd8')
+            stages = METRICS.snapshot()['stages']
+            self.assertNotIn('jpeg_decode', stages)
+            self.assertNotIn('jpeg_encode', stages)
+        finally:
+            driver.disconnect()
+
+if __name__ == "__main__":
+    unittest.main()
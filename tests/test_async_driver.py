@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Async Microscope Driver Tests
+"""
+
+import unittest
+import asyncio
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.async_driver import AsyncMicroscopeDriver
+from driver.fake_camera import FakeMicroscopeDriver
+
+class TestAsyncMicroscopeDriver(unittest.IsolatedAsyncioTestCase):
+    """Async driver test class"""
+
+    async def test_context_manager(self):
+        """async with connects and disconnects"""
+        driver = AsyncMicroscopeDriver(FakeMicroscopeDriver(realtime=False))
+        async with driver:
+            self.assertTrue(driver.is_connected)
+            info = await driver.get_device_info()
+            self.assertEqual(info['product'], "Fake Microscope")
+        self.assertFalse(driver.is_connected)
+
+    async def test_connect_failure_raises(self):
+        """A failed connect raises inside async with"""
+        driver = AsyncMicroscopeDriver(FakeMicroscopeDriver())
+        driver.driver.connect = lambda: False
+        with self.assertRaises(ConnectionError):
+            async with driver:
+                pass
+        await driver.close()
+
+    async def test_settings(self):
+        """Awaitable setters apply and cache values"""
+        async with AsyncMicroscopeDriver(FakeMicroscopeDriver(realtime=False)) as driver:
+            self.assertTrue(await driver.led_brightness.set(200))
+            self.assertEqual(driver.led_brightness.get(), 200)
+            self.assertFalse(await driver.set_led_brightness(300))
+            self.assertEqual(driver.led_brightness.get(), 200)
+
+            self.assertTrue(await driver.frame_size.set(320, 240))
+            self.assertEqual(driver.frame_size.get(), (320, 240))
+            frame = await driver.capture_frame()
+            self.assertEqual(frame.shape, (240, 320, 3))
+
+    async def test_frames_block_policy(self):
+        """The block policy delivers every captured frame"""
+        async with AsyncMicroscopeDriver(FakeMicroscopeDriver(realtime=False)) as driver:
+            count = 0
+            async for frame in driver.frames(policy='block'):
+                count += 1
+                if count == 5:
+                    break
+            self.assertEqual(driver.frames_dropped, 0)
+
+    async def test_frames_drop_policy_with_slow_consumer(self):
+        """The drop policy discards frames a slow consumer missed"""
+        fake = FakeMicroscopeDriver(fps=200, threaded=True)
+        async with AsyncMicroscopeDriver(fake) as driver:
+            count = 0
+            async for frame in driver.frames():
+                await asyncio.sleep(0.05)
+                count += 1
+                if count == 3:
+                    break
+            self.assertGreater(driver.frames_dropped, 0)
+
+    async def test_frames_rate_limit(self):
+        """fps caps the delivery rate"""
+        async with AsyncMicroscopeDriver(FakeMicroscopeDriver(realtime=False)) as driver:
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            count = 0
+            async for frame in driver.frames(fps=50, policy='block'):
+                count += 1
+                if count == 6:
+                    break
+            self.assertGreaterEqual(loop.time() - start, 0.09)
+
+    async def test_invalid_policy(self):
+        """Unknown frame policies are rejected"""
+        driver = AsyncMicroscopeDriver(FakeMicroscopeDriver())
+        with self.assertRaises(ValueError):
+            async for frame in driver.frames(policy='newest'):
+                pass
+        await driver.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Capture Backend Tests
+"""
+
+import unittest
+import tempfile
+import time
+import cv2
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.microscope_driver import MicroscopeDriver
+from driver.backends import ReplayBackend, ReplayCapture, SyntheticCapture
+
+class TestSyntheticCapture(unittest.TestCase):
+    """Synthetic sensor test class"""
+
+    def test_noise_free_frames_are_deterministic(self):
+        """With noise disabled two captures produce identical sequences"""
+        a = SyntheticCapture(64, 48, realtime=False, noise=0)
+        b = SyntheticCapture(64, 48, realtime=False, noise=0)
+        for _ in range(3):
+            self.assertTrue(np.array_equal(a.read()[1], b.read()[1]))
+
+    def test_realtime_pacing(self):
+        """Realtime captures are paced to the configured rate"""
+        cap = SyntheticCapture(32, 24, fps=100)
+        start = time.monotonic()
+        for _ in range(11):
+            cap.read()
+        self.assertGreater(time.monotonic() - start, 0.09)
+
+class TestReplay(unittest.TestCase):
+    """Replay backend test class"""
+
+    def setUp(self):
+        """Test setup: three solid frames as images and as a video"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.images = os.path.join(self.tmpdir.name, 'images')
+        os.makedirs(self.images)
+        self.video = os.path.join(self.tmpdir.name, 'clip.avi')
+        writer = cv2.VideoWriter(self.video, cv2.VideoWriter_fourcc(*'MJPG'), 20, (64, 48))
+        for i, value in enumerate((40, 120, 200)):
+            frame = np.full((48, 64, 3), value, dtype=np.uint8)
+            cv2.imwrite(os.path.join(self.images, f"frame_{i}.png"), frame)
+            writer.write(frame)
+        writer.release()
+
+    def read_values(self, cap, count):
+        return [int(round(cap.read()[1].mean())) if cap.isOpened() else None for _ in range(count)]
+
+    def test_image_directory_loops(self):
+        """Images replay in name order and loop"""
+        cap = ReplayCapture(self.images, realtime=False)
+        self.assertEqual((cap.width, cap.height), (64, 48))
+        self.assertEqual(self.read_values(cap, 4), [40, 120, 200, 40])
+
+    def test_video_without_loop_ends(self):
+        """A non-looping replay reports failure at the end"""
+        cap = ReplayCapture(self.video, realtime=False, loop=False)
+        self.assertEqual(cap.fps, 20)
+        values = [cap.read()[1].mean() for _ in range(3)]
+        self.assertAlmostEqual(values[1], 120, delta=3)
+        self.assertEqual(cap.read(), (False, None))
+
+    def test_preload_reuses_caller_buffer(self):
+        """Preloaded replay copies into the caller's buffer"""
+        cap = ReplayCapture(self.video, realtime=False, preload=True)
+        self.assertEqual(cap.frame_count, 3)
+        buffer = np.empty((48, 64, 3), dtype=np.uint8)
+        ok, frame = cap.read(buffer)
+        self.assertTrue(ok)
+        self.assertIs(frame, buffer)
+
+    def test_driver_on_replay(self):
+        """The unchanged driver runs threaded and passthrough on a replay"""
+        driver = MicroscopeDriver(backend=ReplayBackend(self.images, realtime=False),
+                                  threaded=True, passthrough=True)
+        self.assertTrue(driver.connect())
+        self.addCleanup(driver.disconnect)
+        self.assertEqual(driver.get_device_info()['product'], "Replay: images")
+        self.assertEqual(driver.wait_for_next(0).frame.shape, (48, 64, 3))
+        self.assertEqual(driver.capture_jpeg().size, (64, 48))
+
+if __name__ == "__main__":
+    unittest.main()
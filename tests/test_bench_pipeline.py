@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Pipeline Benchmark Tests
+"""
+
+import unittest
+import sys
+import os
+
+# Import benchmark module
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tools'))
+from bench_pipeline import compare, measure, run_suite
+
+class TestPipelineBenchmark(unittest.TestCase):
+    """Pipeline benchmark test class"""
+
+    def test_measure_reports_metrics(self):
+        """measure() reports latency percentiles, rate and allocation"""
+        metrics = measure(lambda: bytearray(64 * 1024), iterations=20, warmup=1, alloc_iterations=3)
+        self.assertEqual(sorted(metrics), ['alloc_kb', 'fps', 'p50_ms', 'p99_ms'])
+        self.assertLessEqual(metrics['p50_ms'], metrics['p99_ms'])
+        self.assertGreaterEqual(metrics['alloc_kb'], 64)
+
+    def test_suite_covers_stages(self):
+        """The suite measures every stage at the requested resolution"""
+        report = run_suite([(64, 48)], iterations=3)
+        stages = report['results']['64x48']
+        for stage in ('capture', 'resize', 'bgr2rgb', 'jpeg80', 'jpeg95', 'base64', 'disk_write', 'live_frame'):
+            self.assertIn(stage, stages)
+
+    def test_compare_flags_regressions(self):
+        """Only slowdowns beyond the tolerance are reported"""
+        baseline = {'results': {'640x480': {'capture': {'p50_ms': 1.0}, 'jpeg80': {'p50_ms': 1.0}}}}
+        current = {'results': {'640x480': {'capture': {'p50_ms': 1.1}, 'jpeg80': {'p50_ms': 2.0},
+                                           'base64': {'p50_ms': 5.0}}}}
+        baseline['results']['640x480']['bgr2rgb'] = {'p50_ms': 0.01}
+        current['results']['640x480']['bgr2rgb'] = {'p50_ms': 0.03}
+        regressions = compare(current, baseline, tolerance=0.25)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('jpeg80', regressions[0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Burst Capture Tests
+"""
+
+import unittest
+import tempfile
+import cv2
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.burst import burst, grab_burst, make_executor
+from tests.fake_driver import FakeDriverMixin
+
+class TestBurst(FakeDriverMixin, unittest.TestCase):
+    """Burst capture test class"""
+
+    driver_defaults = {'width': 160, 'height': 120}
+
+    def setUp(self):
+        """Test setup"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_grab_consecutive_frames(self):
+        """Threaded bursts take every grabbed frame in order"""
+        driver = self.make_driver(threaded=True, fps=200)
+        shm, frames, timestamps = grab_burst(driver, 8)
+        try:
+            self.assertEqual(frames.shape, (8, 120, 160, 3))
+            self.assertTrue((timestamps[1:] > timestamps[:-1]).all())
+            self.assertFalse((frames[0] == frames[1]).all())
+        finally:
+            del frames
+            shm.close()
+            shm.unlink()
+
+    def test_burst_writes_files_in_order(self):
+        """wait() returns readable images in capture order"""
+        driver = self.make_driver()
+        job = driver.burst(5, self.tmpdir.name, format='png', workers=2)
+        paths = job.wait()
+        self.assertEqual(len(paths), 5)
+        self.assertEqual(paths, sorted(paths))
+        self.assertEqual(cv2.imread(paths[0]).shape, (120, 160, 3))
+
+    def test_progress_and_shared_executor(self):
+        """progress() reports every frame, and a pool can be reused across bursts"""
+        driver = self.make_driver(passthrough=True)
+        executor = make_executor(2)
+        self.addCleanup(executor.shutdown)
+        for _ in range(2):
+            with burst(driver, 4, self.tmpdir.name, quality=80, executor=executor, prefix='shared') as job:
+                reported = [done for done, total, _ in job.progress()]
+            self.assertEqual(reported, [1, 2, 3, 4])
+
+    def test_invalid_format(self):
+        """Unknown formats are rejected before capturing"""
+        driver = self.make_driver()
+        with self.assertRaises(ValueError):
+            burst(driver, 2, self.tmpdir.name, format='gif')
+
+if __name__ == "__main__":
+    unittest.main()
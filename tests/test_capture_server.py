@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Capture Server Tests
+"""
+
+import unittest
+import socket
+import threading
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.fake_camera import FakeMicroscopeDriver
+from driver.capture_server import CaptureServer, CaptureClient, OP_STATUS, STATUS_ERROR
+
+class TestCaptureServer(unittest.TestCase):
+    """Capture server protocol test class"""
+
+    def setUp(self):
+        """Start a server on one end of a socket pair"""
+        self.driver = FakeMicroscopeDriver(realtime=False)
+        self.driver.connect()
+        self.server = CaptureServer(self.driver)
+
+        server_sock, client_sock = socket.socketpair()
+        self.server_sock = server_sock
+        self.thread = threading.Thread(
+            target=self.server.serve_stream,
+            args=(server_sock.makefile('rb'), server_sock.makefile('wb')),
+            daemon=True
+        )
+        self.thread.start()
+        self.client = CaptureClient(client_sock.makefile('rb'), client_sock.makefile('wb'), sock=client_sock)
+
+    def tearDown(self):
+        """Test cleanup"""
+        self.client.close()
+        self.thread.join(timeout=5)
+        self.server_sock.close()
+        self.driver.disconnect()
+
+    def test_live_frame_is_jpeg(self):
+        """FRAME returns JPEG bytes with frame geometry"""
+        response = self.client.get_frame()
+        self.assertIsNotNone(response)
+        self.assertEqual(response.payload[:2], b'\xff\xd8')
+        self.assertEqual((response.width, response.height, response.channels), (640, 480, 3))
+        self.assertGreater(response.timestamp, 0)
+
+    def test_capture_quality(self):
+        """Higher quality captures produce larger JPEGs"""
+        low = self.client.capture(quality=20)
+        high = self.client.capture(quality=95)
+        self.assertGreater(len(high.payload), len(low.payload))
+
+    def test_raw_frame(self):
+        """RAW returns an unencoded BGR frame"""
+        frame = self.client.get_raw_frame()
+        self.assertEqual(frame.shape, (480, 640, 3))
+
+    def test_status(self):
+        """STATUS reports device and counters"""
+        self.client.get_frame()
+        status = self.client.get_status()
+        self.assertTrue(status['connected'])
+        self.assertEqual(status['frames_served'], 1)
+        self.assertEqual(status['device']['product'], "Fake Microscope")
+
+    def test_unknown_opcode(self):
+        """Unknown opcodes return an error response"""
+        response = self.client.request(0x42)
+        self.assertEqual(response.status, STATUS_ERROR)
+        self.assertIn(b"Unknown opcode", response.payload)
+
+    def test_disconnected_driver(self):
+        """Frames fail cleanly when the device is gone"""
+        self.driver.disconnect()
+        self.assertIsNone(self.client.get_frame())
+        self.assertFalse(self.client.get_status()['connected'])
+
+class TestCaptureServerProcess(unittest.TestCase):
+    """Capture server subprocess test class"""
+
+    def test_spawn_fake_server(self):
+        """A spawned fake server answers over stdin/stdout"""
+        with CaptureClient.spawn(fake=True) as client:
+            self.assertTrue(client.get_status()['connected'])
+            self.assertEqual(client.request(OP_STATUS).opcode, OP_STATUS)
+            self.assertIsNotNone(client.get_frame())
+        self.assertEqual(client.process.returncode, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Change Detection Tests
+"""
+
+import unittest
+import socket
+import tempfile
+import threading
+import cv2
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.change_detect import ChangeDetector
+from driver.backends import ReplayBackend
+from driver.microscope_driver import MicroscopeDriver
+from driver.fake_camera import FakeMicroscopeDriver
+from driver.capture_server import CaptureServer, CaptureClient, OP_FRAME_IF_CHANGED, STATUS_OK, STATUS_UNCHANGED
+from driver.stream_server import MjpegStreamServer
+from driver.metrics import METRICS
+
+def scene(rng, noise: int = 12, circle=None) -> np.ndarray:
+    """Textured slide with sensor noise and an optional dark circle (x, y, radius)."""
+    base = np.zeros((480, 640, 3), dtype=np.uint8)
+    base[:] = (150, 120, 170)
+    cv2.rectangle(base, (100, 100), (300, 250), (60, 80, 90), -1)
+    if circle is not None:
+        cv2.circle(base, circle[:2], circle[2], (20, 20, 20), -1)
+    frame = base.astype(np.int16) + rng.integers(-noise, noise + 1, base.shape, dtype=np.int16)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+class TestChangeDetector(unittest.TestCase):
+    """Change detector test class"""
+
+    def setUp(self):
+        """Test setup"""
+        METRICS.reset()
+        self.rng = np.random.default_rng(7)
+        self.detector = ChangeDetector()
+
+    def test_first_frame_is_changed(self):
+        """Without a reference every frame is sent"""
+        self.assertTrue(self.detector.check(scene(self.rng)))
+
+    def test_noise_is_unchanged(self):
+        """Sensor noise on a still slide is not a change"""
+        self.detector.check(scene(self.rng))
+        changed = [self.detector.check(scene(self.rng)) for _ in range(20)]
+        self.assertEqual(changed.count(True), 0)
+        self.assertEqual(self.detector.frames_unchanged, 20)
+        self.assertEqual(METRICS.counter('frames_unchanged'), 20)
+
+    def test_object_is_changed(self):
+        """A small object entering the field is detected"""
+        self.detector.check(scene(self.rng))
+        self.assertTrue(self.detector.check(scene(self.rng, circle=(500, 380, 30))))
+
+    def test_jpeg_input(self):
+        """Device JPEGs are compared without a full decode"""
+        encode = lambda frame: cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].reshape(1, -1)
+        self.detector.check(encode(scene(self.rng)))
+        self.assertFalse(self.detector.check(encode(scene(self.rng))))
+        self.assertTrue(self.detector.check(encode(scene(self.rng, circle=(500, 380, 30)))))
+
+    def test_slow_drift_accumulates(self):
+        """Steps below the threshold add up against the last sent frame"""
+        frame = cv2.GaussianBlur(scene(self.rng, noise=0), (0, 0), 8)  # Soft edges, as out of focus
+        self.detector.check(frame)
+        changed = []
+        for shift in range(1, 30):
+            changed.append(self.detector.check(np.roll(frame, shift, axis=1)))
+        self.assertFalse(changed[0])
+        self.assertIn(True, changed)
+
+    def test_refresh(self):
+        """A still scene is re-sent after the refresh interval"""
+        detector = ChangeDetector(refresh=1.0)
+        frame = scene(self.rng)
+        self.assertTrue(detector.check(frame, now=0.0))
+        self.assertFalse(detector.check(frame, now=0.5))
+        self.assertTrue(detector.check(frame, now=1.0))
+        self.assertFalse(detector.check(frame, now=1.5))
+
+class TestFrameIfChanged(unittest.TestCase):
+    """FRAME_IF_CHANGED protocol test class"""
+
+    def setUp(self):
+        """Serve a still slide on one end of a socket pair"""
+        self.tmp = tempfile.TemporaryDirectory()
+        cv2.imwrite(os.path.join(self.tmp.name, 'slide.png'), scene(np.random.default_rng(3)))
+        self.driver = MicroscopeDriver(backend=ReplayBackend(self.tmp.name, realtime=False))
+        self.assertTrue(self.driver.connect())
+        self.server = CaptureServer(self.driver)
+
+        server_sock, client_sock = socket.socketpair()
+        self.server_sock = server_sock
+        self.thread = threading.Thread(
+            target=self.server.serve_stream,
+            args=(server_sock.makefile('rb'), server_sock.makefile('wb')),
+            daemon=True
+        )
+        self.thread.start()
+        self.client = CaptureClient(client_sock.makefile('rb'), client_sock.makefile('wb'), sock=client_sock)
+
+    def tearDown(self):
+        """Test cleanup"""
+        self.client.close()
+        self.thread.join(timeout=5)
+        self.server_sock.close()
+        self.driver.disconnect()
+        self.tmp.cleanup()
+
+    def test_still_scene(self):
+        """Only the first request of a connection carries a frame"""
+        first = self.client.get_frame_if_changed()
+        self.assertEqual(first.status, STATUS_OK)
+        self.assertEqual(first.payload[:2], b'\xff\xd8')
+        self.assertEqual((first.width, first.height), (640, 480))
+
+        second = self.client.get_frame_if_changed()
+        self.assertEqual(second.status, STATUS_UNCHANGED)
+        self.assertEqual(second.payload, b'')
+
+        # Plain FRAME requests are unaffected
+        self.assertEqual(self.client.get_frame().status, STATUS_OK)
+
+    def test_stream_skips_encoding(self):
+        """The MJPEG producer encodes a still scene once"""
+        server = MjpegStreamServer(self.driver, change_detector=ChangeDetector())
+        seq, first, _ = server._next_jpeg(0)
+        self.assertEqual(first[:2], b'\xff\xd8')
+        seq, second, _ = server._next_jpeg(seq)
+        self.assertEqual(second, b'')
+        server._executor.shutdown()
+
+class TestFrameIfChangedMoving(unittest.TestCase):
+    """FRAME_IF_CHANGED on a moving scene"""
+
+    def test_drifting_scene_is_sent(self):
+        """The drifting synthetic sensor keeps producing changed frames"""
+        driver = FakeMicroscopeDriver(realtime=False)
+        driver.connect()
+        try:
+            server = CaptureServer(driver)
+            detector = ChangeDetector()
+            statuses = [server.handle_request(OP_FRAME_IF_CHANGED, 0, detector)[0][1] for _ in range(40)]
+            self.assertIn(STATUS_OK, statuses[1:])
+        finally:
+            driver.disconnect()
+
+if __name__ == "__main__":
+    unittest.main()
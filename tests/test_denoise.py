@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Temporal Denoiser Tests
+"""
+
+import unittest
+import tracemalloc
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.denoise import TemporalDenoiser
+from driver.fake_camera import FakeMicroscopeDriver
+
+class TestTemporalDenoiser(unittest.TestCase):
+    """Denoiser test class"""
+
+    def setUp(self):
+        """Test setup"""
+        self.rng = np.random.default_rng(0)
+        self.clean = np.full((60, 80, 3), 120, dtype=np.uint8)
+
+    def noisy(self, base=None):
+        base = self.clean if base is None else base
+        noise = self.rng.normal(0, 10, base.shape)
+        return np.clip(base + noise, 0, 255).astype(np.uint8)
+
+    def test_mean_reduces_noise(self):
+        """Averaging 16 frames cuts noise by about 4x"""
+        denoiser = TemporalDenoiser('mean')
+        for _ in range(16):
+            out = denoiser.update(self.noisy())
+        self.assertEqual(denoiser.count, 16)
+        self.assertLess(np.abs(out.astype(int) - self.clean).mean(), 3.5)
+
+    def test_motion_resets_average(self):
+        """A scene change restarts the average instead of ghosting"""
+        denoiser = TemporalDenoiser('ema', motion_threshold=20)
+        for _ in range(5):
+            denoiser.update(self.noisy())
+        moved = self.clean.copy()
+        moved[:, :40] = 220
+        out = denoiser.update(self.noisy(moved))
+        self.assertEqual(denoiser.resets, 1)
+        self.assertEqual(denoiser.count, 1)
+        self.assertGreater(out[:, :40].mean(), 200)
+
+    def test_mean_window(self):
+        """max_frames bounds the weight of old frames"""
+        denoiser = TemporalDenoiser('mean', max_frames=4, motion_threshold=None)
+        for _ in range(10):
+            denoiser.update(np.zeros((4, 4), dtype=np.uint8))
+        for _ in range(12):
+            out = denoiser.update(np.full((4, 4), 100, dtype=np.uint8))
+        self.assertGreater(out.min(), 95)
+
+    def test_no_allocation_per_frame(self):
+        """Updates after the first reuse preallocated buffers"""
+        denoiser = TemporalDenoiser()
+        frame = self.noisy()
+        first = denoiser.update(frame)
+        tracemalloc.start()
+        try:
+            for _ in range(20):
+                out = denoiser.update(frame)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertIs(out, first)
+        self.assertLess(peak, 4096)
+
+    def test_capture_averaged(self):
+        """The driver returns the mean of consecutive frames"""
+        driver = FakeMicroscopeDriver(width=160, height=120, realtime=False)
+        driver.connect()
+        self.addCleanup(driver.disconnect)
+        frame = driver.capture_averaged(4)
+        self.assertEqual(frame.shape, (120, 160, 3))
+
+if __name__ == "__main__":
+    unittest.main()
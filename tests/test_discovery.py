@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Device Discovery Tests
+"""
+
+import unittest
+import tempfile
+import shutil
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.discovery import DeviceDiscovery, USB_DEVICES, VIDEO_CLASS
+from driver.backends import UsbBackend, FakeUSBDevice, DEFAULT_VIDEO_INDEX
+
+def add_usb_device(root, name, vendor_id, product_id, busnum, devnum, manufacturer='', product=''):
+    """Create a USB device directory like the kernel does."""
+    path = os.path.join(root, USB_DEVICES, name)
+    os.makedirs(os.path.join(path, f"{name}:1.0"))
+    attributes = {'idVendor': f"{vendor_id:04x}", 'idProduct': f"{product_id:04x}",
+                  'busnum': str(busnum), 'devnum': str(devnum)}
+    if manufacturer:
+        attributes['manufacturer'] = manufacturer
+    if product:
+        attributes['product'] = product
+    for attribute, value in attributes.items():
+        with open(os.path.join(path, attribute), 'w') as f:
+            f.write(value + "\n")
+
+def add_video_node(root, number, usb_name, index=0):
+    """Create a video4linux node whose device link points at a USB interface."""
+    node = os.path.join(root, VIDEO_CLASS, f"video{number}")
+    os.makedirs(node)
+    os.symlink(os.path.join(root, USB_DEVICES, usb_name, f"{usb_name}:1.0"), os.path.join(node, 'device'))
+    with open(os.path.join(node, 'index'), 'w') as f:
+        f.write(f"{index}\n")
+
+def remove_usb_device(root, name, video_numbers):
+    shutil.rmtree(os.path.join(root, USB_DEVICES, name))
+    for number in video_numbers:
+        shutil.rmtree(os.path.join(root, VIDEO_CLASS, f"video{number}"))
+
+class TestDeviceDiscovery(unittest.TestCase):
+    """Discovery test class"""
+
+    def setUp(self):
+        """Build a fake sysfs tree: a hub, a webcam and the microscope"""
+        self.root = tempfile.mkdtemp()
+        add_usb_device(self.root, 'usb1', 0x1d6b, 0x0002, 1, 1, 'Linux', 'xHCI Host Controller')
+        add_usb_device(self.root, '1-2', 0x046d, 0x0825, 1, 3, 'Logitech', 'Webcam C270')
+        add_video_node(self.root, 0, '1-2')
+        add_video_node(self.root, 1, '1-2', index=1)
+        add_usb_device(self.root, '1-4.2', 0x05e3, 0xf12a, 1, 7, 'Genesys Logic', 'Digital Microscope')
+        # Metadata node numbered below the capture node
+        add_video_node(self.root, 4, '1-4.2', index=1)
+        add_video_node(self.root, 5, '1-4.2', index=0)
+        self.discovery = DeviceDiscovery(self.root)
+
+    def tearDown(self):
+        """Test cleanup"""
+        shutil.rmtree(self.root)
+
+    def test_scan(self):
+        """Devices are read with their strings, ports and video nodes"""
+        devices = {device.device_id: device for device in self.discovery.scan()}
+        self.assertEqual(sorted(devices), ['1-2', '1-4.2', 'usb1'])
+
+        microscope = devices['1-4.2']
+        self.assertEqual((microscope.vendor_id, microscope.product_id), (0x05e3, 0xf12a))
+        self.assertEqual((microscope.bus, microscope.address), (1, 7))
+        self.assertEqual(microscope.port_numbers, (4, 2))
+        self.assertEqual(microscope.product, 'Digital Microscope')
+        self.assertEqual(microscope.video_index, 5)
+        self.assertEqual(microscope.video_nodes, (5, 4))
+        self.assertIsNone(devices['usb1'].video_index)
+
+    def test_find(self):
+        """Lookups by VID:PID and bus/address"""
+        self.assertEqual(self.discovery.find_video_index(0x05e3, 0xf12a), 5)
+        self.assertEqual(self.discovery.find_video_index(0x046d, 0x0825, bus=1, address=3), 0)
+        self.assertIsNone(self.discovery.find_video_index(0x05e3, 0xf12a, address=3))
+        self.assertTrue(self.discovery.is_present(0x05e3, 0xf12a))
+        self.assertFalse(self.discovery.is_present(0x1234, 0x5678))
+
+    def test_cache(self):
+        """Unchanged sysfs directories reuse the previous scan"""
+        first = self.discovery.scan()
+        key = self.discovery._key
+        self.assertEqual(self.discovery.scan(), first)
+        self.assertIs(self.discovery._key, key)
+
+    def test_reenumeration(self):
+        """A device that reappears elsewhere is found under its new node"""
+        self.assertEqual(self.discovery.find_video_index(0x05e3, 0xf12a), 5)
+
+        remove_usb_device(self.root, '1-4.2', (4, 5))
+        self.assertFalse(self.discovery.is_present(0x05e3, 0xf12a))
+
+        add_usb_device(self.root, '2-1', 0x05e3, 0xf12a, 2, 2, 'Genesys Logic', 'Digital Microscope')
+        add_video_node(self.root, 6, '2-1')
+        self.assertEqual(self.discovery.find_video_index(0x05e3, 0xf12a), 6)
+        self.assertEqual(self.discovery.find(0x05e3, 0xf12a)[0].bus, 2)
+
+    def test_missing_sysfs(self):
+        """Systems without sysfs report nothing"""
+        discovery = DeviceDiscovery(os.path.join(self.root, 'missing'))
+        self.assertFalse(discovery.available)
+        self.assertEqual(discovery.scan(), [])
+
+    def test_usb_backend(self):
+        """The USB backend resolves nodes and strings from sysfs"""
+        backend = UsbBackend(self.discovery)
+        self.assertIsNone(backend.find_device(0x1234, 0x5678))
+
+        device = FakeUSBDevice(0x05e3, 0xf12a, manufacturer="Other", product="Other", bus=1, address=7)
+        self.assertEqual(backend.find_video_index(device), 5)
+        self.assertEqual(backend.device_strings(device), ('Genesys Logic', 'Digital Microscope'))
+
+        unknown = FakeUSBDevice(0x05e3, 0xf12a, bus=3, address=9)
+        self.assertEqual(backend.find_video_index(unknown), DEFAULT_VIDEO_INDEX)
+        self.assertEqual(backend.device_strings(unknown), ('Epiphany', 'Fake Microscope'))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,6 +10,7 @@ import os
 # Import driver module
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from driver.microscope_driver import MicroscopeDriver
+from driver.backends import SimulatedBackend, FakeUSBDevice
 
 class TestMicroscopeDriver(unittest.TestCase):
     """Microscope driver test class"""
@@ -53,6 +54,47 @@ class TestMicroscopeDriver(unittest.TestCase):
         frame = self.driver.capture_frame()
         self.assertIsNone(frame)
 
+class TestConnectedDriver(unittest.TestCase):
+    """Connected driver test class (simulated backend)"""
+    
+    def setUp(self):
+        """Test setup"""
+        self.device = FakeUSBDevice(manufacturer="Test Vendor", product="Test Scope", bus=3, address=7)
+        self.driver = MicroscopeDriver(backend=SimulatedBackend(320, 240, realtime=False, device=self.device))
+        self.assertTrue(self.driver.connect())
+    
+    def tearDown(self):
+        """Test cleanup"""
+        self.driver.disconnect()
+    
+    def test_device_info(self):
+        """Device strings are read through pyusb string descriptors"""
+        info = self.driver.get_device_info()
+        self.assertEqual(info['manufacturer'], "Test Vendor")
+        self.assertEqual(info['product'], "Test Scope")
+        self.assertEqual((info['bus'], info['address']), (3, 7))
+    
+    def test_control_command(self):
+        """Vendor control transfers reach the device"""
+        self.assertTrue(self.driver.send_control_command(0x01, 0, 0, b'\x80'))
+        self.assertEqual(self.device.registers[0x01], b'\x80')
+        self.assertTrue(self.driver.send_control_command(0x01))
+        self.assertEqual(self.device.transfers[-1][:2], (0xC0, 0x01))
+    
+    def test_capture_and_brightness(self):
+        """Frames come from the configured mode and brightness is applied"""
+        self.assertEqual(self.driver.get_frame_size(), (320, 240))
+        self.assertTrue(self.driver.set_led_brightness(0))
+        frame = self.driver.capture_frame()
+        self.assertEqual(frame.shape, (240, 320, 3))
+        self.assertEqual(frame.max(), 0)
+    
+    def test_disconnect_releases_device(self):
+        """Disconnect disposes of USB resources"""
+        self.driver.disconnect()
+        self.assertTrue(self.device.disposed)
+        self.assertFalse(self.driver.is_connected)
+
 class TestUSBScanner(unittest.TestCase):
     """USB scanner test class"""
     
@@ -75,6 +117,7 @@ def run_tests():
     
     # Add tests
     suite.addTests(loader.loadTestsFromTestCase(TestMicroscopeDriver))
+    suite.addTests(loader.loadTestsFromTestCase(TestConnectedDriver))
     suite.addTests(loader.loadTestsFromTestCase(TestUSBScanner))
     
     # Run tests
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Focus Meter Tests
+"""
+
+import unittest
+import time
+import cv2
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.fake_camera import FakeMicroscopeDriver
+from driver.focus_meter import FocusMeter, focus_score
+
+class TestFocusMeter(unittest.TestCase):
+    """Focus meter test class"""
+
+    def setUp(self):
+        """Test setup"""
+        rng = np.random.default_rng(2)
+        self.sharp = cv2.resize(rng.integers(0, 255, (120, 160, 3), dtype=np.uint8), (640, 480),
+                                interpolation=cv2.INTER_NEAREST)
+        self.blurred = cv2.GaussianBlur(self.sharp, (0, 0), 3)
+
+    def test_scores_rank_sharpness(self):
+        """Both metrics score the sharp frame higher"""
+        for method in ('laplacian', 'tenengrad'):
+            self.assertGreater(focus_score(self.sharp, method), 2 * focus_score(self.blurred, method))
+
+    def test_roi_limits_scored_region(self):
+        """Only the region of interest contributes"""
+        mixed = self.blurred.copy()
+        mixed[:, :160] = self.sharp[:, :160]
+        left = focus_score(mixed, roi=(0.0, 0.0, 0.25, 1.0))
+        right = focus_score(mixed, roi=(0.75, 0.0, 0.25, 1.0))
+        self.assertGreater(left, 2 * right)
+
+    def test_peak_hold(self):
+        """The peak is held until reset"""
+        meter = FocusMeter()
+        sharp = meter.update(self.sharp)
+        blurred = meter.update(self.blurred)
+        self.assertEqual(blurred.peak, sharp.score)
+        self.assertLess(blurred.relative, 0.5)
+        meter.reset_peak()
+        self.assertEqual(meter.update(self.blurred).peak, blurred.score)
+
+    def test_status_line(self):
+        """The readout includes score, peak and a bar"""
+        meter = FocusMeter()
+        self.assertEqual(meter.status(), "focus --")
+        self.assertIn("peak", meter.status(self.sharp))
+
+    def test_fast_enough_for_full_rate(self):
+        """Scoring a VGA frame takes a small fraction of a frame period"""
+        meter = FocusMeter()
+        start = time.perf_counter()
+        for _ in range(30):
+            meter.update(self.sharp)
+        self.assertLess((time.perf_counter() - start) / 30, 0.005)
+
+    def test_service_scores_grabbed_frames(self):
+        """The background service publishes readings tagged with frame seq"""
+        driver = FakeMicroscopeDriver(width=320, height=240, fps=60, threaded=True)
+        driver.connect()
+        self.addCleanup(driver.disconnect)
+        meter = FocusMeter()
+        self.assertTrue(meter.start(driver))
+        self.addCleanup(meter.stop)
+        deadline = time.monotonic() + 2
+        while (meter.latest is None or meter.latest.seq < 3) and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertGreaterEqual(meter.latest.seq, 3)
+        self.assertGreater(meter.latest.score, 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Focus Stacking Tests
+"""
+
+import unittest
+import time
+import cv2
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.focus_stack import focus_stack, align_frames, sharpness_map
+
+def make_series(count=3, height=240, width=320):
+    """Sharp texture plus frames that are each in focus in one vertical band"""
+    rng = np.random.default_rng(1)
+    sharp = cv2.resize(rng.integers(0, 255, (height // 4, width // 4, 3), dtype=np.uint8),
+                       (width, height), interpolation=cv2.INTER_NEAREST)
+    blurred = cv2.GaussianBlur(sharp, (0, 0), 4)
+    band = width // count
+    frames = []
+    for i in range(count):
+        frame = blurred.copy()
+        frame[:, i * band:(i + 1) * band] = sharp[:, i * band:(i + 1) * band]
+        frames.append(frame)
+    return sharp, frames, band
+
+class TestFocusStack(unittest.TestCase):
+    """Focus stacking test class"""
+
+    def test_sharpness_prefers_focused_texture(self):
+        """Laplacian energy is higher where the frame is in focus"""
+        sharp, frames, band = make_series()
+        score = sharpness_map(cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY))
+        self.assertGreater(score[:, :band - 5].mean(), 10 * score[:, band + 5:].mean())
+
+    def test_fused_image_is_sharp_everywhere(self):
+        """Each band is taken from the frame that has it in focus"""
+        sharp, frames, band = make_series()
+        result = focus_stack(frames, align=False, workers=2)
+        self.assertEqual(result.image.shape, sharp.shape)
+        for i in range(3):
+            self.assertEqual(np.bincount(result.depth[:, i * band + 8:(i + 1) * band - 8].ravel()).argmax(), i)
+        error = np.abs(result.image.astype(int) - sharp).mean()
+        self.assertLess(error, 0.5 * min(np.abs(frame.astype(int) - sharp).mean() for frame in frames))
+
+    def test_strips_match_single_strip(self):
+        """Splitting into strips does not leave seams"""
+        sharp, frames, band = make_series()
+        whole = focus_stack(frames, align=False, strips=1).image
+        split = focus_stack(frames, align=False, strips=4).image
+        self.assertLessEqual(np.abs(whole.astype(int) - split).max(), 2)
+
+    def test_alignment_recovers_shift(self):
+        """Phase correlation finds and removes a translation"""
+        sharp, frames, band = make_series(count=2)
+        shifted = cv2.warpAffine(frames[1], np.float32([[1, 0, 6], [0, 1, -4]]), (320, 240),
+                                 borderMode=cv2.BORDER_REFLECT)
+        aligned, shifts = align_frames([shifted, frames[1]], reference=1)
+        self.assertAlmostEqual(shifts[0][0], 6, delta=0.5)
+        self.assertAlmostEqual(shifts[0][1], -4, delta=0.5)
+        self.assertLess(np.abs(aligned[0][20:-20, 20:-20].astype(int) - frames[1][20:-20, 20:-20]).mean(), 2)
+
+    def test_thirty_frames_vga(self):
+        """A 30 frame 640x480 stack completes in about a second"""
+        sharp, frames, band = make_series(count=30, height=480, width=640)
+        start = time.monotonic()
+        focus_stack(frames)
+        self.assertLess(time.monotonic() - start, 2.0)
+
+    def test_empty_input(self):
+        """No frames gives no result"""
+        self.assertIsNone(focus_stack([]))
+
+if __name__ == "__main__":
+    unittest.main()
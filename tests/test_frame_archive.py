@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Raw Frame Archive Tests
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.frame_archive import (ArchiveWriter, FrameArchive, INDEX_DTYPE, INDEX_FILE, archive, export)
+from driver.fake_camera import FakeMicroscopeDriver
+
+def make_frames(n: int, shape=(48, 64, 3), dtype=np.uint8, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, np.iinfo(dtype).max, shape, dtype=dtype) for _ in range(n)]
+
+class TestFrameArchive(unittest.TestCase):
+    """Archive test class"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'session')
+
+    def write(self, frames, **kwargs):
+        with ArchiveWriter(self.path, **kwargs) as writer:
+            for i, frame in enumerate(frames):
+                writer.append(frame, timestamp=10.0 + i / 30, seq=i + 1,
+                              settings={'brightness': 0.5, 'exposure': -6.0, 'gain': 2.0})
+        return writer
+
+    def test_roundtrip_and_growth(self):
+        """Frames come back bit-exact after the files grew past the initial capacity"""
+        frames = make_frames(10)
+        writer = self.write(frames, capacity=4)
+        self.assertEqual(writer.stride % 4096, 0)
+        with FrameArchive(self.path) as frames_read:
+            self.assertEqual(len(frames_read), 10)
+            for expected, actual in zip(frames, frames_read):
+                np.testing.assert_array_equal(actual, expected)
+            record = frames_read.record(-1)
+            self.assertEqual((record.index, record.seq), (9, 10))
+            self.assertAlmostEqual(record.timestamp, 10.3)
+            self.assertEqual((record.brightness, record.exposure, record.gain), (0.5, -6.0, 2.0))
+
+    def test_zero_copy_views(self):
+        """Readers get read-only views of the mapped file"""
+        self.write(make_frames(3, shape=(30, 40), dtype=np.uint16))
+        with FrameArchive(self.path) as frames:
+            view = frames[1]
+            self.assertEqual((view.shape, view.dtype), ((30, 40), np.uint16))
+            self.assertFalse(view.flags.owndata)
+            self.assertFalse(view.flags.writeable)
+            with self.assertRaises(IndexError):
+                frames[3]
+
+    def test_reader_follows_writer(self):
+        """refresh() picks up frames appended after opening"""
+        frames = make_frames(6)
+        writer = ArchiveWriter(self.path, capacity=2)
+        writer.append(frames[0])
+        reader = FrameArchive(self.path)
+        self.assertEqual(len(reader), 1)
+        for frame in frames[1:]:
+            writer.append(frame)
+        self.assertEqual(reader.refresh(), 6)
+        np.testing.assert_array_equal(reader[5], frames[5])
+        writer.close()
+        self.assertEqual(reader.refresh(), 6)
+        reader.close()
+
+    def test_crash_recovery(self):
+        """An uncommitted record is ignored and overwritten by the next writer"""
+        frames = make_frames(4)
+        writer = ArchiveWriter(self.path, capacity=8)
+        for frame in frames[:3]:
+            writer.append(frame)
+        writer.flush()
+        # Simulate a crash after the index fields but before the commit mark
+        index = np.memmap(os.path.join(self.path, INDEX_FILE), INDEX_DTYPE, 'r+')
+        index[3] = (99, 123.0, 0, 0, 0, 0)
+        index.flush()
+        del index, writer
+
+        with FrameArchive(self.path) as reader:
+            self.assertEqual(len(reader), 3)
+        writer = ArchiveWriter(self.path)
+        self.assertTrue(writer.recovered)
+        self.assertEqual(writer.append(frames[3]), 3)
+        writer.close()
+        with FrameArchive(self.path) as reader:
+            self.assertEqual(len(reader), 4)
+            np.testing.assert_array_equal(reader[3], frames[3])
+
+    def test_shape_mismatch(self):
+        """Frames of another size are rejected"""
+        with ArchiveWriter(self.path) as writer:
+            writer.append(make_frames(1)[0])
+            self.assertEqual(writer.append(np.zeros((10, 10, 3), np.uint8)), -1)
+            self.assertEqual(writer.count, 1)
+
+    def test_find(self):
+        """Timestamps map to the nearest frame"""
+        self.write(make_frames(5))
+        with FrameArchive(self.path) as frames:
+            self.assertEqual(frames.find(0.0), 0)
+            self.assertEqual(frames.find(10.0 + 2.4 / 30), 2)
+            self.assertEqual(frames.find(10.0 + 2.6 / 30), 3)
+            self.assertEqual(frames.find(99.0), 4)
+
+    def test_export(self):
+        """PNG and TIFF exports are lossless; video export writes every frame"""
+        frames = make_frames(5)
+        self.write(frames)
+        with FrameArchive(self.path) as archived:
+            for format, extension in (('png', 'png'), ('tiff', 'tif')):
+                output = os.path.join(self.tmp.name, format)
+                self.assertEqual(export(archived, output, format, start=1, step=2, workers=2), 2)
+                np.testing.assert_array_equal(cv2.imread(os.path.join(output, f'frame_000003.{extension}')), frames[3])
+                self.assertTrue(os.path.exists(os.path.join(output, 'index.csv')))
+
+            video = os.path.join(self.tmp.name, 'session.avi')
+            self.assertEqual(export(archived, video, 'video'), 5)
+            cap = cv2.VideoCapture(video)
+            self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 5)
+            cap.release()
+
+class TestArchiveSession(unittest.TestCase):
+    """Live archiving test class"""
+
+    def test_archive_fake_camera(self):
+        """Every grabbed frame is archived with its sequence number and settings"""
+        driver = FakeMicroscopeDriver(width=160, height=120, realtime=False, threaded=True)
+        self.assertTrue(driver.connect())
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'session')
+            try:
+                report = archive(driver, path, count=20, capacity=8)
+            finally:
+                driver.disconnect()
+            self.assertEqual(report.frames_written, 20)
+            with FrameArchive(path) as frames:
+                self.assertEqual(len(frames), 20)
+                self.assertEqual(frames[0].shape, (120, 160, 3))
+                self.assertTrue(np.all(np.diff(frames.seqs.astype(np.int64)) >= 1))
+                self.assertEqual(frames.record(0).brightness, 0.5)
+                self.assertEqual(frames.get_status()['frames_missed'], report.frames_missed)
+                self.assertIn('device', frames.metadata)
+
+if __name__ == "__main__":
+    unittest.main()
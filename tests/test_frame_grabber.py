@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Threaded Acquisition Tests
+"""
+
+import unittest
+import threading
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.fake_camera import FakeMicroscopeDriver
+
+class TestThreadedAcquisition(unittest.TestCase):
+    """Frame grabber test class"""
+
+    def setUp(self):
+        """Test setup"""
+        self.driver = FakeMicroscopeDriver(fps=200, threaded=True, ring_size=3)
+        self.driver.connect()
+
+    def tearDown(self):
+        """Test cleanup"""
+        self.driver.disconnect()
+
+    def test_grabber_started_on_connect(self):
+        """Threaded mode starts the grabber on connect"""
+        self.assertIsNotNone(self.driver.grabber)
+        self.assertTrue(self.driver.grabber.is_running)
+
+    def test_capture_frame_returns_newest(self):
+        """capture_frame returns a private copy of the newest frame"""
+        frame = self.driver.capture_frame()
+        self.assertEqual(frame.shape, (480, 640, 3))
+
+        latest = self.driver.get_latest_frame(copy=False)
+        self.assertIsNot(frame, latest.frame)
+
+    def test_wait_for_next_advances(self):
+        """wait_for_next returns strictly newer frames"""
+        first = self.driver.wait_for_next(0)
+        second = self.driver.wait_for_next(first.seq)
+        self.assertGreater(second.seq, first.seq)
+        self.assertGreaterEqual(second.timestamp, first.timestamp)
+
+    def test_multiple_readers(self):
+        """Several readers share one device"""
+        results = []
+
+        def reader():
+            seq = 0
+            for _ in range(5):
+                grabbed = self.driver.wait_for_next(seq)
+                seq = grabbed.seq
+            results.append(seq)
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+
+        self.assertEqual(len(results), 4)
+        self.assertTrue(all(seq >= 5 for seq in results))
+
+    def test_stop_acquisition(self):
+        """Stopping acquisition falls back to synchronous reads"""
+        self.driver.stop_acquisition()
+        self.assertIsNone(self.driver.get_latest_frame())
+        self.assertIsNone(self.driver.wait_for_next(0))
+        self.assertIsNotNone(self.driver.capture_frame())
+
+if __name__ == "__main__":
+    unittest.main()
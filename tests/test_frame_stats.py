@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Frame Statistics Tests
+"""
+
+import unittest
+import time
+import cv2
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.fake_camera import FakeMicroscopeDriver
+from driver.frame_stats import FrameStats, frame_stats
+
+class TestFrameStats(unittest.TestCase):
+    """Frame statistics test class"""
+
+    def setUp(self):
+        """Test setup"""
+        rng = np.random.default_rng(3)
+        self.frame = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+
+    def test_matches_numpy_at_full_resolution(self):
+        """step=1 reproduces the full-frame numpy statistics"""
+        stats = frame_stats(self.frame, step=1, luma=False)
+        self.assertEqual(stats.min, self.frame.min())
+        self.assertEqual(stats.max, self.frame.max())
+        self.assertAlmostEqual(stats.mean, self.frame.mean(), places=6)
+        self.assertAlmostEqual(stats.std, self.frame.std(), places=6)
+        self.assertEqual(stats.samples, self.frame.size)
+        self.assertEqual(stats.histogram.sum(), self.frame.size)
+
+    def test_luma_and_decimation(self):
+        """Luma statistics on a decimated grid"""
+        gray = cv2.cvtColor(self.frame[::4, ::4].copy(), cv2.COLOR_BGR2GRAY)
+        stats = frame_stats(self.frame, step=4)
+        self.assertEqual(stats.samples, gray.size)
+        self.assertAlmostEqual(stats.mean, gray.mean(), places=6)
+
+    def test_clipping(self):
+        """Clipping percentages count saturated samples"""
+        frame = np.full((10, 10), 128, dtype=np.uint8)
+        frame[:2] = 255
+        frame[2:3] = 0
+        stats = frame_stats(frame, step=1)
+        self.assertAlmostEqual(stats.clipped_high, 20.0)
+        self.assertAlmostEqual(stats.clipped_low, 10.0)
+
+    def test_session_aggregates(self):
+        """Session statistics combine all frames"""
+        collector = FrameStats(step=1, window=2)
+        for value in (10, 20, 30):
+            collector.update(np.full((4, 4), value, dtype=np.uint8))
+        session = collector.session()
+        self.assertEqual(session.frames, 3)
+        self.assertEqual((session.min, session.max), (10, 30))
+        self.assertAlmostEqual(session.mean, 20.0)
+        self.assertAlmostEqual(session.recent_mean, 25.0)
+        collector.reset()
+        self.assertIsNone(collector.session())
+
+    def test_passthrough_jpeg(self):
+        """Compressed buffers are measured through a reduced decode"""
+        data = cv2.imencode('.jpg', np.full((64, 64, 3), 100, dtype=np.uint8))[1].reshape(1, -1)
+        stats = frame_stats(data, step=4)
+        self.assertEqual(stats.samples, 16 * 16)
+        self.assertAlmostEqual(stats.mean, 100, delta=2)
+
+    def test_cheap_per_frame(self):
+        """VGA statistics on the default grid take well under a millisecond"""
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        start = time.perf_counter()
+        for _ in range(50):
+            frame_stats(frame)
+        self.assertLess((time.perf_counter() - start) / 50, 0.002)
+
+    def test_driver_measures_grabbed_frames(self):
+        """Threaded drivers measure every grabbed frame"""
+        driver = FakeMicroscopeDriver(width=160, height=120, fps=100, threaded=True)
+        driver.connect()
+        self.addCleanup(driver.disconnect)
+        driver.enable_stats()
+        deadline = time.monotonic() + 2
+        while driver.stats.frames < 5 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        self.assertGreaterEqual(driver.get_session_stats().frames, 5)
+        self.assertIsNotNone(driver.get_frame_stats())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+MJPEG Passthrough Tests
+"""
+
+import unittest
+import cv2
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.jpeg_frame import JpegFrame, is_jpeg_buffer, jpeg_dimensions
+from tests.fake_driver import FakeDriverMixin
+
+class TestJpegFrame(unittest.TestCase):
+    """JPEG frame helper test class"""
+
+    def setUp(self):
+        """Test setup"""
+        self.image = np.zeros((30, 40, 3), dtype=np.uint8)
+        self.data = cv2.imencode('.jpg', self.image)[1].tobytes()
+
+    def test_dimensions_from_header(self):
+        """Width and height come from the SOF marker"""
+        self.assertEqual(jpeg_dimensions(self.data), (40, 30))
+        self.assertIsNone(jpeg_dimensions(b'\xff\xd8\xff\xda\x00\x02'))
+
+    def test_buffer_detection(self):
+        """Raw JPEG buffers are told apart from pixel arrays"""
+        self.assertTrue(is_jpeg_buffer(np.frombuffer(self.data, dtype=np.uint8).reshape(1, -1)))
+        self.assertTrue(is_jpeg_buffer(self.data))
+        self.assertFalse(is_jpeg_buffer(self.image))
+        self.assertFalse(is_jpeg_buffer(None))
+
+    def test_lazy_decode(self):
+        """Pixels are decoded only when asked for"""
+        jpeg = JpegFrame(self.data)
+        self.assertFalse(jpeg.is_decoded)
+        self.assertEqual(jpeg.size, (40, 30))
+        self.assertEqual(jpeg.decode().shape, (30, 40, 3))
+        self.assertTrue(jpeg.is_decoded)
+
+class TestPassthroughCapture(FakeDriverMixin, unittest.TestCase):
+    """Driver passthrough test class"""
+
+    def test_passthrough_returns_device_jpeg(self):
+        """capture_jpeg forwards the device JPEG without decoding"""
+        driver = self.make_driver(passthrough=True)
+        jpeg = driver.capture_jpeg()
+        self.assertEqual(jpeg.data[:2], b'\xff\xd8')
+        self.assertFalse(jpeg.is_decoded)
+        self.assertEqual(jpeg.size, (640, 480))
+
+    def test_passthrough_capture_frame_decodes(self):
+        """capture_frame still returns BGR pixels"""
+        driver = self.make_driver(passthrough=True)
+        self.assertEqual(driver.capture_frame().shape, (480, 640, 3))
+
+    def test_threaded_passthrough(self):
+        """Grabbed frames decode on request and stay raw otherwise"""
+        driver = self.make_driver(passthrough=True, threaded=True)
+        raw = driver.wait_for_next(0, decode=False)
+        self.assertTrue(is_jpeg_buffer(raw.frame))
+        decoded = driver.wait_for_next(raw.seq)
+        self.assertEqual(decoded.frame.shape, (480, 640, 3))
+
+    def test_encode_without_passthrough(self):
+        """Without passthrough, capture_jpeg encodes pixels at the given quality"""
+        driver = self.make_driver()
+        jpeg = driver.capture_jpeg(quality=50)
+        self.assertTrue(jpeg.is_decoded)
+        self.assertEqual(jpeg.size, (640, 480))
+        self.assertEqual(cv2.imdecode(np.frombuffer(jpeg.data, np.uint8), cv2.IMREAD_COLOR).shape, (480, 640, 3))
+
+if __name__ == "__main__":
+    unittest.main()
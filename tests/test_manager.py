@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Multi-Microscope Manager Tests
+"""
+
+import unittest
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.manager import MicroscopeManager, _ProcessWorker
+
+class TestMicroscopeManager(unittest.TestCase):
+    """Manager test class"""
+
+    def check_capture(self, mode):
+        with MicroscopeManager(mode=mode) as manager:
+            self.assertEqual(manager.open(manager.fake_specs(2)), 2)
+
+            multi = manager.capture_all(timeout=5)
+            self.assertIsNotNone(multi)
+            self.assertEqual(sorted(multi.frames), ['fake0', 'fake1'])
+            self.assertEqual(multi.frames['fake0'].shape, (480, 640, 3))
+            # Both frames were grabbed within about one frame period at 30 fps
+            self.assertLess(multi.skew, 0.1)
+
+            stats = manager.get_stats()
+            self.assertGreater(stats['fake1']['frames'], 0)
+            self.assertEqual(stats['fake1']['failures'], 0)
+        self.assertEqual(manager.workers, {})
+
+    def test_thread_workers(self):
+        """Thread workers capture time-aligned frames"""
+        self.check_capture('thread')
+
+    def test_process_workers(self):
+        """Process workers publish frames through shared memory"""
+        self.check_capture('process')
+
+    def test_process_worker_setup_failure(self):
+        """A worker that cannot create its ring reports failure instead of timing out"""
+        context = multiprocessing.get_context('spawn')
+        worker = _ProcessWorker(MicroscopeManager().fake_specs(1)[0], 4, context)
+        # A stale segment with the worker's name makes SharedFrameWriter fail in the child
+        stale = shared_memory.SharedMemory(name=worker.shm_name, create=True, size=4096)
+        self.addCleanup(stale.unlink)
+        self.addCleanup(stale.close)
+        start = time.monotonic()
+        self.assertFalse(worker.start(timeout=30))
+        self.assertLess(time.monotonic() - start, 20)
+        self.assertFalse(worker.process.is_alive())
+
+    def test_capture_without_devices(self):
+        """capture_all returns None when nothing is open"""
+        manager = MicroscopeManager(mode='thread')
+        self.assertIsNone(manager.capture_all())
+
+    def test_invalid_mode(self):
+        """Unknown worker modes are rejected"""
+        with self.assertRaises(ValueError):
+            MicroscopeManager(mode='fiber')
+
+if __name__ == "__main__":
+    unittest.main()
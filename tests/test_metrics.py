@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Pipeline Metrics Tests
+"""
+
+import unittest
+import json
+import time
+import urllib.request
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.fake_camera import FakeMicroscopeDriver
+from driver.metrics import METRICS, LatencyHistogram, Metrics, MetricsServer
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Histogram test class"""
+
+    def test_percentiles_within_bucket_error(self):
+        """Percentiles stay within the log-linear bucket resolution"""
+        histogram = LatencyHistogram()
+        for value in range(1, 10001):
+            histogram.record(value * 1000)
+
+        self.assertEqual(histogram.count, 10000)
+        for q, expected in ((50, 5_000_000), (90, 9_000_000), (99, 9_900_000)):
+            self.assertAlmostEqual(histogram.percentile(q) / expected, 1.0, delta=0.07)
+        self.assertEqual(histogram.min, 1000)
+        self.assertEqual(histogram.max, 10_000_000)
+
+    def test_empty_and_huge_values(self):
+        """Empty histograms report zero and overflowing values report the maximum"""
+        histogram = LatencyHistogram()
+        self.assertEqual(histogram.percentile(99), 0)
+        histogram.record(10 ** 15)
+        self.assertEqual(histogram.percentile(50), 10 ** 15)
+
+class TestMetrics(unittest.TestCase):
+    """Registry and export test class"""
+
+    def setUp(self):
+        """Test setup"""
+        self.metrics = Metrics()
+        for _ in range(5):
+            self.metrics.observe('encode', time.perf_counter_ns() - 2_000_000)
+        with self.metrics.time('decode'):
+            pass
+        self.metrics.inc('frames_dropped', 3)
+
+    def test_snapshot(self):
+        """Snapshots summarize stages and counters"""
+        snapshot = json.loads(self.metrics.to_json())
+        self.assertEqual(snapshot['stages']['encode']['count'], 5)
+        self.assertGreaterEqual(snapshot['stages']['encode']['p50_ms'], 1.8)
+        self.assertEqual(snapshot['stages']['decode']['count'], 1)
+        self.assertEqual(snapshot['counters']['frames_dropped'], 3)
+
+    def test_prometheus_format(self):
+        """Prometheus export has cumulative buckets and counters"""
+        text = self.metrics.to_prometheus()
+        self.assertIn("microscope_frames_dropped_total 3", text)
+        self.assertIn('microscope_stage_latency_seconds_bucket{stage="encode",le="0.001"} 0', text)
+        self.assertIn('microscope_stage_latency_seconds_bucket{stage="encode",le="0.0025"} 5', text)
+        self.assertIn('microscope_stage_latency_seconds_count{stage="encode"} 5', text)
+
+    def test_gauges(self):
+        """Gauges keep their latest value in both export formats"""
+        self.metrics.set('stream_quality', 80)
+        self.metrics.set('stream_quality', 65)
+        self.assertEqual(self.metrics.gauge('stream_quality'), 65)
+        self.assertEqual(self.metrics.snapshot()['gauges'], {'stream_quality': 65})
+        self.assertIn("# TYPE microscope_stream_quality gauge\nmicroscope_stream_quality 65\n",
+                      self.metrics.to_prometheus())
+
+    def test_disabled(self):
+        """Disabled registries record nothing"""
+        self.metrics.enabled = False
+        self.metrics.inc('frames_dropped')
+        self.metrics.observe('encode', time.perf_counter_ns())
+        with self.metrics.time('encode'):
+            pass
+        with self.metrics.time('unused_stage'):
+            pass
+        self.assertEqual(self.metrics.counter('frames_dropped'), 3)
+        self.assertEqual(self.metrics.stage('encode').count, 5)
+        self.assertIsNone(self.metrics.stage('unused_stage'))
+
+    def test_http_endpoint(self):
+        """The endpoint serves both export formats"""
+        server = MetricsServer(self.metrics, port=0).start()
+        try:
+            base = f"http://127.0.0.1:{server.port}"
+            with urllib.request.urlopen(f"{base}/metrics", timeout=5) as response:
+                self.assertIn("microscope_frames_dropped_total 3", response.read().decode())
+            with urllib.request.urlopen(f"{base}/metrics.json", timeout=5) as response:
+                self.assertEqual(json.load(response)['counters']['frames_dropped'], 3)
+        finally:
+            server.stop()
+
+    def test_record_overhead(self):
+        """Recording a sample costs only a few microseconds"""
+        histogram = LatencyHistogram()
+        start = time.perf_counter()
+        for value in range(10000):
+            histogram.record(value * 997)
+        self.assertLess((time.perf_counter() - start) / 10000, 20e-6)
+
+class TestInstrumentedDriver(unittest.TestCase):
+    """Driver instrumentation test class"""
+
+    def setUp(self):
+        """Test setup"""
+        METRICS.reset()
+
+    def test_synchronous_capture(self):
+        """Synchronous captures record read, capture and encode stages"""
+        driver = FakeMicroscopeDriver(realtime=False)
+        driver.connect()
+        try:
+            for _ in range(3):
+                driver.capture_frame()
+            driver.capture_jpeg(80)
+        finally:
+            driver.disconnect()
+
+        self.assertEqual(METRICS.counter('frames_grabbed'), 4)
+        self.assertEqual(METRICS.stage('capture').count, 3)
+        self.assertEqual(METRICS.stage('usb_read').count, 4)
+        self.assertEqual(METRICS.stage('jpeg_encode').count, 1)
+
+    def test_threaded_capture(self):
+        """The grabber records every frame it reads"""
+        driver = FakeMicroscopeDriver(threaded=True)
+        driver.connect()
+        try:
+            grabbed = driver.wait_for_next(0)
+            driver.wait_for_next(grabbed.seq)
+        finally:
+            driver.disconnect()
+
+        self.assertGreaterEqual(METRICS.counter('frames_grabbed'), 2)
+        self.assertGreaterEqual(METRICS.stage('usb_read').count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
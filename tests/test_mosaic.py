@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Slide Mosaic Tests
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.mosaic import Mosaic, scan
+from driver.fake_camera import FakeMicroscopeDriver
+
+def make_slide(width: int = 1400, height: int = 900, seed: int = 0) -> np.ndarray:
+    """Blurred field of colored cells."""
+    rng = np.random.default_rng(seed)
+    slide = np.full((height, width, 3), 200, dtype=np.uint8)
+    for _ in range(width * height // 2500):
+        center = tuple(int(v) for v in rng.integers(0, (width, height)))
+        color = tuple(int(v) for v in rng.integers(40, 180, 3))
+        cv2.circle(slide, center, int(rng.integers(5, 30)), color, -1)
+    return cv2.GaussianBlur(slide, (0, 0), 2)
+
+def view(slide: np.ndarray, x: int, y: int, rng, size=(320, 240), noise: int = 6) -> np.ndarray:
+    """Noisy camera frame of the slide at (x, y)."""
+    crop = slide[y:y + size[1], x:x + size[0]].astype(np.int16)
+    return np.clip(crop + rng.integers(-noise, noise + 1, crop.shape), 0, 255).astype(np.uint8)
+
+class TestMosaic(unittest.TestCase):
+    """Mosaic test class"""
+
+    def setUp(self):
+        """Test setup"""
+        self.slide = make_slide()
+        self.rng = np.random.default_rng(1)
+        self.mosaic = Mosaic(scale=0.5, max_tiles=6, tile_size=128)
+        self.addCleanup(self.mosaic.close)
+
+    def pan(self, path):
+        updates = []
+        for x, y in path:
+            updates.append(self.mosaic.add(view(self.slide, x, y, self.rng)))
+        return updates
+
+    def test_tracks_position(self):
+        """Registered positions follow the slide movement"""
+        path = [(x, 40) for x in range(0, 600, 5)] + [(600, y) for y in range(40, 300, 5)]
+        updates = self.pan(path)
+        errors = [np.hypot(u.x - x, u.y - y + 40) for u, (x, y) in zip(updates, path)]
+        self.assertLess(max(errors), 6.0)  # Chained registration drifts slowly
+        self.assertFalse(any(u.lost for u in updates))
+
+    def test_still_slide_is_not_reblended(self):
+        """Frames that have not moved cost registration only"""
+        updates = self.pan([(100, 100)] * 10)
+        self.assertTrue(updates[0].blended)
+        self.assertEqual(sum(u.blended for u in updates), 1)
+
+    def test_unrelated_frame_is_lost(self):
+        """A frame that does not overlap the reference is ignored"""
+        self.pan([(100, 100)])
+        noise = self.rng.integers(0, 256, (240, 320, 3), dtype=np.uint8)
+        update = self.mosaic.add(noise)
+        self.assertTrue(update.lost)
+        self.assertEqual(self.mosaic.frames_lost, 1)
+
+    def test_working_set_and_render(self):
+        """Tiles beyond max_tiles are spilled yet the render matches the slide"""
+        path = [(x, 0) for x in range(0, 1000, 8)] + [(1000, y) for y in range(0, 400, 8)] + \
+               [(x, 400) for x in range(1000, 0, -8)]
+        updates = self.pan(path)
+        status = self.mosaic.get_status()
+        self.assertLessEqual(status['tiles_in_memory'], 6)
+        self.assertGreater(status['tiles_total'], 6)
+
+        image = self.mosaic.render()
+        x0, y0, x1, y1 = self.mosaic.bounds
+        self.assertEqual(image.shape[:2], (y1 - y0, x1 - x0))
+        # Compare the first pass, away from the frame edges, with the slide
+        ox, oy = int(round(updates[0].x)) - x0, int(round(updates[0].y)) - y0
+        stitched = image[oy + 20:oy + 220, ox + 20:ox + 1000].astype(np.int16)
+        truth = self.slide[20:220, 20:1000].astype(np.int16)
+        self.assertLess(np.mean(np.abs(stitched - truth)), 12)
+
+        small = self.mosaic.render(scale=0.25)
+        self.assertEqual(small.shape[:2], (round((y1 - y0) * 0.25), round((x1 - x0) * 0.25)))
+
+    def test_tile_dir(self):
+        """flush() leaves every tile in a caller-owned directory"""
+        with tempfile.TemporaryDirectory() as tile_dir:
+            with Mosaic(tile_size=128, tile_dir=tile_dir) as mosaic:
+                mosaic.add(view(self.slide, 0, 0, self.rng))
+                mosaic.flush()
+                self.assertEqual(len(os.listdir(tile_dir)), len(list(mosaic.tile_keys())))
+            self.assertTrue(os.path.isdir(tile_dir))
+
+class TestScan(unittest.TestCase):
+    """Live scan test class"""
+
+    def test_scan_fake_camera(self):
+        """The drifting synthetic camera is tracked one pixel per frame"""
+        driver = FakeMicroscopeDriver(width=320, height=240, realtime=False)
+        self.assertTrue(driver.connect())
+        try:
+            with Mosaic() as mosaic:
+                self.assertEqual(scan(driver, mosaic, count=30), 30)
+                self.assertAlmostEqual(mosaic.position[0], 29, delta=2)
+                self.assertGreater(mosaic.frames_blended, 1)
+        finally:
+            driver.disconnect()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tiled Image Pyramid Tests
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import cv2
+import numpy as np
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.pyramid import PyramidImage, PyramidWriter, level_count, level_shape, write_pyramid
+from driver.mosaic import Mosaic
+
+def make_image(width: int, height: int, channels: int = 3, seed: int = 0) -> np.ndarray:
+    """Smooth random image (compresses like a micrograph)."""
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, (height // 16 + 1, width // 16 + 1, channels), dtype=np.uint8)
+    image = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    return image if channels > 1 else image.reshape(height, width)
+
+class TestPyramid(unittest.TestCase):
+    """Pyramid file test class"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'image.epyr')
+
+    def test_geometry(self):
+        """Levels halve (rounding up) until one tile is left"""
+        self.assertEqual(level_count(256, 256, 256), 1)
+        self.assertEqual(level_count(1000, 700, 128), 4)
+        self.assertEqual(level_shape(1001, 701, 2), (251, 176))
+
+    def test_lossless_roundtrip(self):
+        """PNG tiles reproduce the image exactly, including edge tiles"""
+        for channels in (3, 1):
+            image = make_image(1001, 701, channels)
+            self.assertTrue(write_pyramid(image, self.path, tile_size=128, format='png', workers=2))
+            with PyramidImage(self.path) as pyramid:
+                self.assertEqual((pyramid.width, pyramid.height, pyramid.channels), (1001, 701, channels))
+                self.assertEqual(pyramid.levels, 4)
+                np.testing.assert_array_equal(pyramid.read_level(0), image)
+
+    def test_coarse_levels(self):
+        """Each level is the image downsampled by a power of two"""
+        image = make_image(1024, 768)
+        write_pyramid(image, self.path, tile_size=128, format='png')
+        with PyramidImage(self.path) as pyramid:
+            for level in range(1, pyramid.levels):
+                width, height = pyramid.level_shape(level)
+                expected = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+                diff = np.abs(pyramid.read_level(level).astype(np.int16) - expected)
+                self.assertLess(diff.mean(), 2.0, f"level {level}")
+
+    def test_lazy_region(self):
+        """A viewport decodes only the visible tiles of the matching level"""
+        image = make_image(2048, 2048)
+        write_pyramid(image, self.path, tile_size=256, quality=95)
+        with PyramidImage(self.path) as pyramid:
+            view = pyramid.read_region(200, 200, 200, 200)
+            self.assertEqual(pyramid.tiles_decoded, 4)
+            self.assertLess(np.abs(view.astype(np.int16) - image[200:400, 200:400]).mean(), 3)
+
+            overview = pyramid.read_region(0, 0, 2048, 2048, zoom=0.125)
+            self.assertEqual(overview.shape, (256, 256, 3))
+            self.assertEqual(pyramid.level_for_zoom(0.125), 3)
+            self.assertEqual(pyramid.tiles_decoded, 5)
+
+            magnified = pyramid.read_region(100.5, 50.25, 100, 80, zoom=4.0)
+            self.assertEqual(magnified.shape, (320, 400, 3))
+
+    def test_cache_is_bounded(self):
+        """Decoded tiles beyond cache_tiles are dropped"""
+        write_pyramid(make_image(1024, 1024), self.path, tile_size=128)
+        with PyramidImage(self.path, cache_tiles=4) as pyramid:
+            pyramid.read_level(0)
+            self.assertEqual(len(pyramid._cache), 4)
+
+    def test_incomplete_write(self):
+        """Missing strips are reported"""
+        writer = PyramidWriter(self.path, 512, 512, tile_size=128)
+        writer.write_strip(make_image(512, 128))
+        self.assertFalse(writer.close())
+
+    def test_not_a_pyramid(self):
+        """Other files are rejected"""
+        cv2.imwrite(os.path.join(self.tmp.name, 'plain.png'), make_image(64, 64))
+        with self.assertRaises(ValueError):
+            PyramidImage(os.path.join(self.tmp.name, 'plain.png'))
+
+    def test_mosaic_export(self):
+        """A mosaic streams into a pyramid that matches its render"""
+        slide = make_image(900, 500, seed=3)
+        with Mosaic(scale=0.5, tile_size=128, max_tiles=4) as mosaic:
+            for x in range(0, 500, 10):
+                mosaic.add(slide[100:340, x:x + 320])
+            self.assertTrue(mosaic.save_pyramid(self.path, tile_size=128, format='png'))
+            with PyramidImage(self.path) as pyramid:
+                np.testing.assert_array_equal(pyramid.read_level(0), mosaic.render())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Video Recorder Tests
+"""
+
+import unittest
+import io
+import contextlib
+import tempfile
+import csv
+import cv2
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.fake_camera import FakeMicroscopeDriver
+from driver.recorder import VideoRecorder, record
+
+class TestVideoRecorder(unittest.TestCase):
+    """Recorder test class"""
+
+    def setUp(self):
+        """Test setup"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'test.avi')
+
+    def tearDown(self):
+        """Test cleanup"""
+        self.tmpdir.cleanup()
+
+    def queued_frames(self, policy):
+        """Fill a recorder whose encoder is not running and return the queued values"""
+        recorder = VideoRecorder(self.path, queue_size=2, policy=policy)
+        recorder._running = True  # Accept frames without starting the encoder thread
+        results = [recorder.write(np.full((4, 4, 3), i, dtype=np.uint8), float(i)) for i in range(5)]
+        return recorder, results, [timestamp for _, timestamp in recorder._queue]
+
+    def test_drop_oldest(self):
+        """drop_oldest keeps the newest frames"""
+        recorder, results, queued = self.queued_frames('drop_oldest')
+        self.assertEqual(results, [True] * 5)
+        self.assertEqual(queued, [3.0, 4.0])
+        self.assertEqual(recorder.frames_dropped, 3)
+
+    def test_drop_newest(self):
+        """drop_newest rejects incoming frames"""
+        recorder, results, queued = self.queued_frames('drop_newest')
+        self.assertEqual(results, [True, True, False, False, False])
+        self.assertEqual(queued, [0.0, 1.0])
+        self.assertEqual(recorder.frames_dropped, 3)
+
+    def test_invalid_policy(self):
+        """Unknown queue policies are rejected"""
+        with self.assertRaises(ValueError):
+            VideoRecorder(self.path, policy='drop_all')
+
+    def test_write_after_stop(self):
+        """Stopped recorders reject frames"""
+        recorder = VideoRecorder(self.path)
+        self.assertFalse(recorder.write(np.zeros((4, 4, 3), dtype=np.uint8)))
+
+    def test_writer_failure_stops_once(self):
+        """A writer that cannot be opened stops the recorder and drops the queue"""
+        recorder = VideoRecorder(os.path.join(self.tmpdir.name, 'test.unknown'))
+        recorder._running = True  # Queue frames, then run the encoder loop inline
+        for i in range(3):
+            recorder.write(np.zeros((4, 4, 3), dtype=np.uint8), float(i))
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            recorder._encode_loop()
+        self.assertEqual(output.getvalue().count("Cannot open video writer"), 1)
+        self.assertEqual((recorder.frames_written, recorder.frames_dropped), (0, 3))
+        self.assertFalse(recorder.is_recording)
+        self.assertFalse(recorder.write(np.zeros((4, 4, 3), dtype=np.uint8)))
+
+    def test_record_from_driver(self):
+        """Recording from the driver writes a playable file and timestamps"""
+        driver = FakeMicroscopeDriver(width=160, height=120, fps=60, threaded=True)
+        driver.connect()
+        try:
+            report = record(driver, self.path, 0.5, fps=60, policy='block')
+        finally:
+            driver.disconnect()
+
+        self.assertGreater(report.frames_written, 10)
+        self.assertEqual(report.frames_dropped, 0)
+        self.assertGreater(report.average_fps, 30)
+
+        cap = cv2.VideoCapture(self.path)
+        self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), report.frames_written)
+        cap.release()
+
+        with open(report.timestamps_path) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), report.frames_written)
+        times = [float(row['timestamp']) for row in rows]
+        self.assertEqual(times, sorted(times))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Shared Memory Frame Channel Tests
+"""
+
+import unittest
+import multiprocessing
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.fake_camera import FakeMicroscopeDriver
+from driver.shared_frames import SharedFrameWriter, SharedFrameReader, S_LOCK, H_LATEST
+
+def read_in_child(name, seq, queue):
+    """Read one frame in another process and report its checksum"""
+    with SharedFrameReader(name) as reader:
+        shared = reader.wait_for_next(seq, timeout=5)
+        queue.put((shared.seq, int(shared.frame.sum(dtype=np.uint64)), reader.is_valid(shared)))
+
+class TestSharedFrames(unittest.TestCase):
+    """Shared frame channel test class"""
+
+    def setUp(self):
+        """Test setup"""
+        self.writer = SharedFrameWriter((48, 64, 3), ring_size=3)
+        self.reader = SharedFrameReader(self.writer.name)
+
+    def tearDown(self):
+        """Test cleanup"""
+        self.reader.close()
+        self.writer.close()
+
+    def test_empty_ring(self):
+        """Nothing is readable before the first write"""
+        self.assertIsNone(self.reader.read_latest())
+        self.assertEqual(self.reader.shape, (48, 64, 3))
+
+    def test_roundtrip_zero_copy(self):
+        """Readers see published frames as views into shared memory"""
+        frame = np.full((48, 64, 3), 7, dtype=np.uint8)
+        seq = self.writer.write(frame, timestamp=12.5)
+
+        shared = self.reader.read_latest()
+        self.assertEqual(shared.seq, seq)
+        self.assertEqual(shared.timestamp, 12.5)
+        self.assertTrue(np.array_equal(shared.frame, frame))
+        self.assertFalse(shared.frame.flags.owndata)
+
+    def test_overwrite_detected(self):
+        """A view becomes invalid once its slot is rewritten"""
+        self.writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+        shared = self.reader.read_latest()
+        for value in range(1, 4):
+            self.writer.write(np.full((48, 64, 3), value, dtype=np.uint8))
+        self.assertFalse(self.reader.is_valid(shared))
+
+    def test_write_in_progress_skipped(self):
+        """A slot with an odd seqlock counter is never returned"""
+        self.writer.write(np.zeros((48, 64, 3), dtype=np.uint8))
+        seq, _ = self.writer.begin_write()
+        self.writer.header[H_LATEST] = seq  # simulate a reader racing the writer
+        self.assertEqual(int(self.writer.table[seq % 3, S_LOCK]) & 1, 1)
+        self.assertIsNone(self.reader.read_latest())
+        self.writer.commit_write()
+        self.assertEqual(self.reader.read_latest().seq, seq)
+
+    def test_write_from_driver(self):
+        """Frames from the driver are read straight into shared slots"""
+        driver = FakeMicroscopeDriver(width=64, height=48, realtime=False)
+        driver.connect()
+        try:
+            self.assertEqual(self.writer.write_from_driver(driver), 0)
+            shared = self.reader.read_latest(copy=True)
+            self.assertTrue(shared.frame.flags.owndata)
+            self.assertGreater(shared.frame.mean(), 0)
+        finally:
+            driver.disconnect()
+
+    def test_cross_process_reader(self):
+        """Another process can map and validate frames"""
+        frame = np.full((48, 64, 3), 3, dtype=np.uint8)
+        seq = self.writer.write(frame)
+
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        process = context.Process(target=read_in_child, args=(self.writer.name, seq - 1, queue))
+        process.start()
+        result = queue.get(timeout=10)
+        process.join(timeout=10)
+
+        self.assertEqual(result, (seq, int(frame.sum()), True))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+MJPEG Stream Server Tests
+"""
+
+import unittest
+import asyncio
+import json
+import cv2
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.fake_camera import FakeMicroscopeDriver
+from driver.stream_server import MjpegStreamServer, _Viewer
+
+async def http_get(port: int, path: str):
+    """Return (status line, headers, reader, writer) for a GET request."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    await writer.drain()
+    status = (await reader.readline()).decode().strip()
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode().strip()
+        if not line:
+            break
+        name, value = line.split(':', 1)
+        headers[name.lower()] = value.strip()
+    return status, headers, reader, writer
+
+async def read_part(reader: asyncio.StreamReader) -> bytes:
+    """Read one multipart JPEG part."""
+    boundary = await reader.readline()
+    assert boundary.strip() == b"--frame", boundary
+    length = None
+    while True:
+        line = (await reader.readline()).strip()
+        if not line:
+            break
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":")[1])
+    data = await reader.readexactly(length)
+    await reader.readexactly(2)
+    return data
+
+class TestMjpegStreamServer(unittest.IsolatedAsyncioTestCase):
+    """Stream server test class"""
+
+    async def asyncSetUp(self):
+        """Test setup"""
+        self.driver = FakeMicroscopeDriver(width=320, height=240, threaded=True)
+        self.assertTrue(self.driver.connect())
+        self.server = await MjpegStreamServer(self.driver, port=0, quality=70).start()
+
+    async def asyncTearDown(self):
+        """Test cleanup"""
+        await self.server.close()
+        self.driver.disconnect()
+
+    async def test_fan_out(self):
+        """Every client receives the same encoded frames"""
+        clients = [await http_get(self.server.port, '/stream') for _ in range(4)]
+        for status, headers, _, _ in clients:
+            self.assertIn("200", status)
+            self.assertTrue(headers['content-type'].startswith("multipart/x-mixed-replace"))
+
+        received = []
+        for _, _, reader, _ in clients:
+            received.append([await asyncio.wait_for(read_part(reader), 5) for _ in range(3)])
+        for _, _, _, writer in clients:
+            writer.close()
+
+        frame = cv2.imdecode(np.frombuffer(received[0][0], np.uint8), cv2.IMREAD_COLOR)
+        self.assertEqual(frame.shape, (240, 320, 3))
+        # Encoding happens once per frame, not once per client
+        self.assertLessEqual(self.server.frames_encoded, self.driver.grabber.frames_grabbed)
+        shared = set(received[0]) & set(received[1]) & set(received[2]) & set(received[3])
+        self.assertTrue(shared)
+
+    async def test_snapshot_and_status(self):
+        """Single-shot JPEG and JSON status endpoints"""
+        status, headers, reader, writer = await http_get(self.server.port, '/snapshot.jpg')
+        self.assertIn("200", status)
+        self.assertEqual(headers['content-type'], 'image/jpeg')
+        data = await reader.readexactly(int(headers['content-length']))
+        writer.close()
+        self.assertEqual(data[:2], b'\xff\xd8')
+
+        status, headers, reader, writer = await http_get(self.server.port, '/status')
+        status_doc = json.loads(await reader.readexactly(int(headers['content-length'])))
+        writer.close()
+        self.assertEqual(status_doc['clients'], 0)
+        self.assertGreaterEqual(status_doc['frames_encoded'], 1)
+
+    async def test_unknown_path(self):
+        """Unknown paths return 404"""
+        status, _, _, writer = await http_get(self.server.port, '/nothing')
+        writer.close()
+        self.assertIn("404", status)
+
+    async def test_idle_without_viewers(self):
+        """Nothing is encoded while nobody is watching"""
+        await asyncio.sleep(0.2)
+        self.assertEqual(self.server.frames_encoded, 0)
+
+class TestViewer(unittest.IsolatedAsyncioTestCase):
+    """Per-client backpressure test class"""
+
+    async def test_slow_viewer_drops(self):
+        """Frames a client has not taken yet are replaced, not queued"""
+        class FakeWriter:
+            def get_extra_info(self, name):
+                return ('127.0.0.1', 1)
+
+        viewer = _Viewer(FakeWriter())
+        for chunk in (b"a", b"b", b"c"):
+            viewer.offer(chunk)
+        self.assertEqual(viewer.pending, b"c")
+        self.assertEqual(viewer.frames_dropped, 2)
+        self.assertTrue(viewer.ready.is_set())
+
+if __name__ == "__main__":
+    unittest.main()
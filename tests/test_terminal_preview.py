@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Terminal Preview Renderer Tests
+"""
+
+import unittest
+import numpy as np
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.terminal_preview import ASCII_CHARS, render, render_ascii, render_ansi, render_half_blocks, fit_size
+
+def reference_ascii(gray):
+    """Per-pixel loop used by the original preview scripts"""
+    lines = []
+    for row in gray:
+        line = ""
+        for pixel in row:
+            char_index = min(len(ASCII_CHARS) - 1, int(pixel) * len(ASCII_CHARS) // 256)
+            line += ASCII_CHARS[char_index]
+        lines.append(line)
+    return "\n".join(lines)
+
+class TestTerminalPreview(unittest.TestCase):
+    """Terminal preview test class"""
+
+    def setUp(self):
+        """Test setup"""
+        rng = np.random.default_rng(1)
+        self.gray = rng.integers(0, 256, (30, 40), dtype=np.uint8)
+        self.frame = rng.integers(0, 256, (48, 64, 3), dtype=np.uint8)
+
+    def test_ascii_matches_reference(self):
+        """Vectorized ASCII output matches the per-pixel loop"""
+        self.assertEqual(render_ascii(self.gray, 40, 30), reference_ascii(self.gray))
+
+    def test_ascii_extremes(self):
+        """Black and white map to the first and last characters"""
+        gray = np.array([[0, 255]], dtype=np.uint8)
+        self.assertEqual(render_ascii(gray, 2, 1), ASCII_CHARS[0] + ASCII_CHARS[-1])
+
+    def test_fit_size_keeps_aspect(self):
+        """Height defaults to half the width-scaled frame height"""
+        self.assertEqual(fit_size((480, 640, 3), 80), (80, 30))
+        self.assertEqual(fit_size((480, 640, 3), 80, 10), (80, 10))
+
+    def test_ansi_cells(self):
+        """ANSI output has one color escape per cell and a reset per row"""
+        text = render_ansi(self.frame, 8, 4)
+        lines = text.split("\n")
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[0].count("\x1b[38;5;"), 8)
+        self.assertTrue(all(line.endswith("\x1b[0m") for line in lines))
+
+    def test_half_blocks(self):
+        """Half-block output packs two pixel rows into each text row"""
+        white = np.full((4, 2, 3), 255, dtype=np.uint8)
+        text = render_half_blocks(white, 2, 2)
+        lines = text.split("\n")
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0].count("▀"), 2)
+        self.assertIn("\x1b[38;5;231;48;5;231m", lines[0])
+
+    def test_unknown_mode(self):
+        """Unknown render modes are rejected"""
+        with self.assertRaises(ValueError):
+            render(self.frame, 8, 4, mode='sixel')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Time-lapse Tests
+"""
+
+import unittest
+import tempfile
+import csv
+import time
+import threading
+import cv2
+import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.timelapse import TimeLapse
+from tests.fake_driver import FakeDriverMixin
+
+class TestTimeLapse(FakeDriverMixin, unittest.TestCase):
+    """Time-lapse test class"""
+
+    driver_defaults = {'width': 160, 'height': 120}
+
+    def setUp(self):
+        """Test setup"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def test_sequence_stays_on_schedule(self):
+        """Shots land on absolute deadlines and are indexed"""
+        driver = self.make_driver()
+        report = TimeLapse(driver, 0.1, self.tmpdir.name, count=6).run()
+        self.assertEqual(report.shots_taken, 6)
+        self.assertEqual(report.shots_missed, 0)
+
+        with open(os.path.join(self.tmpdir.name, 'index.csv')) as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([int(row['shot']) for row in rows], list(range(6)))
+        # No cumulative drift: shot k is scheduled at exactly k intervals and never taken early
+        for k, row in enumerate(rows):
+            self.assertAlmostEqual(float(row['scheduled']), k * 0.1, places=6)
+            self.assertGreaterEqual(float(row['captured']), float(row['scheduled']))
+        self.assertEqual(cv2.imread(os.path.join(self.tmpdir.name, rows[0]['file'])).shape, (120, 160, 3))
+
+    def test_overrun_skips_deadlines(self):
+        """A shot that takes longer than the interval skips the missed slots"""
+        driver = self.make_driver()
+        timelapse = TimeLapse(driver, 0.02, self.tmpdir.name, count=3)
+        shoot = timelapse._shoot
+        calls = []
+
+        def slow_shoot():
+            calls.append(1)
+            if len(calls) == 1:
+                time.sleep(0.05)
+            return shoot()
+
+        timelapse._shoot = slow_shoot
+        report = timelapse.run()
+        self.assertEqual(report.shots_taken, 3)
+        self.assertGreaterEqual(report.shots_missed, 2)
+
+    def test_invalid_format(self):
+        """Unknown image formats are rejected up front"""
+        with self.assertRaises(ValueError):
+            TimeLapse(self.make_driver(), 0.01, self.tmpdir.name, count=1, format='xyz')
+
+    def test_write_errors_do_not_stall(self):
+        """An encoder error fails the shot but the writer keeps draining the queue"""
+        driver = self.make_driver()
+        timelapse = TimeLapse(driver, 0.01, self.tmpdir.name, count=30, queue_size=2)
+        timelapse.format = 'xyz'  # Past validation: cv2.imwrite raises for this extension
+        reports = []
+        runner = threading.Thread(target=lambda: reports.append(timelapse.run()), daemon=True)
+        runner.start()
+        runner.join(10)
+        self.assertFalse(runner.is_alive())
+        self.assertEqual(reports[0].shots_taken, 30)
+        self.assertEqual(reports[0].write_failures, 30)
+
+    def test_reconnect_between_shots(self):
+        """Without keep_warm the device is released between shots"""
+        driver = self.make_driver()
+        report = TimeLapse(driver, 0.05, self.tmpdir.name, count=3, keep_warm=False,
+                           warmup=0.02, warmup_frames=1).run()
+        self.assertEqual(report.shots_taken, 3)
+        self.assertFalse(driver.is_connected)
+
+    def test_video_output(self):
+        """Video mode writes one frame per shot"""
+        driver = self.make_driver(threaded=True)
+        path = os.path.join(self.tmpdir.name, 'timelapse.avi')
+        report = TimeLapse(driver, 0.03, path, count=4, mode='video').run()
+        self.assertEqual(report.shots_taken, 4)
+        cap = cv2.VideoCapture(path)
+        self.assertEqual(int(cap.get(cv2.CAP_PROP_FRAME_COUNT)), 4)
+        cap.release()
+
+if __name__ == "__main__":
+    unittest.main()
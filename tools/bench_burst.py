@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Burst Benchmark
+Measures burst save throughput (frames/s) against encode worker count
+using the fake camera, so it runs without hardware
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.fake_camera import FakeMicroscopeDriver
+from driver.burst import burst, make_executor
+
+def bench(driver, frames: int, workers: int, format: str, quality: int) -> float:
+    """Return encode+save frames/s for one burst with the given worker count."""
+    executor = make_executor(workers)
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            # Warm-up so process start-up is not counted
+            burst(driver, workers, output_dir, format, quality, executor=executor, prefix='warmup').wait()
+
+            job = burst(driver, frames, output_dir, format, quality, executor=executor)
+            start = time.monotonic()
+            job.wait()
+            return frames / (time.monotonic() - start)
+    finally:
+        executor.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Burst capture encode benchmark")
+    parser.add_argument('--frames', type=int, default=60, help="Frames per burst")
+    parser.add_argument('--format', default='jpg', help="Image format (jpg/png/tiff/webp)")
+    parser.add_argument('--quality', type=int, default=95, help="JPEG/WebP quality")
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count(), help="Largest pool to try")
+    args = parser.parse_args()
+
+    driver = FakeMicroscopeDriver(width=args.width, height=args.height, realtime=False)
+    if not driver.connect():
+        return
+
+    print(f"=== Burst Benchmark: {args.frames} x {args.width}x{args.height} {args.format} ===")
+    print(f"{'workers':>8} {'frames/s':>10} {'speedup':>8}")
+    baseline = None
+    try:
+        for workers in range(1, args.max_workers + 1):
+            fps = bench(driver, args.frames, workers, args.format, args.quality)
+            baseline = baseline or fps
+            print(f"{workers:>8} {fps:>10.1f} {fps / baseline:>7.2f}x")
+    finally:
+        driver.disconnect()
+
+if __name__ == "__main__":
+    main()
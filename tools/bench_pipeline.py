@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Capture Pipeline Benchmark
+Times each stage between sensor and screen on the simulated backend:
+capture, GUI display conversion, JPEG encode, base64 and disk writes.
+Results can be saved as a JSON baseline and compared against it.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import cv2
+import numpy as np
+from typing import Callable, Dict, List, Tuple
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.fake_camera import FakeMicroscopeDriver
+
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720)]
+DISPLAY_SIZE = (400, 300)  # MicroscopeGUI display size
+LIVE_QUALITY = 80  # Quality used for live frames
+CAPTURE_QUALITY = 95  # Quality used for captured images
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_TOLERANCE = 0.5  # Allowed relative p50 slowdown
+MIN_DELTA_MS = 0.05  # Smaller absolute slowdowns are timer and scheduler noise
+
+def percentile(samples: List[float], q: float) -> float:
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+def measure(stage: Callable[[], object], iterations: int, warmup: int = 5, alloc_iterations: int = 10) -> Dict[str, float]:
+    """
+    Time a stage and measure the memory it allocates per call
+
+    Allocation is measured in a separate pass because tracing slows the
+    stage down. It is the traced peak above the starting level, i.e. the
+    temporary and result buffers a call needs.
+    """
+    for _ in range(warmup):
+        stage()
+
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        stage()
+        latencies.append((time.perf_counter_ns() - start) / 1e6)
+
+    tracemalloc.start()
+    try:
+        allocated = 0
+        for _ in range(alloc_iterations):
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            stage()
+            _, peak = tracemalloc.get_traced_memory()
+            allocated += peak - before
+    finally:
+        tracemalloc.stop()
+
+    mean = sum(latencies) / len(latencies)
+    return {
+        'p50_ms': round(percentile(latencies, 50), 4),
+        'p99_ms': round(percentile(latencies, 99), 4),
+        'fps': round(1000.0 / mean, 1) if mean > 0 else 0.0,
+        'alloc_kb': round(allocated / alloc_iterations / 1024, 1),
+    }
+
+def bench_resolution(width: int, height: int, iterations: int, output_dir: str) -> Dict[str, Dict[str, float]]:
+    """Measure every pipeline stage at one resolution."""
+    driver = FakeMicroscopeDriver(width=width, height=height, realtime=False)
+    driver.connect()
+    try:
+        frame = driver.capture_frame()
+        small = cv2.resize(frame, DISPLAY_SIZE, interpolation=cv2.INTER_AREA)
+        live_jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, LIVE_QUALITY])[1].tobytes()
+        capture_jpeg = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, CAPTURE_QUALITY])[1].tobytes()
+        path = os.path.join(output_dir, f"bench_{width}x{height}.jpg")
+
+        def write_file():
+            with open(path, 'wb') as f:
+                f.write(capture_jpeg)
+
+        def live_frame():
+            # What a live preview request costs end to end
+            captured = driver.capture_frame()
+            encoded = cv2.imencode('.jpg', captured, [cv2.IMWRITE_JPEG_QUALITY, LIVE_QUALITY])[1]
+            return base64.b64encode(encoded.tobytes())
+
+        stages: List[Tuple[str, Callable[[], object]]] = [
+            ('capture', driver.capture_frame),
+            ('resize', lambda: cv2.resize(frame, DISPLAY_SIZE, interpolation=cv2.INTER_AREA)),
+            ('bgr2rgb', lambda: cv2.cvtColor(small, cv2.COLOR_BGR2RGB)),
+            (f'jpeg{LIVE_QUALITY}', lambda: cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, LIVE_QUALITY])),
+            (f'jpeg{CAPTURE_QUALITY}', lambda: cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, CAPTURE_QUALITY])),
+            ('base64', lambda: base64.b64encode(live_jpeg)),
+            ('disk_write', write_file),
+            ('live_frame', live_frame),
+        ]
+        return {name: measure(stage, iterations) for name, stage in stages}
+    finally:
+        driver.disconnect()
+
+def run_suite(resolutions=RESOLUTIONS, iterations: int = 200) -> dict:
+    """Run every stage at every resolution."""
+    results = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for width, height in resolutions:
+            results[f"{width}x{height}"] = bench_resolution(width, height, iterations, output_dir)
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'iterations': iterations,
+            'date': time.strftime("%Y-%m-%d"),
+        },
+        'results': results,
+    }
+
+def compare(current: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE,
+            min_delta_ms: float = MIN_DELTA_MS) -> List[str]:
+    """
+    Return descriptions of stages whose p50 latency regressed beyond tolerance
+
+    Slowdowns of min_delta_ms or less are ignored even when the ratio is
+    exceeded; differences that small are dominated by timer and scheduler noise.
+    """
+    regressions = []
+    for resolution, stages in current['results'].items():
+        for stage, metrics in stages.items():
+            reference = baseline.get('results', {}).get(resolution, {}).get(stage)
+            if not reference or reference['p50_ms'] <= 0:
+                continue
+            ratio = metrics['p50_ms'] / reference['p50_ms']
+            if ratio > 1.0 + tolerance and metrics['p50_ms'] - reference['p50_ms'] > min_delta_ms:
+                regressions.append(f"{resolution} {stage}: p50 {reference['p50_ms']:.3f} -> "
+                                   f"{metrics['p50_ms']:.3f} ms ({ratio:.2f}x)")
+    return regressions
+
+def print_report(report: dict, baseline: dict = None):
+    print(f"{'resolution':>10} {'stage':>12} {'p50 ms':>9} {'p99 ms':>9} {'fps':>9} {'alloc KiB':>10} {'vs base':>8}")
+    for resolution, stages in report['results'].items():
+        for stage, m in stages.items():
+            delta = ""
+            reference = (baseline or {}).get('results', {}).get(resolution, {}).get(stage)
+            if reference and reference['p50_ms'] > 0:
+                delta = f"{m['p50_ms'] / reference['p50_ms']:.2f}x"
+            print(f"{resolution:>10} {stage:>12} {m['p50_ms']:>9.3f} {m['p99_ms']:>9.3f} "
+                  f"{m['fps']:>9.1f} {m['alloc_kb']:>10.1f} {delta:>8}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture pipeline benchmark")
+    parser.add_argument('--iterations', type=int, default=200, help="Timed calls per stage")
+    parser.add_argument('--resolution', action='append', help="WIDTHxHEIGHT (repeatable; default: all)")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Write the results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed p50 slowdown before failing")
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+
+    resolutions = RESOLUTIONS
+    if args.resolution:
+        resolutions = [tuple(int(v) for v in r.lower().split('x')) for r in args.resolution]
+
+    report = run_suite(resolutions, args.iterations)
+
+    baseline = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved: {args.baseline}")
+        return
+
+    if baseline:
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,35 @@ Tool to scan connected USB devices and find microscopes
 import usb.core
 import usb.util
 import sys
+import os
+
+# Import driver module
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from driver.discovery import DISCOVERY
+
+def scan_sysfs_devices():
+    """List USB devices from sysfs (no device access needed)."""
+    for device in DISCOVERY.scan():
+        print(f"Device found:")
+        print(f"  Vendor ID:  0x{device.vendor_id:04x}")
+        print(f"  Product ID: 0x{device.product_id:04x}")
+        print(f"  Manufacturer: {device.manufacturer or '(Unknown)'}")
+        print(f"  Product:      {device.product or '(Unknown)'}")
+        print(f"  Bus:        {device.bus}")
+        print(f"  Address:    {device.address}")
+        if device.video_nodes:
+            print(f"  Video:      {', '.join(f'/dev/video{n}' for n in device.video_nodes)}")
+        print("-" * 60)
 
 def scan_usb_devices():
     """Scan all connected USB devices."""
     print("Scanning connected USB devices...")
     print("-" * 60)
     
+    if DISCOVERY.available:
+        scan_sysfs_devices()
+        return
+    
     devices = usb.core.find(find_all=True)
     
     for device in devices:
@@ -44,8 +67,20 @@ def find_microscope_candidates():
     """Find devices that are likely to be microscopes."""
     print("\nSearching for microscope candidate devices...")
     
-    devices = usb.core.find(find_all=True)
     candidates = []
+    keywords = ['microscope', 'camera', 'video', 'usb', 'digital']
+    
+    # With sysfs, anything that owns a video node is a candidate
+    devices = [] if DISCOVERY.available else usb.core.find(find_all=True)
+    for device in DISCOVERY.scan():
+        if device.video_nodes or any(keyword in (device.manufacturer + device.product).lower() for keyword in keywords):
+            candidates.append({
+                'vendor_id': device.vendor_id,
+                'product_id': device.product_id,
+                'manufacturer': device.manufacturer or "Unknown",
+                'product': device.product or "Unknown",
+                'video_index': device.video_index
+            })
     
     for device in devices:
         try:
@@ -62,7 +97,6 @@ def find_microscope_candidates():
                     product = "Unknown"
                 
                 # Search for microscope-related keywords
-                keywords = ['microscope', 'camera', 'video', 'usb', 'digital']
                 if any(keyword in (manufacturer + product).lower() for keyword in keywords):
                     candidates.append({
                         'vendor_id': device.idVendor,
@@ -79,6 +113,8 @@ def find_microscope_candidates():
         for i, candidate in enumerate(candidates, 1):
             print(f"{i}. {candidate['manufacturer']} - {candidate['product']}")
             print(f"   ID: {candidate['vendor_id']:04x}:{candidate['product_id']:04x}")
+            if candidate.get('video_index') is not None:
+                print(f"   Video device: /dev/video{candidate['video_index']}")
     else:
         print("No microscope candidates found.")
         print("Please check devices manually.")